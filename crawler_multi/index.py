@@ -2,6 +2,7 @@ import requests
 from crawler_single import crawl_pages
 from bs4 import BeautifulSoup
 import asyncio
+from typing import List
 
 url = "https://www.mitsui-chintai.co.jp/rf/result?"
 item_selector = "tr.c-room-list__body-row[data-js-room-link]"  # dùng CSS selector
@@ -10,24 +11,41 @@ num_page = 1
 headers = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 }
-urls = []
-
-for page in range(1, num_page + 1):
-    params = {"page": page}
-    resp = requests.get(url, params=params, headers=headers)
-    if resp.status_code != 200:
-        print(f"❌ Lỗi tải trang {page}")
-        continue
-    
-    soup = BeautifulSoup(resp.text, "html.parser")
-    items = soup.select(item_selector)
-    
-    print(f"Trang {page}: tìm thấy {len(items)} items")
-
-    for item in items:
-        # Có thể lấy link cụ thể trong data-js-room-link
-        link = item.get("data-js-room-link")
-        urls.append(link)
-        
-    
-asyncio.run(crawl_pages(urls, batch_size=10))  # Giảm batch size để tránh timeout
+
+
+def discover_urls(num_page: int = num_page, url: str = url, item_selector: str = item_selector,
+                  params: dict = None, start_page: int = 1) -> List[str]:
+    """
+    Lấy link các phòng từ trang kết quả tìm kiếm (mỗi trang một request)
+
+    Args:
+        num_page: Số trang kết quả cần duyệt
+        url: URL trang kết quả
+        item_selector: CSS selector của dòng phòng (link nằm trong data-js-room-link)
+        params: Query params thêm vào mỗi request (điều kiện tìm kiếm)
+        start_page: Trang bắt đầu
+    """
+    urls = []
+    for page in range(start_page, start_page + num_page):
+        page_params = dict(params or {}, page=page)
+        resp = requests.get(url, params=page_params, headers=headers)
+        if resp.status_code != 200:
+            print(f"❌ Lỗi tải trang {page}")
+            continue
+
+        soup = BeautifulSoup(resp.text, "html.parser")
+        items = soup.select(item_selector)
+
+        print(f"Trang {page}: tìm thấy {len(items)} items")
+
+        for item in items:
+            # Có thể lấy link cụ thể trong data-js-room-link
+            link = item.get("data-js-room-link")
+            if link:
+                urls.append(link)
+    return urls
+
+
+if __name__ == "__main__":
+    urls = discover_urls(num_page)
+    asyncio.run(crawl_pages(urls, batch_size=10))  # Concurrency khởi đầu, AIMD tự điều chỉnh theo latency/lỗi
@@ -0,0 +1,392 @@
+"""
+Crawl service - HTTP server chạy lâu dài, nhận crawl job theo yêu cầu
+
+Trình duyệt dùng chung, station index, address trie, translation memory... được
+giữ "nóng" giữa các job, nên re-crawl ad-hoc không phải khởi động lại process
+và trình duyệt.
+
+    python -m crawler_multi.service --port 8765 --snapshot-db snapshots.db
+
+    # Job từ danh sách URL
+    curl -X POST localhost:8765/jobs -d '{"urls": ["https://www.mitsui-chintai.co.jp/rf/tatemono/4281/211"]}'
+    # Job từ discovery (trang kết quả tìm kiếm)
+    curl -X POST localhost:8765/jobs -d '{"discover": {"num_page": 2}, "max_urls": 50}'
+
+    curl localhost:8765/jobs/<id>            # trạng thái
+    curl localhost:8765/jobs/<id>/events     # NDJSON: status, progress, từng URL xong (index/url/ok)
+    curl localhost:8765/jobs/<id>/results    # JSON array kết quả
+    curl -X DELETE localhost:8765/jobs/<id>  # huỷ job
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from crawler_single.config import CrawlerConfig
+from utils.serialization import dumps
+
+# Job status
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED = (DONE, FAILED, CANCELLED)
+
+# Option của job được chuyển thẳng cho crawl_multiple_properties
+JOB_OPTIONS = ('batch_size', 'deadline', 'max_urls')
+# Kiểu hợp lệ của từng option (số dương, không nhận bool)
+JOB_OPTION_TYPES = {'batch_size': int, 'deadline': (int, float), 'max_urls': int}
+# Tham số discovery được chấp nhận (crawler_multi.index.discover_urls)
+DISCOVER_OPTIONS = ('num_page', 'url', 'item_selector', 'params', 'start_page')
+
+
+class CrawlJob:
+    """Một lần crawl: danh sách URL (hoặc discovery query), kết quả và event log"""
+
+    def __init__(self, urls: Optional[List[str]] = None, discover: Optional[Dict[str, Any]] = None,
+                 options: Optional[Dict[str, Any]] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.urls = list(urls or [])
+        self.discover = discover
+        self.options = options or {}
+        self.status = QUEUED
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.results: List[Optional[Dict[str, Any]]] = []
+        self.completed = 0
+        self.failed = 0
+        self.events: List[Dict[str, Any]] = []
+        self._changed = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    def emit(self, event_type: str, **fields):
+        """Thêm event và đánh thức các stream đang chờ"""
+        self.events.append({'type': event_type, 'job': self.id, 'time': time.time(), **fields})
+        self._changed.set()
+
+    def set_status(self, status: str, error: str = None):
+        self.status = status
+        self.error = error
+        if status == RUNNING:
+            self.started_at = time.time()
+        elif status in FINISHED:
+            self.finished_at = time.time()
+        self.emit('status', status=status, **({'error': error} if error else {}))
+
+    async def follow(self, start: int = 0):
+        """Yield event từ vị trí start, chờ event mới cho đến khi job kết thúc"""
+        position = start
+        while True:
+            while position < len(self.events):
+                yield self.events[position]
+                position += 1
+            if self.finished:
+                return
+            self._changed.clear()
+            await self._changed.wait()
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'status': self.status,
+            'error': self.error,
+            'total': len(self.urls),
+            'completed': self.completed,
+            'failed': self.failed,
+            'discover': self.discover,
+            'options': self.options,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class JobManager:
+    """
+    Hàng đợi job chạy tuần tự trên một EnhancedPropertyCrawler dùng chung
+
+    Job chạy lần lượt (mỗi job đã tự chạy song song bên trong theo AIMD), giữ tối
+    đa max_jobs job đã xong trong bộ nhớ.
+    """
+
+    def __init__(self, crawler=None, snapshot_db: str = None, max_jobs: int = 100):
+        self._crawler = crawler
+        self.snapshot_db = snapshot_db
+        self.max_jobs = max_jobs
+        self.jobs: "OrderedDict[str, CrawlJob]" = OrderedDict()
+        self.started_at = time.time()
+        self._queue: Optional[asyncio.Queue] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._snapshot_store = None
+
+    @property
+    def crawler(self):
+        """EnhancedPropertyCrawler tạo ở lần dùng đầu tiên và giữ lại cho các job sau"""
+        if self._crawler is None:
+            from crawler_single.property_crawler import EnhancedPropertyCrawler
+            self._crawler = EnhancedPropertyCrawler()
+        return self._crawler
+
+    def start(self):
+        if self._runner is None:
+            self._queue = asyncio.Queue()
+            self._runner = asyncio.ensure_future(self._run())
+
+    async def close(self):
+        if self._runner is not None:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+        if self._crawler is not None:
+            await self._crawler.close()
+            if self._crawler.store is not None:
+                self._crawler.store.close()
+        if self._snapshot_store is not None:
+            self._snapshot_store.close()
+
+    def submit(self, urls: Optional[List[str]] = None, discover: Optional[Dict[str, Any]] = None,
+               **options) -> CrawlJob:
+        if urls is not None and (not isinstance(urls, list)
+                                 or not all(isinstance(url, str) and url for url in urls)):
+            raise ValueError("'urls' phải là list các URL (string)")
+        if not urls and discover is None:
+            raise ValueError("Job cần 'urls' hoặc 'discover'")
+        unknown = set(options) - set(JOB_OPTIONS)
+        if unknown:
+            raise ValueError(f"Option không hợp lệ: {', '.join(sorted(unknown))}")
+        for key, value in options.items():
+            if value is None:
+                continue
+            if isinstance(value, bool) or not isinstance(value, JOB_OPTION_TYPES[key]) or value <= 0:
+                expected = 'số nguyên' if JOB_OPTION_TYPES[key] is int else 'số'
+                raise ValueError(f"'{key}' phải là {expected} dương")
+        if discover is not None:
+            if not isinstance(discover, dict):
+                raise ValueError("'discover' phải là JSON object")
+            unknown = set(discover) - set(DISCOVER_OPTIONS)
+            if unknown:
+                raise ValueError(f"Discover option không hợp lệ: {', '.join(sorted(unknown))}")
+
+        self.start()
+        job = CrawlJob(urls, discover, {k: v for k, v in options.items() if v is not None})
+        self.jobs[job.id] = job
+        self._prune()
+        job.emit('status', status=QUEUED)
+        self._queue.put_nowait(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[CrawlJob]:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[CrawlJob]:
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return job
+        if job.task is not None:
+            job.task.cancel()  # _run_job đặt status CANCELLED
+        else:
+            job.set_status(CANCELLED)
+        return job
+
+    def _prune(self):
+        """Bỏ các job đã xong cũ nhất khi vượt max_jobs"""
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.max_jobs:
+                break
+            if self.jobs[job_id].finished:
+                del self.jobs[job_id]
+
+    def _prioritizer(self):
+        if not self.snapshot_db:
+            return None
+        from crawler_single.priority import CrawlPrioritizer
+        from crawler_single.snapshot import SnapshotStore
+        if self._snapshot_store is None:
+            self._snapshot_store = SnapshotStore(self.snapshot_db)
+        return CrawlPrioritizer(self._snapshot_store)
+
+    async def _run(self):
+        while True:
+            job = await self._queue.get()
+            if job.finished:  # bị huỷ khi còn trong queue
+                continue
+            job.task = asyncio.ensure_future(self._run_job(job))
+            try:
+                await asyncio.shield(job.task)
+            except asyncio.CancelledError:
+                if not job.task.done():  # chính runner bị huỷ (service dừng)
+                    job.task.cancel()
+                    raise
+
+    async def _run_job(self, job: CrawlJob):
+        job.set_status(RUNNING)
+        try:
+            if job.discover is not None:
+                from crawler_multi.index import discover_urls
+                discovered = await asyncio.to_thread(discover_urls, **job.discover)
+                job.urls = list(dict.fromkeys(job.urls + discovered))
+                job.emit('discovered', count=len(discovered))
+
+            job.results = [None] * len(job.urls)
+            job.emit('started', total=len(job.urls))
+
+            def on_result(index: int, result: Dict[str, Any]):
+                job.results[index] = result
+                ok = 'error' not in result
+                if ok:
+                    job.completed += 1
+                else:
+                    job.failed += 1
+                # Event chỉ báo tiến độ; bản ghi (và lỗi, ?errors=1) lấy qua /results
+                job.emit('result', index=index, url=job.urls[index], ok=ok)
+
+            options = dict(job.options)
+            prioritizer = self._prioritizer()
+            await self.crawler.crawl_multiple_properties(
+                job.urls,
+                batch_size=options.pop('batch_size', 5),
+                prioritizer=prioritizer,
+                on_result=on_result,
+                **options
+            )
+            if prioritizer is not None:
+                # Ghi SQLite không chặn event loop (các job khác vẫn stream event)
+                counts = await asyncio.to_thread(self._update_snapshots, job)
+                job.emit('changes', **counts)
+            job.set_status(DONE)
+        except asyncio.CancelledError:
+            job.set_status(CANCELLED)
+        except Exception as e:
+            print(f"❌ Job {job.id} failed: {e}")
+            job.set_status(FAILED, str(e))
+
+    def _update_snapshots(self, job: CrawlJob) -> Dict[str, int]:
+        """Cập nhật snapshot (first_seen/last_changed) để job sau ưu tiên đúng, trả về số thay đổi theo op"""
+        from crawler_single.snapshot import SnapshotDiffer
+
+        counts: Dict[str, int] = {}
+        for event in SnapshotDiffer(self._snapshot_store).apply(job.results):
+            counts[event['op']] = counts.get(event['op'], 0) + 1
+        self._snapshot_store.commit()
+        return counts
+
+    def health(self) -> Dict[str, Any]:
+        statuses: Dict[str, int] = {}
+        for job in self.jobs.values():
+            statuses[job.status] = statuses.get(job.status, 0) + 1
+        health = {
+            'uptime': round(time.time() - self.started_at, 1),
+            'jobs': statuses,
+            'queued': self._queue.qsize() if self._queue else 0,
+            'crawler_warm': self._crawler is not None and self._crawler.extractor._crawler is not None,
+        }
+        if self._crawler is not None:
+            health['circuits'] = self._crawler.extractor.circuits.health()
+        return health
+
+
+def create_app(manager: JobManager):
+    """aiohttp application với các route /jobs"""
+    from aiohttp import web
+
+    def json_response(data, status: int = 200):
+        return web.Response(body=dumps(data), status=status, content_type='application/json')
+
+    def get_job(request) -> CrawlJob:
+        job = manager.get(request.match_info['job_id'])
+        if job is None:
+            raise web.HTTPNotFound(body=dumps({'error': 'job not found'}), content_type='application/json')
+        return job
+
+    async def submit_job(request):
+        try:
+            payload = await request.json()
+            if not isinstance(payload, dict):
+                raise ValueError("Body phải là JSON object")
+            options = {key: payload.get(key) for key in JOB_OPTIONS}
+            job = manager.submit(payload.get('urls'), payload.get('discover'), **options)
+        except ValueError as e:  # JSON lỗi / payload không hợp lệ
+            return json_response({'error': str(e)}, status=400)
+        return json_response(job.summary(), status=202)
+
+    async def list_jobs(request):
+        return json_response([job.summary() for job in manager.jobs.values()])
+
+    async def job_status(request):
+        return json_response(get_job(request).summary())
+
+    async def job_events(request):
+        job = get_job(request)
+        response = web.StreamResponse(headers={'Content-Type': 'application/x-ndjson'})
+        await response.prepare(request)
+        async for event in job.follow(int(request.query.get('since', 0))):
+            await response.write(dumps(event) + b'\n')
+        await response.write_eof()
+        return response
+
+    async def job_results(request):
+        job = get_job(request)
+        include_errors = request.query.get('errors') == '1'
+        results = [r for r in job.results if r is not None and (include_errors or 'error' not in r)]
+        return json_response(results)
+
+    async def cancel_job(request):
+        return json_response(manager.cancel(get_job(request).id).summary())
+
+    async def health(request):
+        return json_response(manager.health())
+
+    async def on_cleanup(app):
+        await manager.close()
+
+    app = web.Application()
+    app.add_routes([
+        web.post('/jobs', submit_job),
+        web.get('/jobs', list_jobs),
+        web.get('/jobs/{job_id}', job_status),
+        web.get('/jobs/{job_id}/events', job_events),
+        web.get('/jobs/{job_id}/results', job_results),
+        web.delete('/jobs/{job_id}', cancel_job),
+        web.get('/health', health),
+    ])
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def main():
+    from aiohttp import web
+
+    parser = argparse.ArgumentParser(description="Local crawl job service")
+    parser.add_argument('--host', default=CrawlerConfig.SERVICE_HOST)
+    parser.add_argument('--port', type=int, default=CrawlerConfig.SERVICE_PORT)
+    parser.add_argument('--snapshot-db', default=None, help="Snapshot store để ưu tiên listing mới/sắp trống")
+    parser.add_argument('--store-db', default=None, help="PropertyStore (SQLite) để ghi kết quả")
+    parser.add_argument('--max-jobs', type=int, default=CrawlerConfig.SERVICE_MAX_JOBS)
+    args = parser.parse_args()
+
+    crawler = None
+    if args.store_db:
+        from crawler_single.property_crawler import EnhancedPropertyCrawler
+        from crawler_single.property_store import PropertyStore
+        crawler = EnhancedPropertyCrawler(store=PropertyStore(args.store_db))
+
+    manager = JobManager(crawler, snapshot_db=args.snapshot_db, max_jobs=args.max_jobs)
+    print(f"🛰️ Crawl service on http://{args.host}:{args.port}")
+    web.run_app(create_app(manager), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,19 +2,41 @@
 Property Crawler Package
 
 Tách từ enhanced_crawler.py thành các module nhỏ hơn để dễ đọc, dễ bảo trì và có thể mở rộng.
+
+Các attribute public được import lazily (PEP 562): `import crawler_single` không
+kéo theo crawl4ai, pydantic hay pyproj cho tới khi thật sự dùng đến.
 """
 
-from .property_crawler import EnhancedPropertyCrawler
-from .property_extractor import PropertyExtractor
-from .config import CrawlerConfig
-from .main import crawl_pages
+import importlib
 
 __version__ = "1.0.0"
 
+# attribute → (module, tên trong module)
+_LAZY_ATTRIBUTES = {
+    "EnhancedPropertyCrawler": ("crawler_single.property_crawler", "EnhancedPropertyCrawler"),
+    "PropertyExtractor": ("crawler_single.property_extractor", "PropertyExtractor"),
+    "CrawlerConfig": ("crawler_single.config", "CrawlerConfig"),
+    "PropertyUtils": ("utils.utils", "PropertyUtils"),
+    "crawl_pages": ("crawler_single.main", "crawl_pages"),
+}
+
 __all__ = [
     "EnhancedPropertyCrawler",
     "PropertyExtractor", 
     "CrawlerConfig",
     "PropertyUtils",
     "crawl_pages"
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attr = _LAZY_ATTRIBUTES[name]
+    value = getattr(importlib.import_module(module_name), attr)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
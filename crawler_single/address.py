@@ -0,0 +1,301 @@
+"""
+Address resolver - tách prefecture/city/district/postcode từ 所在地 (offline)
+
+Dữ liệu khu vực (CSV: postcode,prefecture,city,district) được build thành một
+trie nhị phân, mở bằng mmap nên nhiều process dùng chung page cache và không
+phải parse lại CSV. Tra cứu = longest-prefix match trên địa chỉ đã chuẩn hoá;
+khu vực cấp 町域 (district) chỉ được nhận khi khớp trọn tên (sau đó là số,
+丁目 hoặc hết chuỗi) - 恵比寿 không khớp 恵比寿南, 白金 không khớp 白金台.
+
+crawler_single/data/address_areas.csv chỉ là dữ liệu mẫu (prefecture, 23 区 và
+vài 町域): district/postcode chỉ được điền khi CrawlerConfig.ADDRESS_DATA_PATH trỏ
+tới dataset đầy đủ (vd. KEN_ALL của Japan Post đã chuyển đổi).
+
+    python -m crawler_single.address build areas.csv address_trie.bin
+    python -m crawler_single.address resolve 東京都渋谷区恵比寿4丁目20-3
+
+Trie tự build lần đầu (trong cache dir, không ghi vào package) nếu file .bin
+chưa có hoặc cũ hơn CSV.
+"""
+
+import argparse
+import csv
+import hashlib
+import mmap
+import os
+import re
+import struct
+import unicodedata
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+DEFAULT_AREA_DATA = os.path.join(DATA_DIR, 'address_areas.csv')
+CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'crawler_single')
+
+# File format
+MAGIC = b'ADTR'
+VERSION = 1
+HEADER = struct.Struct('<4sIII')  # magic, version, values_offset, values_count
+NODE = struct.Struct('<iH')  # value index (-1 = không có), số node con
+EDGE = struct.Struct('<II')  # codepoint, offset của node con
+OFFSET = struct.Struct('<I')
+
+NO_VALUE = -1
+AMBIGUOUS = -2  # Alias (không có prefecture) trùng giữa nhiều khu vực
+
+AREA_FIELDS = ('postcode', 'prefecture', 'city', 'district')
+
+POSTCODE_PATTERN = re.compile(r'〒?(\d{3})-?(\d{4})')
+# Ranh giới sau tên 町域: hết chuỗi, số (banchi) hoặc 丁目 (kể cả số kanji)
+DISTRICT_BOUNDARY_PATTERN = re.compile(r'$|\d|[一二三四五六七八九十]*丁目')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def normalize_address(text: str) -> str:
+    """NFKC (full-width → ASCII), bỏ khoảng trắng"""
+    return WHITESPACE_PATTERN.sub('', unicodedata.normalize('NFKC', text or ''))
+
+
+def _postcode_key(postcode: str) -> str:
+    return '#' + postcode.replace('-', '')
+
+
+def default_trie_path(csv_path: str) -> str:
+    """File trie trong cache dir, tên theo đường dẫn CSV (mỗi dataset một file)"""
+    digest = hashlib.sha1(os.path.abspath(csv_path).encode('utf-8')).hexdigest()[:12]
+    return os.path.join(CACHE_DIR, f'address_trie_{digest}.bin')
+
+
+class _BuildNode:
+    __slots__ = ('children', 'value')
+
+    def __init__(self):
+        self.children: Dict[str, '_BuildNode'] = {}
+        self.value = NO_VALUE
+
+
+def build_trie(csv_path: str = DEFAULT_AREA_DATA, output_path: str = None) -> int:
+    """
+    Build file trie từ CSV khu vực, trả về số khu vực
+
+    Key được thêm cho mỗi khu vực:
+      prefecture+city+district, city+district (alias, bỏ nếu trùng) và #postcode
+    """
+    output_path = output_path or default_trie_path(csv_path)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    areas: List[Tuple[str, str, str, str]] = []
+    root = _BuildNode()
+
+    def insert(key: str, value: int, alias: bool = False):
+        node = root
+        for char in key:
+            node = node.children.setdefault(char, _BuildNode())
+        if alias and node.value not in (NO_VALUE, value):
+            node.value = AMBIGUOUS
+        elif not alias or node.value == NO_VALUE:
+            node.value = value
+
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            area = tuple(normalize_address(row.get(field) or '') for field in AREA_FIELDS)
+            postcode, prefecture, city, district = area
+            value = len(areas)
+            areas.append(area)
+
+            insert(prefecture + city + district, value)
+            if city:
+                insert(city + district, value, alias=True)
+            if postcode:
+                insert(_postcode_key(postcode), value)
+
+    # Gán offset theo BFS rồi ghi
+    order: List[_BuildNode] = []
+    offsets: Dict[int, int] = {}
+    position = HEADER.size
+    queue = deque([root])
+    while queue:
+        node = queue.popleft()
+        offsets[id(node)] = position
+        order.append(node)
+        position += NODE.size + EDGE.size * len(node.children)
+        queue.extend(node.children[char] for char in sorted(node.children))
+    values_offset = position
+
+    tmp_path = output_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, values_offset, len(areas)))
+        for node in order:
+            f.write(NODE.pack(node.value, len(node.children)))
+            for char in sorted(node.children):
+                f.write(EDGE.pack(ord(char), offsets[id(node.children[char])]))
+
+        records = ['\t'.join(area).encode('utf-8') for area in areas]
+        record_offset = values_offset + OFFSET.size * (len(records) + 1)
+        for record in records:
+            f.write(OFFSET.pack(record_offset))
+            record_offset += len(record)
+        f.write(OFFSET.pack(record_offset))
+        for record in records:
+            f.write(record)
+    os.replace(tmp_path, output_path)
+    return len(areas)
+
+
+class AddressResolver:
+    """
+    Longest-prefix match trên trie đã mmap, kèm LRU cache theo địa chỉ
+
+    fill_districts=False (dataset mẫu): chỉ nhận prefecture/city, không điền
+    district/postcode từ dữ liệu khu vực.
+    """
+
+    def __init__(self, trie_path: str, cache_size: int = 4096, fill_districts: bool = True):
+        self.trie_path = trie_path
+        self.fill_districts = fill_districts
+        self._file = open(trie_path, 'rb')
+        self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self._values_offset, self._values_count = HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Invalid address trie file: {trie_path}")
+        self._resolve_cached = lru_cache(maxsize=cache_size)(self._resolve)
+
+    @classmethod
+    def from_config(cls, config) -> 'AddressResolver':
+        csv_path = config.ADDRESS_DATA_PATH or DEFAULT_AREA_DATA
+        trie_path = config.ADDRESS_TRIE_PATH or default_trie_path(csv_path)
+        if (not os.path.exists(trie_path) or
+                os.path.getmtime(trie_path) < os.path.getmtime(csv_path)):
+            count = build_trie(csv_path, trie_path)
+            print(f"🏗️ Built address trie ({count} areas): {trie_path}")
+        return cls(trie_path, config.ADDRESS_CACHE_SIZE, fill_districts=bool(config.ADDRESS_DATA_PATH))
+
+    def _child(self, offset: int, char: str) -> Optional[int]:
+        """Binary search node con theo codepoint"""
+        _, count = NODE.unpack_from(self._buffer, offset)
+        base = offset + NODE.size
+        target = ord(char)
+        low, high = 0, count - 1
+        while low <= high:
+            middle = (low + high) // 2
+            codepoint, child_offset = EDGE.unpack_from(self._buffer, base + middle * EDGE.size)
+            if codepoint == target:
+                return child_offset
+            if codepoint < target:
+                low = middle + 1
+            else:
+                high = middle - 1
+        return None
+
+    def prefix_matches(self, text: str) -> List[Tuple[int, int]]:
+        """Mọi (value index, độ dài prefix) có giá trị dọc đường đi của text, ngắn → dài"""
+        offset = HEADER.size
+        matches = []
+        for length, char in enumerate(text, start=1):
+            offset = self._child(offset, char)
+            if offset is None:
+                break
+            value, _ = NODE.unpack_from(self._buffer, offset)
+            if value >= 0:
+                matches.append((value, length))
+        return matches
+
+    def longest_prefix(self, text: str) -> Tuple[int, int]:
+        """(value index, độ dài prefix khớp) của key dài nhất có giá trị; (-1, 0) nếu không có"""
+        matches = self.prefix_matches(text)
+        return matches[-1] if matches else (NO_VALUE, 0)
+
+    def _match_area(self, text: str) -> Tuple[int, int, Optional[Dict[str, Optional[str]]]]:
+        """Khu vực dài nhất được chấp nhận: district phải khớp trọn tên (xem DISTRICT_BOUNDARY_PATTERN)"""
+        for value, length in reversed(self.prefix_matches(text)):
+            area = self.area(value)
+            if area['district'] is None:
+                return value, length, area
+            if self.fill_districts and DISTRICT_BOUNDARY_PATTERN.match(text, length):
+                return value, length, area
+        return NO_VALUE, 0, None
+
+    def area(self, value: int) -> Dict[str, Optional[str]]:
+        position = self._values_offset + value * OFFSET.size
+        start, = OFFSET.unpack_from(self._buffer, position)
+        end, = OFFSET.unpack_from(self._buffer, position + OFFSET.size)
+        parts = self._buffer[start:end].decode('utf-8').split('\t')
+        return {field: part or None for field, part in zip(AREA_FIELDS, parts)}
+
+    def _resolve(self, address: str) -> Tuple[Tuple[str, Optional[str]], ...]:
+        text = normalize_address(address)
+        postcode_match = POSTCODE_PATTERN.match(text)
+        if postcode_match:
+            text = text[postcode_match.end():]
+
+        value, length, area = self._match_area(text)
+        result = dict.fromkeys(AREA_FIELDS)
+        if area is not None:
+            result.update(area)
+            if not self.fill_districts:
+                result['postcode'] = None
+        result['chome_banchi'] = text[length:] or None
+
+        if postcode_match:
+            postcode = f"{postcode_match.group(1)}-{postcode_match.group(2)}"
+            result['postcode'] = postcode
+            if value < 0:
+                postcode_value, _ = self.longest_prefix(_postcode_key(postcode))
+                if postcode_value >= 0 and self.fill_districts:
+                    area = self.area(postcode_value)
+                    result.update({key: area[key] for key in ('prefecture', 'city', 'district')})
+        return tuple(result.items())
+
+    def resolve(self, address: str) -> Dict[str, Optional[str]]:
+        """
+        Tách địa chỉ thành postcode/prefecture/city/district/chome_banchi
+        (field không xác định được = None)
+        """
+        return dict(self._resolve_cached(address or ''))
+
+    def cache_info(self):
+        return self._resolve_cached.cache_info()
+
+    def close(self):
+        self._buffer.close()
+        self._file.close()
+
+
+_default_resolver: Optional[AddressResolver] = None
+
+
+def get_address_resolver() -> AddressResolver:
+    """Resolver dùng chung, build trie khi cần từ CrawlerConfig"""
+    global _default_resolver
+    if _default_resolver is None:
+        from .config import CrawlerConfig
+        _default_resolver = AddressResolver.from_config(CrawlerConfig)
+    return _default_resolver
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline address resolver")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help="Build trie từ CSV khu vực")
+    build_parser.add_argument('csv', nargs='?', default=DEFAULT_AREA_DATA)
+    build_parser.add_argument('output', nargs='?', default=None, help="Mặc định: file trong cache dir")
+
+    resolve_parser = subparsers.add_parser('resolve', help="Tách địa chỉ")
+    resolve_parser.add_argument('addresses', nargs='+')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        output = args.output or default_trie_path(args.csv)
+        count = build_trie(args.csv, output)
+        print(f"🏗️ Built address trie ({count} areas): {output}")
+        return
+
+    resolver = get_address_resolver()
+    for address in args.addresses:
+        print(f"🏠 {address} → {resolver.resolve(address)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Image asset pipeline - tải ảnh gallery song song, dedup bằng perceptual hash
+và lưu content-addressed trên đĩa (không tải lại giữa các lần chạy)
+"""
+
+import asyncio
+import hashlib
+import io
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+
+def dhash(image_bytes: bytes, hash_size: int = 8) -> Optional[int]:
+    """
+    Difference hash 64-bit của ảnh (None nếu không có Pillow hoặc ảnh lỗi)
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            pixels = list(img.convert('L').resize((hash_size + 1, hash_size)).getdata())
+    except Exception:
+        return None
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+class ImageAssetStore:
+    """
+    Kho ảnh content-addressed: <root>/objects/<sha[:2]>/<sha>.<ext>
+
+    index.jsonl (append-only) lưu url → sha256/path/phash để lần chạy sau
+    không phải tải lại ảnh đã có.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.index_path = os.path.join(root, 'index.jsonl')
+        self._index: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()  # put() chạy trong asyncio.to_thread, có thể song song
+        os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self._index[entry['url']] = entry
+
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        """Entry của URL nếu file vẫn còn trên đĩa"""
+        entry = self._index.get(url)
+        if entry and os.path.exists(os.path.join(self.root, entry['path'])):
+            return entry
+        return None
+
+    def put(self, url: str, content: bytes, phash: Optional[int]) -> Dict[str, Any]:
+        """Lưu nội dung ảnh (nếu chưa có) và ghi index"""
+        sha256 = hashlib.sha256(content).hexdigest()
+        ext = os.path.splitext(urlsplit(url).path)[1].lower() or '.bin'
+        relative_path = os.path.join('objects', sha256[:2], sha256 + ext)
+        full_path = os.path.join(self.root, relative_path)
+
+        entry = {'url': url, 'sha256': sha256, 'path': relative_path, 'phash': phash}
+        with self._lock:
+            if not os.path.exists(full_path):
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                tmp_path = full_path + '.tmp'
+                with open(tmp_path, 'wb') as f:
+                    f.write(content)
+                os.replace(tmp_path, full_path)
+
+            self._index[url] = entry
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+        return entry
+
+
+class ImageAssetPipeline:
+    """
+    Stage tuỳ chọn sau extract_image:
+    tải ảnh qua một aiohttp session dùng chung → hash → dedup → cắt theo max_images
+
+    extract_image lấy tới IMAGE_CANDIDATE_LIMIT ảnh ứng viên khi stage này bật,
+    nên ảnh trùng bị loại được bù bằng các ứng viên phía sau.
+    """
+
+    def __init__(self,
+                 root: str = 'image_assets',
+                 max_images: int = 16,
+                 concurrency: int = 8,
+                 timeout: float = 10.0,
+                 phash_threshold: int = 6):
+        self.store = ImageAssetStore(root)
+        self.max_images = max_images
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.phash_threshold = phash_threshold
+        self._session = None
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.downloaded = 0
+        self.reused = 0
+
+    @classmethod
+    def from_config(cls, config) -> 'ImageAssetPipeline':
+        return cls(
+            root=config.IMAGE_ASSET_DIR,
+            max_images=config.MAX_IMAGES,
+            concurrency=config.IMAGE_DOWNLOAD_CONCURRENCY,
+            phash_threshold=config.IMAGE_PHASH_THRESHOLD,
+        )
+
+    async def _get_session(self):
+        if self._session is None:
+            import aiohttp
+
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.concurrency),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'User-Agent': 'Mozilla/5.0 (compatible; crawler)'},
+            )
+        return self._session
+
+    async def _fetch(self, url: str) -> Optional[Dict[str, Any]]:
+        """Lấy entry của ảnh từ store, tải về nếu chưa có"""
+        entry = self.store.lookup(url)
+        if entry:
+            self.reused += 1
+            return entry
+
+        if not url.startswith(('http://', 'https://')):
+            return None
+
+        async with self._semaphore:
+            try:
+                session = await self._get_session()
+                async with session.get(url) as response:
+                    if response.status != 200:
+                        print(f"❌ Image download failed: HTTP {response.status} {url}")
+                        return None
+                    content = await response.read()
+            except Exception as e:
+                print(f"❌ Image download error {url}: {e}")
+                return None
+
+        phash = await asyncio.to_thread(dhash, content)
+        self.downloaded += 1
+        # Ghi file + append index không chặn event loop
+        return await asyncio.to_thread(self.store.put, url, content, phash)
+
+    def _is_duplicate(self, entry: Dict[str, Any], kept: List[Dict[str, Any]]) -> bool:
+        for other in kept:
+            if entry['sha256'] == other['sha256']:
+                return True
+            if (entry.get('phash') is not None and other.get('phash') is not None and
+                    hamming_distance(entry['phash'], other['phash']) <= self.phash_threshold):
+                return True
+        return False
+
+    async def process(self, images: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Tải/tra cứu tất cả ảnh ứng viên, loại ảnh trùng (giữ ảnh xuất hiện trước)
+        rồi mới áp quota: trả về tối đa max_images ảnh duy nhất theo thứ tự ứng viên
+        """
+        if not images:
+            return images
+
+        entries = await asyncio.gather(*(self._fetch(img['url']) for img in images))
+
+        unique_images = []
+        kept_entries = []
+        for img, entry in zip(images, entries):
+            if len(unique_images) >= self.max_images:
+                break
+            if entry is None:
+                # Không tải được → giữ URL như cũ, không dedup được
+                unique_images.append(img)
+                continue
+            if self._is_duplicate(entry, kept_entries):
+                print(f"🪞 Near-duplicate image dropped: {img['url']}")
+                continue
+            kept_entries.append(entry)
+            unique_images.append({**img, 'sha256': entry['sha256'], 'path': entry['path']})
+
+        return unique_images
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
@@ -0,0 +1,229 @@
+"""
+Circuit breaker theo host - fail fast khi site/gallery endpoint đang lỗi hàng loạt
+
+CLOSED ──(tỉ lệ lỗi/chậm trong cửa sổ ≥ ngưỡng)──▶ OPEN ──(hết open_seconds)──▶ HALF_OPEN
+HALF_OPEN ──(probe thành công)──▶ CLOSED,  HALF_OPEN ──(probe lỗi)──▶ OPEN (thời gian mở x2)
+
+Thread-safe: hook gallery chạy trong executor thread, navigation chạy trên event loop.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+from .retry import CircuitOpenError, TRANSIENT, classify_error, classify_exception
+
+# States
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def host_of(url_or_host: str) -> str:
+    if '://' in url_or_host:
+        return (urlsplit(url_or_host).hostname or '').lower()
+    return url_or_host.lower()
+
+
+class HostCircuitBreaker:
+    """Circuit breaker cho một host, với cửa sổ trượt lỗi + latency"""
+
+    def __init__(self,
+                 host: str,
+                 window_size: int = 20,
+                 min_calls: int = 5,
+                 failure_rate: float = 0.5,
+                 slow_call_seconds: Optional[float] = None,
+                 open_seconds: float = 30.0,
+                 max_open_seconds: float = 300.0,
+                 half_open_probes: int = 1):
+        self.host = host
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.base_open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.half_open_probes = half_open_probes
+
+        self.state = CLOSED
+        self.open_seconds = open_seconds
+        self.opened_at = 0.0
+        self.opens = 0
+        self.total_calls = 0
+        self.total_failures = 0
+        self.rejected = 0
+        self._window = deque(maxlen=window_size)  # (failed, latency)
+        self._probes_in_flight = 0
+        self._lock = threading.Lock()
+
+    def _refresh(self, now: float):
+        """OPEN → HALF_OPEN khi hết thời gian mở (gọi khi đang giữ lock)"""
+        if self.state == OPEN and now >= self.opened_at + self.open_seconds:
+            self.state = HALF_OPEN
+            self._probes_in_flight = 0
+            print(f"🟡 Circuit half-open for {self.host}, probing...")
+
+    def _open(self, now: float):
+        self.state = OPEN
+        self.opened_at = now
+        self.opens += 1
+        print(f"🔴 Circuit open for {self.host} ({self.failure_rate():.0%} failures), "
+              f"pausing {self.open_seconds:g}s")
+
+    def retry_in(self) -> float:
+        """Số giây đến khi được probe lại (0 nếu không mở)"""
+        with self._lock:
+            now = time.monotonic()
+            self._refresh(now)
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self.opened_at + self.open_seconds - now)
+
+    def available_slots(self) -> Optional[int]:
+        """Số call mới được phép: None = không giới hạn, 0 = đang mở"""
+        with self._lock:
+            self._refresh(time.monotonic())
+            if self.state == CLOSED:
+                return None
+            if self.state == OPEN:
+                return 0
+            return max(0, self.half_open_probes - self._probes_in_flight)
+
+    def before_call(self):
+        """Raise CircuitOpenError nếu không được gọi (fail fast)"""
+        with self._lock:
+            now = time.monotonic()
+            self._refresh(now)
+            if self.state == CLOSED:
+                return
+            if self.state == HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+                self._probes_in_flight += 1
+                return
+            self.rejected += 1
+            retry_in = max(0.0, self.opened_at + self.open_seconds - now) if self.state == OPEN else 0.0
+        raise CircuitOpenError(self.host, retry_in)
+
+    def cancel_call(self):
+        """Call bị huỷ giữa chừng: trả lại lượt probe, không tính kết quả"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def record(self, success: bool, latency: float):
+        """Ghi nhận kết quả một call (lỗi tạm thời hoặc quá chậm = failure)"""
+        failed = not success or (self.slow_call_seconds is not None and latency >= self.slow_call_seconds)
+        with self._lock:
+            now = time.monotonic()
+            self.total_calls += 1
+            self.total_failures += failed
+
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if failed:
+                    self.open_seconds = min(self.max_open_seconds, self.open_seconds * 2)
+                    self._open(now)
+                else:
+                    self.state = CLOSED
+                    self.open_seconds = self.base_open_seconds
+                    self._window.clear()
+                    print(f"🟢 Circuit closed for {self.host}")
+                return
+
+            self._window.append((failed, latency))
+            if (self.state == CLOSED and len(self._window) >= self.min_calls and
+                    self.failure_rate() >= self.failure_rate_threshold):
+                self._open(now)
+
+    def failure_rate(self) -> float:
+        if not self._window:
+            return 0.0
+        return sum(1 for failed, _ in self._window if failed) / len(self._window)
+
+    def p95_latency(self) -> float:
+        latencies = sorted(latency for _, latency in self._window)
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+    @contextmanager
+    def track(self):
+        """
+        Bọc một call đồng bộ: fail fast khi mở, ghi nhận latency/kết quả.
+        Chỉ lỗi TRANSIENT (timeout, 5xx, 429, network) tính là failure.
+        """
+        self.before_call()
+        start = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            self.record(classify_exception(e) != TRANSIENT, time.monotonic() - start)
+            raise
+        self.record(True, time.monotonic() - start)
+
+    def health(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh(time.monotonic())
+            return {
+                'state': self.state,
+                'failure_rate': round(self.failure_rate(), 3),
+                'p95_latency': round(self.p95_latency(), 3),
+                'calls': self.total_calls,
+                'failures': self.total_failures,
+                'rejected': self.rejected,
+                'opens': self.opens,
+            }
+
+
+class CircuitBreakerRegistry:
+    """Một HostCircuitBreaker cho mỗi host (trang chính và gallery endpoint tách riêng)"""
+
+    def __init__(self, **breaker_options):
+        self.breaker_options = breaker_options
+        self._breakers: Dict[str, HostCircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config) -> 'CircuitBreakerRegistry':
+        return cls(
+            window_size=config.CIRCUIT_WINDOW,
+            min_calls=config.CIRCUIT_MIN_CALLS,
+            failure_rate=config.CIRCUIT_FAILURE_RATE,
+            slow_call_seconds=config.CIRCUIT_SLOW_CALL_SECONDS,
+            open_seconds=config.CIRCUIT_OPEN_SECONDS,
+            max_open_seconds=config.CIRCUIT_MAX_OPEN_SECONDS,
+            half_open_probes=config.CIRCUIT_HALF_OPEN_PROBES,
+        )
+
+    def get(self, url_or_host: str) -> HostCircuitBreaker:
+        host = host_of(url_or_host)
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = HostCircuitBreaker(host, **self.breaker_options)
+                self._breakers[host] = breaker
+            return breaker
+
+    def record_result(self, url: str, latency: float, error: str = None, status_code: int = None):
+        """Ghi nhận kết quả navigation (không raise), chỉ lỗi TRANSIENT tính là failure"""
+        failed = bool(error) and classify_error(error, status_code) == TRANSIENT
+        self.get(url).record(not failed, latency)
+
+    def health(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.host: breaker.health() for breaker in breakers}
+
+
+_default_registry: Optional[CircuitBreakerRegistry] = None
+
+
+def get_circuit_registry() -> CircuitBreakerRegistry:
+    """Registry dùng chung cho navigation và gallery request"""
+    global _default_registry
+    if _default_registry is None:
+        from .config import CrawlerConfig
+        _default_registry = CircuitBreakerRegistry.from_config(CrawlerConfig)
+    return _default_registry
@@ -0,0 +1,158 @@
+"""
+Adaptive concurrency - AIMD controller cho số lượng URL crawl đồng thời
+và limiter cho số tab đang navigate
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Optional
+
+
+def is_overload_error(error: Optional[str] = None, status_code: Optional[int] = None) -> bool:
+    """Check whether a failure means the site is overloaded (timeout, 429, 5xx)"""
+    if status_code is not None and (status_code == 429 or status_code >= 500):
+        return True
+    if error:
+        message = error.lower()
+        return 'timeout' in message or 'timed out' in message
+    return False
+
+
+class AdaptiveConcurrencyController:
+    """
+    Additive-increase / multiplicative-decrease controller cho concurrency.
+
+    - Tăng limit thêm 1 sau mỗi "round" (limit request hoàn thành) nếu
+      p95 latency và error rate của cửa sổ gần nhất vẫn ổn
+    - Giảm limit theo decrease_factor ngay khi gặp timeout, 429 hoặc 5xx,
+      tối đa một lần mỗi cooldown để một loạt lỗi không kéo limit về min
+    """
+
+    def __init__(self,
+                 initial: int = 5,
+                 min_limit: int = 1,
+                 max_limit: int = 20,
+                 target_p95_latency: float = 15.0,
+                 max_error_rate: float = 0.1,
+                 window_size: int = 20,
+                 decrease_factor: float = 0.5,
+                 cooldown: float = 5.0,
+                 verbose: bool = True):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.target_p95_latency = target_p95_latency
+        self.max_error_rate = max_error_rate
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.verbose = verbose
+
+        self.limit = self._clamp(initial)
+        self._samples = deque(maxlen=window_size)
+        self._completed_since_change = 0
+        self._last_decrease = float('-inf')
+
+    def _clamp(self, value: int) -> int:
+        return max(self.min_limit, min(self.max_limit, int(value)))
+
+    def p95_latency(self) -> float:
+        """p95 latency (giây) của cửa sổ gần nhất"""
+        if not self._samples:
+            return 0.0
+        latencies = sorted(latency for latency, _ in self._samples)
+        index = min(len(latencies) - 1, int(round(0.95 * (len(latencies) - 1))))
+        return latencies[index]
+
+    def error_rate(self) -> float:
+        """Tỷ lệ lỗi của cửa sổ gần nhất"""
+        if not self._samples:
+            return 0.0
+        return sum(1 for _, failed in self._samples if failed) / len(self._samples)
+
+    def record(self, latency: float, error: Optional[str] = None, status_code: Optional[int] = None) -> int:
+        """
+        Ghi nhận kết quả một request và điều chỉnh limit
+
+        Returns:
+            Concurrency limit hiện tại
+        """
+        self._samples.append((latency, error is not None))
+        self._completed_since_change += 1
+
+        if is_overload_error(error, status_code):
+            self._decrease(f"overload signal ({status_code or error})")
+            return self.limit
+
+        # Chỉ đánh giá sau mỗi round để tránh phản ứng với nhiễu
+        if self._completed_since_change < self.limit:
+            return self.limit
+
+        p95 = self.p95_latency()
+        error_rate = self.error_rate()
+        if p95 > self.target_p95_latency:
+            self._decrease(f"p95 latency {p95:.1f}s > {self.target_p95_latency:.1f}s")
+        elif error_rate > self.max_error_rate:
+            self._decrease(f"error rate {error_rate:.0%} > {self.max_error_rate:.0%}")
+        elif self.limit < self.max_limit:
+            self._set_limit(self.limit + 1, f"p95 {p95:.1f}s, errors {error_rate:.0%}")
+        else:
+            self._completed_since_change = 0
+
+        return self.limit
+
+    def _decrease(self, reason: str):
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self._set_limit(self.limit * self.decrease_factor, reason)
+
+    def _set_limit(self, value: float, reason: str):
+        new_limit = self._clamp(value)
+        self._completed_since_change = 0
+        if new_limit == self.limit:
+            return
+        if self.verbose:
+            arrow = "📈" if new_limit > self.limit else "📉"
+            print(f"{arrow} Concurrency {self.limit} → {new_limit} ({reason})")
+        self.limit = new_limit
+
+
+class AdjustableLimiter:
+    """
+    Giới hạn số slot dùng đồng thời (vd. tab trình duyệt đang navigate),
+    limit đổi được lúc chạy theo AdaptiveConcurrencyController
+    """
+
+    def __init__(self, limit: int):
+        self._limit = max(1, limit)
+        self.active = 0
+        self._condition = asyncio.Condition()
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    async def set_limit(self, limit: int):
+        async with self._condition:
+            self._limit = max(1, limit)
+            self._condition.notify_all()
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.active < self._limit)
+            self.active += 1
+
+    async def release(self):
+        async with self._condition:
+            self.active -= 1
+            self._condition.notify_all()
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            await self.release()
@@ -1,10 +1,33 @@
-from crawl4ai.async_configs import BrowserConfig, CrawlerRunConfig
+from typing import TYPE_CHECKING
 
-class CrawlerConfig:
-    """Cấu hình cho crawler"""
+if TYPE_CHECKING:
+    from crawl4ai.async_configs import BrowserConfig, CrawlerRunConfig
+
+
+class _LazyConfig:
+    """
+    Descriptor build object cấu hình crawl4ai ở lần truy cập đầu tiên,
+    để `import config` không phải import crawl4ai
+    """
     
-    # Browser configuration
-    BROWSER_CONFIG = BrowserConfig(
+    def __init__(self, factory):
+        self.factory = factory
+        self.name = None
+    
+    def __set_name__(self, owner, name):
+        self.name = name
+    
+    def __get__(self, instance, owner):
+        value = self.factory(owner)
+        # Thay descriptor bằng giá trị đã build cho các lần truy cập sau
+        setattr(owner, self.name, value)
+        return value
+
+
+def _build_browser_config(config) -> "BrowserConfig":
+    from crawl4ai.async_configs import BrowserConfig
+    
+    return BrowserConfig(
         headless=True,
         headers={
             "Accept-Encoding": "gzip, deflate",
@@ -12,22 +35,146 @@ class CrawlerConfig:
         },
         user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
     )
+
+
+def _build_run_config(config) -> "CrawlerRunConfig":
+    from crawl4ai.async_configs import CrawlerRunConfig
     
-    # Crawler run configuration
-    RUN_CONFIG = CrawlerRunConfig(
+    return CrawlerRunConfig(
         wait_for_images=False,
         scan_full_page=False,
+        wait_until="domcontentloaded",
+        wait_for=config.PAGE_READY_CONDITION,
         delay_before_return_html=0.1,
         page_timeout=25000,
         remove_overlay_elements=True
     )
+
+
+class CrawlerConfig:
+    """Cấu hình cho crawler"""
+    
+    # Browser configuration
+    BROWSER_CONFIG = _LazyConfig(_build_browser_config)
+    
+    # Lean page-load profile: chặn tài nguyên không dùng khi extract
+    # (ảnh lấy từ gallery JSON và biến JS inline, không cần browser tải)
+    BLOCK_RESOURCES = True
+    BLOCKED_RESOURCE_TYPES = ['image', 'media', 'font', 'stylesheet']
+    BLOCKED_URL_PATTERNS = [
+        r'google-analytics\.com',
+        r'googletagmanager\.com',
+        r'doubleclick\.net',
+        r'googlesyndication\.com',
+        r'googleadservices\.com',
+        r'facebook\.(?:net|com)',
+        r'yimg\.jp',
+        r'/(?:analytics|gtm|beacon|tracking)[^/]*\.js',
+    ]
+    # Host first-party thêm (CDN riêng, ...); host của các site trong site_registry luôn được phép
+    FIRST_PARTY_HOSTS = []
+    BLOCK_THIRD_PARTY = True
+    
+    # Trả về ngay khi block dt/dd và RF_gallery_url đã có trong DOM
+    # (fallback readyState để trang không có gallery không phải chờ page_timeout)
+    PAGE_READY_CONDITION = """js:() => {
+        const hasDetails = document.querySelector('dt') !== null && document.querySelector('dd') !== null;
+        const hasGallery = typeof window.RF_gallery_url !== 'undefined'
+            || Array.from(document.scripts).some(s => s.text.indexOf('RF_gallery_url') !== -1);
+        return (hasDetails && hasGallery) || document.readyState === 'complete';
+    }"""
+    
+    # Crawler run configuration
+    RUN_CONFIG = _LazyConfig(_build_run_config)
+    
+    # Adaptive concurrency (AIMD) - batch_size chỉ là giá trị khởi đầu
+    MIN_CONCURRENCY = 1
+    MAX_CONCURRENCY = 20
+    TARGET_P95_LATENCY = 15.0  # giây
+    MAX_ERROR_RATE = 0.1
+    CONCURRENCY_WINDOW = 20
+    
+    # Pipeline: dùng chung một trình duyệt; tab được trả ngay khi có HTML nên
+    # trang kế tiếp navigate trong lúc trang trước còn đang extract.
+    # Concurrency ở trên là số tab navigate; đây là số trang extract thêm.
+    EXTRACTION_PIPELINE_DEPTH = 4
+    
+    # Retry (exponential backoff + jitter) cho lỗi tạm thời
+    MAX_ATTEMPTS = 3
+    RETRY_BASE_DELAY = 2.0  # giây
+    RETRY_MAX_DELAY = 30.0  # giây
+    
+    # Circuit breaker theo host (navigation + gallery HTTP): mở khi tỉ lệ lỗi tạm
+    # thời/chậm trong cửa sổ vượt ngưỡng, tạm dừng queue rồi probe half-open
+    CIRCUIT_WINDOW = 20
+    CIRCUIT_MIN_CALLS = 5
+    CIRCUIT_FAILURE_RATE = 0.5
+    CIRCUIT_SLOW_CALL_SECONDS = 20.0  # giây, call chậm hơn tính là failure
+    CIRCUIT_OPEN_SECONDS = 30.0  # giây, x2 mỗi lần probe thất bại
+    CIRCUIT_MAX_OPEN_SECONDS = 300.0  # giây
+    CIRCUIT_HALF_OPEN_PROBES = 1
+    
+    # Budget cho một lần crawl: hết deadline (giây) hoặc đủ số URL → dừng launch,
+    # URL còn lại trả về error_kind 'skipped'. None = không giới hạn
+    CRAWL_DEADLINE = None
+    CRAWL_MAX_URLS = None
+    
+    # Crawl service (python -m crawler_multi.service)
+    SERVICE_HOST = '127.0.0.1'
+    SERVICE_PORT = 8765
+    SERVICE_MAX_JOBS = 100  # số job giữ lại trong bộ nhớ
+    
+    # Profiling giai đoạn extract (python -m crawler_single.profiling để xem báo cáo)
+    PROFILE_EXTRACTION = False
+    PROFILE_SAMPLE_RATE = 0.05  # tỉ lệ URL được cProfile từng hook
+    PROFILE_SLOW_SECONDS = 5.0  # URL extract lâu hơn → ghi thời gian hook + stack mẫu
+    PROFILE_SAMPLE_INTERVAL = 0.005  # giây giữa hai lần lấy mẫu stack
+    PROFILE_DIR = 'profiles'
+    
+    # Distributed crawl (python -m crawler_single.distributed)
+    WORK_QUEUE_URL = 'sqlite:///crawl_queue.db'
+    LEASE_SECONDS = 120.0
+    HEARTBEAT_INTERVAL = 30.0
+    
+    # Memory: tổng HTML đang extract cùng lúc và kích thước tối đa một trang
+    HTML_MEMORY_BUDGET = 64 * 1024 * 1024  # bytes
+    MAX_HTML_BYTES = 16 * 1024 * 1024  # bytes
     
     # Image extraction limits
     MAX_IMAGES = 16
     
+    # Image asset stage (tuỳ chọn): tải ảnh, dedup perceptual, lưu theo nội dung
+    # Cần optional deps `aiohttp` (tải ảnh) và `Pillow` (perceptual hash; thiếu thì chỉ dedup theo sha256)
+    DOWNLOAD_IMAGES = False
+    # Số ảnh ứng viên lấy từ gallery khi DOWNLOAD_IMAGES (dedup trước, rồi mới cắt còn MAX_IMAGES)
+    IMAGE_CANDIDATE_LIMIT = 48
+    IMAGE_ASSET_DIR = 'image_assets'
+    IMAGE_DOWNLOAD_CONCURRENCY = 8
+    IMAGE_PHASH_THRESHOLD = 6  # Hamming distance tối đa để coi là trùng
+    
     # Station limits
     MAX_STATIONS = 5
     
+    # Ga gần nhất (offline, opt-in): đường dẫn dataset ga đầy đủ; None → không điền ga
+    # (crawler_single/data/stations.csv chỉ là dữ liệu mẫu để test)
+    STATION_DATA_PATH = None
+    WALK_SPEED_M_PER_MIN = 80.0
+    STATION_MAX_DISTANCE = 2000.0  # mét
+    
+    # Address resolver (offline trie): ADDRESS_DATA_PATH = dataset khu vực đầy đủ; None →
+    # crawler_single/data/address_areas.csv (dữ liệu mẫu: chỉ prefecture/city, không điền district/postcode)
+    ADDRESS_DATA_PATH = None
+    # None → file trong ~/.cache/crawler_single (không ghi vào package)
+    ADDRESS_TRIE_PATH = None
+    ADDRESS_CACHE_SIZE = 4096
+    
+    # Dịch *_ja → *_en theo batch qua translation memory (SQLite)
+    TRANSLATE_FIELDS = False
+    TRANSLATION_DB = 'translations.db'
+    TRANSLATION_BATCH_SIZE = 50  # số bản ghi gom lại trước khi dịch + ghi store (cả khi không dịch)
+    RECORD_FLUSH_INTERVAL = 2.0  # giây tối đa một bản ghi thành công chờ batch (trước khi stream on_result)
+    TRANSLATOR_FACTORY = 'crawler_single.translation:default_translator'  # "module:function"
+    
     # Skip patterns for images
     IMAGE_SKIP_PATTERNS = ['icon', 'logo', 'button', 'arrow', 'common']
     
@@ -0,0 +1,129 @@
+"""
+CSV export - header cố định (field của PropertyModel + MAX_IMAGES cột ảnh),
+ghi từng dòng với buffer giới hạn
+
+    # Chuyển file kết quả JSON/JSONL có sẵn (bộ nhớ không phụ thuộc kích thước file)
+    python -m crawler_single.csv_export crawl_results_20250101_120000.json -o results.csv
+"""
+
+import argparse
+import csv
+import os
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from utils.serialization import dumps_str, loads
+from utils.utils import FileUtils, JsonStreamUtils
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def csv_fields() -> List[str]:
+    """Header: field của PropertyModel (trừ images) + các cột ảnh image_*_N"""
+    from .record import property_fields
+    return [field for field in property_fields() if field != 'images']
+
+
+def _format_value(value: Any) -> Any:
+    if value is None:
+        return ''
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (dict, list, tuple)):
+        return dumps_str(value)
+    return value
+
+
+class CsvExporter:
+    """
+    Ghi bản ghi ra CSV theo header cố định
+
+    Bản ghi lỗi (có 'error') bị bỏ qua; 'images' chưa flatten được chuyển thành
+    các cột image_url_N/image_category_N; key ngoài header bị bỏ qua.
+    """
+
+    def __init__(self, f, fields: Optional[Sequence[str]] = None, buffer_rows: int = 500):
+        self.fields = list(fields or csv_fields())
+        self.buffer_rows = buffer_rows
+        self._writer = csv.writer(f)
+        self._buffer: List[List[Any]] = []
+        self._image_slots = sum(1 for field in self.fields if field.startswith('image_url_'))
+        self.rows = 0
+        self.skipped = 0
+        self._writer.writerow(self.fields)
+
+    def _row(self, record: Dict[str, Any]) -> List[Any]:
+        values = dict(record.items())
+        images = values.pop('images', None)
+        if isinstance(images, list):
+            for i, img in enumerate(images[:self._image_slots], start=1):
+                if isinstance(img, dict):
+                    values.setdefault(f'image_url_{i}', img.get('url'))
+                    values.setdefault(f'image_category_{i}', img.get('category'))
+        return [_format_value(values.get(field)) for field in self.fields]
+
+    def write(self, record: Dict[str, Any]) -> bool:
+        if not record or 'error' in record:
+            self.skipped += 1
+            return False
+        self._buffer.append(self._row(record))
+        self.rows += 1
+        if len(self._buffer) >= self.buffer_rows:
+            self.flush()
+        return True
+
+    def write_many(self, records: Iterable[Dict[str, Any]]) -> int:
+        for record in records:
+            self.write(record)
+        self.flush()
+        return self.rows
+
+    def flush(self):
+        if self._buffer:
+            self._writer.writerows(self._buffer)
+            self._buffer.clear()
+
+
+def export_csv(records: Iterable[Dict[str, Any]], filename: str, buffer_rows: int = 500) -> int:
+    """Ghi records ra file CSV (UTF-8 có BOM để Excel đọc đúng tiếng Nhật), trả về số dòng"""
+    with open(filename, 'w', encoding='utf-8-sig', newline='') as f:
+        exporter = CsvExporter(f, buffer_rows=buffer_rows)
+        exporter.write_many(records)
+    return exporter.rows
+
+
+def iter_result_file(path: str) -> Iterator[Dict[str, Any]]:
+    """Đọc từng bản ghi từ file kết quả .json (array) hoặc .jsonl, không load cả file"""
+    if os.path.splitext(path)[1].lower() in ('.jsonl', '.ndjson'):
+        with open(path, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    yield loads(line)
+        return
+
+    with open(path, 'rb') as f:
+        yield from JsonStreamUtils.iter_array(iter(lambda: f.read(READ_CHUNK_SIZE), b''))
+
+
+def convert_files(paths: Iterable[str], output: str) -> int:
+    """Gộp các file kết quả JSON/JSONL thành một file CSV"""
+    def records():
+        for path in paths:
+            yield from iter_result_file(path)
+
+    return export_csv(records(), output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export kết quả crawl sang CSV")
+    parser.add_argument('files', nargs='+', help="File crawl_results_*.json hoặc *.jsonl")
+    parser.add_argument('-o', '--output', default=None)
+    args = parser.parse_args()
+
+    output = args.output or FileUtils.generate_filename("crawl_results", "csv")
+    rows = convert_files(args.files, output)
+    print(f"💾 Saved {rows} rows to: {output}")
+
+
+if __name__ == "__main__":
+    main()
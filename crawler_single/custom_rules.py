@@ -2,7 +2,25 @@
 Custom Rules System - Core implementation
 """
 
-from typing import Dict, Any, List, Callable
+import contextvars
+import inspect
+from collections import deque
+from itertools import islice
+from typing import Dict, Any, List, Callable, Iterable, Iterator, Optional, Tuple
+
+# asyncio, concurrent.futures và .profiling được import khi cần:
+# import module này (qua site_registry) không phải trả chi phí đó
+
+# Tắt output của hook/rule (extract_many(quiet=True)); contextvar chỉ ảnh hưởng
+# thread/task hiện tại, không như redirect_stdout đổi sys.stdout của cả process
+quiet_output: contextvars.ContextVar[bool] = contextvars.ContextVar('quiet_output', default=False)
+
+
+def hook_print(*args, **kwargs):
+    """print cho hook/rule, im lặng khi đang chạy batch với quiet=True"""
+    if not quiet_output.get():
+        print(*args, **kwargs)
+
 
 class ExtractionRule:
     def __init__(self, 
@@ -27,44 +45,278 @@ class ExtractionRule:
         try:
             return self.action(html, data)
         except Exception as e:
-            print(f"❌ Error applying rule {self.name}: {e}")
+            hook_print(f"❌ Error applying rule {self.name}: {e}")
             return None
 
+class HookOptions:
+    """Cách chạy một hook trong extract_with_rules / extract_with_rules_async"""
+    
+    def __init__(self,
+                 pass_html: bool = False,
+                 timeout: Optional[float] = None,
+                 offload: bool = False):
+        """
+        Args:
+            pass_html: (post-hook) gọi hook(data, html) thay vì hook(data)
+            timeout: (async hook) số giây tối đa, quá thời gian thì bỏ qua hook
+            offload: (sync hook) chạy trong executor để không chặn event loop
+        """
+        self.pass_html = pass_html
+        self.timeout = timeout
+        self.offload = offload
+
+
 class CustomExtractor:
     def __init__(self):
         self.pre_hooks: List[Callable] = []
         self.post_hooks: List[Callable] = []
+        self._pre_hook_options: List[HookOptions] = []
+        self._post_hook_options: List[HookOptions] = []
         self.rules: Dict[str, List[ExtractionRule]] = {}
     
-    def add_pre_hook(self, hook: Callable[[str, Dict[str, Any]], tuple]):
+    def add_pre_hook(self, hook: Callable[[str, Dict[str, Any]], tuple],
+                     timeout: Optional[float] = None, offload: bool = False):
+        """
+        Args:
+            hook: hook(html, data) -> (html, data), sync hoặc async
+            timeout, offload: xem HookOptions
+        """
         self.pre_hooks.append(hook)
+        self._pre_hook_options.append(HookOptions(timeout=timeout, offload=offload))
     
-    def add_post_hook(self, hook: Callable[[Dict[str, Any]], Dict[str, Any]]):
+    def add_post_hook(self, hook: Callable[..., Dict[str, Any]], pass_html: bool = False,
+                      timeout: Optional[float] = None, offload: bool = False):
+        """
+        Args:
+            hook: hook(data) hoặc hook(data, html) nếu pass_html=True, sync hoặc async
+            pass_html: Truyền HTML (đã qua pre-hooks) trực tiếp cho hook, thay vì
+                       lưu HTML trong data dict suốt pipeline
+            timeout, offload: xem HookOptions
+        
+        Các async post-hook đứng liền nhau được await đồng thời (chỉ trong
+        extract_with_rules_async), nên chúng phải cập nhật data tại chỗ.
+        """
         self.post_hooks.append(hook)
+        self._post_hook_options.append(HookOptions(pass_html=pass_html, timeout=timeout, offload=offload))
     
-    def extract_with_rules(self, html: str, data: Dict[str, Any]) -> Dict[str, Any]:
-        # Run pre-hooks
-        for hook in self.pre_hooks:
-            try:
-                html, data = hook(html, data)
-            except Exception as e:
-                print(f"❌ Error in pre-hook: {e}")
-        
-        # Apply extraction rules
+    def _apply_rules(self, html: str, data: Dict[str, Any]):
         for field, rules in self.rules.items():
             for rule in rules:
                 if rule.can_apply(html, data):
                     value = rule.apply(html, data)
                     if value is not None:
                         data[field] = value
-                        print(f"✅ Applied rule '{rule.name}' for field '{field}': {value}")
+                        hook_print(f"✅ Applied rule '{rule.name}' for field '{field}': {value}")
                         break
+    
+    def extract_with_rules(self, html: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        return self._compile_sync()(html, data)
+    
+    def _compile_sync(self) -> Callable[[str, Optional[Dict[str, Any]]], Dict[str, Any]]:
+        """
+        Pipeline đồng bộ (pre-hooks → rules → post-hooks) với hook, options và
+        profile đã resolve sẵn; extract_many build một lần cho cả batch
+        """
+        pre_hooks = [_profiled(_hook_name(hook), _sync_callable(hook)) for hook in self.pre_hooks]
+        apply_rules = _profiled('rules', self._apply_rules)
+        post_hooks = [
+            (_profiled(_hook_name(hook), _sync_callable(hook)), options.pass_html)
+            for hook, options in zip(self.post_hooks, self._post_hook_options)
+        ]
         
-        # Run post-hooks
-        for hook in self.post_hooks:
+        def run(html: str, data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+            data = {} if data is None else data
+            # Run pre-hooks
+            for hook in pre_hooks:
+                try:
+                    html, data = hook(html, data)
+                except Exception as e:
+                    hook_print(f"❌ Error in pre-hook: {e}")
+            
+            # Apply extraction rules
+            apply_rules(html, data)
+            
+            # Run post-hooks
+            for hook, pass_html in post_hooks:
+                try:
+                    data = hook(data, html) if pass_html else hook(data)
+                except Exception as e:
+                    hook_print(f"❌ Error in post-hook: {e}")
+            return data
+        
+        return run
+    
+    async def extract_with_rules_async(self, html: str, data: Dict[str, Any], executor=None) -> Dict[str, Any]:
+        """
+        Như extract_with_rules nhưng không chặn event loop:
+        
+        - async hook được await (có timeout nếu đăng ký với timeout=...)
+        - các async post-hook liền nhau chạy đồng thời (asyncio.gather)
+        - sync hook đăng ký với offload=True chạy trong executor
+          (None = default executor của loop)
+        """
+        import asyncio
+        
+        # Run pre-hooks (tuần tự vì mỗi hook nhận HTML của hook trước)
+        for hook, options in zip(self.pre_hooks, self._pre_hook_options):
             try:
-                data = hook(data)
+                html, data = await _call_async(hook, options, executor, html, data)
+            except asyncio.TimeoutError:
+                hook_print(f"⏰ Pre-hook timed out: {_hook_name(hook)}")
             except Exception as e:
-                print(f"❌ Error in post-hook: {e}")
+                hook_print(f"❌ Error in pre-hook: {e}")
+        
+        # Apply extraction rules
+        _profiled('rules', self._apply_rules)(html, data)
+        
+        # Run post-hooks
+        hooks = list(zip(self.post_hooks, self._post_hook_options))
+        index = 0
+        while index < len(hooks):
+            hook, options = hooks[index]
+            if not inspect.iscoroutinefunction(hook):
+                try:
+                    data = await _call_async(hook, options, executor, *_post_hook_args(options, data, html))
+                except Exception as e:
+                    hook_print(f"❌ Error in post-hook: {e}")
+                index += 1
+                continue
+            
+            # Nhóm các async hook liền nhau → await đồng thời
+            group = []
+            while index < len(hooks) and inspect.iscoroutinefunction(hooks[index][0]):
+                group.append(hooks[index])
+                index += 1
+            outcomes = await asyncio.gather(
+                *(_call_async(hook, options, executor, *_post_hook_args(options, data, html))
+                  for hook, options in group),
+                return_exceptions=True
+            )
+            for (hook, _), outcome in zip(group, outcomes):
+                if isinstance(outcome, asyncio.TimeoutError):
+                    hook_print(f"⏰ Post-hook timed out: {_hook_name(hook)}")
+                elif isinstance(outcome, Exception):
+                    hook_print(f"❌ Error in post-hook: {outcome}")
+                elif outcome is not None and outcome is not data:
+                    data.update(outcome)
+        
+        return data
+    
+    def extract_many(self,
+                     items: Iterable[Tuple[str, Optional[Dict[str, Any]]]],
+                     processes: int = 0,
+                     factory: Callable[[], 'CustomExtractor'] = None,
+                     chunksize: int = 32,
+                     quiet: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        Batch API: chạy rules trên nhiều (html, data), yield kết quả theo đúng thứ tự
+        
+        Args:
+            items: Iterable các cặp (html, data); data=None → dict rỗng
+            processes: > 1 để chia việc cho nhiều worker process
+            factory: Hàm module-level (picklable) build extractor trong mỗi worker,
+                     bắt buộc khi processes > 1
+            chunksize: Số trang gửi cho worker mỗi lần (giảm chi phí IPC)
+            quiet: Bỏ output hook_print của hooks (chi phí lớn khi chạy hàng nghìn trang)
+        """
+        if processes and processes > 1:
+            if factory is None:
+                raise ValueError("factory is required when processes > 1")
+            yield from _extract_many_in_processes(items, processes, factory, chunksize, quiet)
+            return
         
-        return data
\ No newline at end of file
+        run = self._compile_sync()
+        if not quiet:
+            for html, data in items:
+                yield run(html, data)
+            return
+        
+        # Chạy trong context riêng để quiet không lọt ra code đang duyệt generator
+        context = contextvars.copy_context()
+        context.run(quiet_output.set, True)
+        for html, data in items:
+            yield context.run(run, html, data)
+
+
+def _hook_name(hook: Callable) -> str:
+    return getattr(hook, '__name__', repr(hook))
+
+
+def _post_hook_args(options: HookOptions, data: Dict[str, Any], html: str) -> tuple:
+    return (data, html) if options.pass_html else (data,)
+
+
+def _current_profile():
+    from .profiling import current_profile
+    return current_profile.get()
+
+
+def _profiled(name: str, func: Callable) -> Callable:
+    """Bọc hàm đồng bộ bằng profile của URL hiện tại (nếu đang profile)"""
+    profile = _current_profile()
+    return profile.wrap(name, func) if profile is not None else func
+
+
+def _sync_callable(hook: Callable) -> Callable:
+    """Hook gọi được từ code đồng bộ; kết quả awaitable được chạy tới khi xong bằng asyncio.run"""
+    def call(*args):
+        result = hook(*args)
+        if inspect.isawaitable(result):
+            import asyncio
+            return asyncio.run(result)
+        return result
+    
+    return call if inspect.iscoroutinefunction(hook) else hook
+
+
+async def _call_async(hook: Callable, options: HookOptions, executor, *args):
+    """Gọi hook từ event loop: await async hook (có timeout), offload sync hook nếu cần"""
+    import asyncio
+    
+    if inspect.iscoroutinefunction(hook):
+        profile = _current_profile()
+        awaitable = hook(*args)
+        if profile is not None:
+            awaitable = profile.time_async(_hook_name(hook), awaitable)
+        return await asyncio.wait_for(awaitable, timeout=options.timeout)
+    # Lấy profile trên event loop: contextvar không đi theo sang executor thread
+    hook = _profiled(_hook_name(hook), hook)
+    if options.offload:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, hook, *args)
+    return hook(*args)
+
+
+# Pipeline của worker process (build một lần bởi initializer)
+_worker_run: Optional[Callable[[str, Optional[Dict[str, Any]]], Dict[str, Any]]] = None
+
+
+def _init_worker(factory: Callable[[], CustomExtractor], quiet: bool):
+    global _worker_run
+    _worker_run = factory()._compile_sync()
+    # Worker process chỉ chạy extract → đặt một lần cho cả process
+    quiet_output.set(quiet)
+
+
+def _extract_chunk(chunk: List[Tuple[str, Optional[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+    return [_worker_run(html, data) for html, data in chunk]
+
+
+def _extract_many_in_processes(items, processes: int, factory, chunksize: int, quiet: bool) -> Iterator[Dict[str, Any]]:
+    """Gửi từng chunk cho worker, giới hạn số chunk đang chờ để không giữ hết HTML trong bộ nhớ"""
+    from concurrent.futures import ProcessPoolExecutor
+    
+    iterator = iter(items)
+    max_pending = processes * 2
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(factory, quiet)) as pool:
+        pending = deque()
+        while True:
+            chunk = list(islice(iterator, chunksize))
+            if not chunk:
+                break
+            pending.append(pool.submit(_extract_chunk, chunk))
+            if len(pending) >= max_pending:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
@@ -0,0 +1,23 @@
+"""
+Distributed crawl mode - coordinator/worker trên một work queue dùng chung
+"""
+
+from .work_queue import (
+    WorkQueue,
+    InMemoryWorkQueue,
+    SQLiteWorkQueue,
+    RedisWorkQueue,
+    open_work_queue,
+)
+from .worker import CrawlWorker
+from .coordinator import Coordinator
+
+__all__ = [
+    "WorkQueue",
+    "InMemoryWorkQueue",
+    "SQLiteWorkQueue",
+    "RedisWorkQueue",
+    "open_work_queue",
+    "CrawlWorker",
+    "Coordinator",
+]
@@ -0,0 +1,75 @@
+"""
+CLI cho distributed crawl
+
+    # Node coordinator: seed URL rồi theo dõi/requeue đến khi xong
+    python -m crawler_single.distributed seed --queue sqlite:///crawl_queue.db urls.txt
+    python -m crawler_single.distributed coordinator --queue sqlite:///crawl_queue.db
+
+    # Mỗi node worker
+    python -m crawler_single.distributed worker --queue sqlite:///crawl_queue.db --concurrency 5
+
+    # Export kết quả
+    python -m crawler_single.distributed export --queue sqlite:///crawl_queue.db --output results.json
+"""
+
+import argparse
+import asyncio
+
+from ..config import CrawlerConfig
+from ..retry import RetryPolicy
+from .coordinator import Coordinator
+from .work_queue import open_work_queue
+from .worker import CrawlWorker
+
+
+def read_urls(path: str):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distributed property crawl")
+    parser.add_argument('command', choices=['seed', 'coordinator', 'worker', 'export', 'stats'])
+    parser.add_argument('url_file', nargs='?', help="File chứa URL (mỗi dòng một URL) cho lệnh seed")
+    parser.add_argument('--queue', default=CrawlerConfig.WORK_QUEUE_URL, help="sqlite:///path.db | redis://host:6379/0")
+    parser.add_argument('--concurrency', type=int, default=5, help="Concurrency khởi đầu của worker")
+    parser.add_argument('--worker-id', default=None)
+    parser.add_argument('--output', default=None, help="File JSON kết quả")
+    parser.add_argument('--keep-alive', action='store_true', help="Worker không thoát khi queue rỗng")
+    args = parser.parse_args()
+
+    retry_policy = RetryPolicy(
+        max_attempts=CrawlerConfig.MAX_ATTEMPTS,
+        base_delay=CrawlerConfig.RETRY_BASE_DELAY,
+        max_delay=CrawlerConfig.RETRY_MAX_DELAY,
+    )
+    queue = open_work_queue(args.queue, max_attempts=CrawlerConfig.MAX_ATTEMPTS, retry_policy=retry_policy)
+    coordinator = Coordinator(queue)
+
+    try:
+        if args.command == 'seed':
+            if not args.url_file:
+                parser.error("seed cần url_file")
+            coordinator.seed(read_urls(args.url_file))
+        elif args.command == 'coordinator':
+            asyncio.run(coordinator.run(args.output))
+        elif args.command == 'worker':
+            worker = CrawlWorker(
+                queue,
+                worker_id=args.worker_id,
+                initial_concurrency=args.concurrency,
+                lease_seconds=CrawlerConfig.LEASE_SECONDS,
+                heartbeat_interval=CrawlerConfig.HEARTBEAT_INTERVAL,
+                exit_when_drained=not args.keep_alive,
+            )
+            asyncio.run(worker.run())
+        elif args.command == 'export':
+            coordinator.export_results(args.output)
+        else:
+            coordinator.progress()
+    finally:
+        queue.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Coordinator - seed URL, requeue lease hết hạn, theo dõi tiến độ và export kết quả
+"""
+
+import asyncio
+from typing import Dict, Iterable, Optional
+
+from .work_queue import WorkQueue, PENDING, LEASED, DONE, FAILED
+
+
+class Coordinator:
+    def __init__(self, queue: WorkQueue, poll_interval: float = 10.0):
+        self.queue = queue
+        self.poll_interval = poll_interval
+
+    def seed(self, urls: Iterable[str]) -> int:
+        """Đưa URL vào queue (URL đã có được bỏ qua)"""
+        added = self.queue.enqueue(urls)
+        print(f"🌱 Seeded {added} new URLs")
+        return added
+
+    def progress(self) -> Dict[str, int]:
+        stats = self.queue.stats()
+        total = sum(stats.values())
+        print(f"📊 {stats[DONE]}/{total} done, {stats[LEASED]} leased, "
+              f"{stats[PENDING]} pending, {stats[FAILED]} failed")
+        return stats
+
+    async def run(self, output_file: Optional[str] = None) -> Optional[str]:
+        """
+        Requeue lease hết hạn định kỳ cho đến khi queue rỗng, sau đó export kết quả
+
+        Returns:
+            Đường dẫn file JSON kết quả (nếu export)
+        """
+        while True:
+            requeued = self.queue.requeue_expired()
+            if requeued:
+                print(f"♻️ Re-queued {requeued} expired leases")
+            self.progress()
+            if self.queue.is_drained():
+                break
+            await asyncio.sleep(self.poll_interval)
+
+        return self.export_results(output_file)
+
+    def export_results(self, output_file: Optional[str] = None) -> Optional[str]:
+        """Lưu toàn bộ kết quả trong shared sink ra file JSON"""
+        from utils.utils import FileUtils
+
+        return FileUtils.save_json_results(list(self.queue.results()), output_file)
@@ -0,0 +1,560 @@
+"""
+Work queue backends cho distributed crawl (lease + heartbeat + shared result sink)
+
+- SQLiteWorkQueue: mặc định, file SQLite dùng chung giữa các worker process trên
+  cùng một máy (WAL không hoạt động trên network filesystem như NFS/SMB)
+- RedisWorkQueue: tuỳ chọn, cần package `redis` - dùng khi chạy worker trên nhiều node
+- InMemoryWorkQueue: stand-in cục bộ cho test và chạy nhiều worker trong một process
+"""
+
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from utils.serialization import dumps_str, loads
+from ..retry import RetryPolicy
+
+# Task status
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class WorkQueue(ABC):
+    """
+    Interface chung của các backend
+
+    Một URL được worker "lease" trong lease_seconds; worker phải heartbeat để
+    gia hạn. Lease hết hạn được trả lại PENDING (hoặc FAILED nếu đã hết lượt thử).
+
+    complete/fail/release chỉ có hiệu lực khi lease vẫn thuộc về worker gọi và
+    chưa hết hạn (worker chậm không ghi đè URL mà worker khác đang giữ). URL lỗi
+    tạm thời được trả về PENDING với thời điểm sớm nhất được lease lại theo
+    retry_policy (exponential backoff).
+    """
+
+    def __init__(self, max_attempts: int = 3, retry_policy: RetryPolicy = None):
+        self.max_attempts = max_attempts
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=max_attempts)
+
+    def _retry_delay(self, attempts: int) -> float:
+        return self.retry_policy.delay(max(1, attempts))
+
+    @abstractmethod
+    def enqueue(self, urls: Iterable[str]) -> int:
+        """Thêm URL (bỏ qua URL đã có), trả về số URL mới"""
+
+    @abstractmethod
+    def lease(self, worker_id: str, limit: int, lease_seconds: float) -> List[str]:
+        """Lease tối đa limit URL cho worker"""
+
+    @abstractmethod
+    def heartbeat(self, worker_id: str, urls: Iterable[str], lease_seconds: float) -> int:
+        """Gia hạn lease của các URL worker đang giữ, trả về số lease được gia hạn"""
+
+    @abstractmethod
+    def complete(self, url: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        """Ghi kết quả vào shared sink và đánh dấu DONE (False nếu worker không còn giữ lease)"""
+
+    @abstractmethod
+    def fail(self, url: str, worker_id: str, error: str, retry: bool = True) -> bool:
+        """Trả URL về PENDING sau backoff (retry) hoặc đánh dấu FAILED"""
+
+    @abstractmethod
+    def release(self, url: str, worker_id: str, delay: float = 0.0) -> bool:
+        """Trả URL về PENDING sau delay giây mà không tính lượt thử (vd. circuit breaker từ chối)"""
+
+    @abstractmethod
+    def requeue_expired(self) -> int:
+        """Đưa các lease hết hạn về PENDING, trả về số URL bị requeue"""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        """Số URL theo từng status"""
+
+    @abstractmethod
+    def results(self) -> Iterator[Dict[str, Any]]:
+        """Duyệt các kết quả đã hoàn thành"""
+
+    def is_drained(self) -> bool:
+        """Không còn URL pending hoặc đang được lease"""
+        stats = self.stats()
+        return stats.get(PENDING, 0) == 0 and stats.get(LEASED, 0) == 0
+
+    def close(self):
+        pass
+
+
+class InMemoryWorkQueue(WorkQueue):
+    """Backend trong bộ nhớ, thread-safe, cùng semantics với SQLite backend"""
+
+    def __init__(self, max_attempts: int = 3, retry_policy: RetryPolicy = None):
+        super().__init__(max_attempts, retry_policy)
+        self._lock = threading.Lock()
+        self._tasks: Dict[str, Dict[str, Any]] = {}
+        self._results: Dict[str, Dict[str, Any]] = {}
+
+    def enqueue(self, urls: Iterable[str]) -> int:
+        added = 0
+        with self._lock:
+            for url in urls:
+                if url and url not in self._tasks:
+                    self._tasks[url] = {'status': PENDING, 'worker_id': None, 'lease_expires': None,
+                                        'attempts': 0, 'error': None, 'available_at': 0.0}
+                    added += 1
+        return added
+
+    def _requeue_expired_locked(self, now: float) -> int:
+        requeued = 0
+        for task in self._tasks.values():
+            if task['status'] == LEASED and task['lease_expires'] < now:
+                task['status'] = FAILED if task['attempts'] >= self.max_attempts else PENDING
+                task['worker_id'] = None
+                task['lease_expires'] = None
+                requeued += task['status'] == PENDING
+        return requeued
+
+    def lease(self, worker_id: str, limit: int, lease_seconds: float) -> List[str]:
+        now = time.time()
+        leased = []
+        with self._lock:
+            self._requeue_expired_locked(now)
+            for url, task in self._tasks.items():
+                if len(leased) >= limit:
+                    break
+                if task['status'] == PENDING and task['available_at'] <= now:
+                    task.update(status=LEASED, worker_id=worker_id,
+                                lease_expires=now + lease_seconds, attempts=task['attempts'] + 1)
+                    leased.append(url)
+        return leased
+
+    def heartbeat(self, worker_id: str, urls: Iterable[str], lease_seconds: float) -> int:
+        expires = time.time() + lease_seconds
+        extended = 0
+        with self._lock:
+            for url in urls:
+                task = self._tasks.get(url)
+                if task and task['status'] == LEASED and task['worker_id'] == worker_id:
+                    task['lease_expires'] = expires
+                    extended += 1
+        return extended
+
+    def _owned_task(self, url: str, worker_id: str, now: float):
+        task = self._tasks.get(url)
+        if (task and task['status'] == LEASED and task['worker_id'] == worker_id
+                and task['lease_expires'] > now):
+            return task
+        return None
+
+    def complete(self, url: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        with self._lock:
+            task = self._owned_task(url, worker_id, time.time())
+            if task is None:
+                return False
+            self._results[url] = result
+            task.update(status=DONE, lease_expires=None, error=None)
+            return True
+
+    def fail(self, url: str, worker_id: str, error: str, retry: bool = True) -> bool:
+        now = time.time()
+        with self._lock:
+            task = self._owned_task(url, worker_id, now)
+            if task is None:
+                return False
+            can_retry = retry and task['attempts'] < self.max_attempts
+            task.update(status=PENDING if can_retry else FAILED,
+                        worker_id=None, lease_expires=None, error=error,
+                        available_at=now + self._retry_delay(task['attempts']) if can_retry else 0.0)
+            return True
+
+    def release(self, url: str, worker_id: str, delay: float = 0.0) -> bool:
+        now = time.time()
+        with self._lock:
+            task = self._owned_task(url, worker_id, now)
+            if task is None:
+                return False
+            task.update(status=PENDING, worker_id=None, lease_expires=None,
+                        attempts=max(0, task['attempts'] - 1), available_at=now + delay)
+            return True
+
+    def requeue_expired(self) -> int:
+        with self._lock:
+            return self._requeue_expired_locked(time.time())
+
+    def stats(self) -> Dict[str, int]:
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        with self._lock:
+            for task in self._tasks.values():
+                counts[task['status']] += 1
+        return counts
+
+    def results(self) -> Iterator[Dict[str, Any]]:
+        with self._lock:
+            results = list(self._results.values())
+        return iter(results)
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """
+    Backend SQLite (WAL). Mỗi lease chạy trong BEGIN IMMEDIATE nên nhiều
+    worker process trên cùng một máy có thể dùng chung một file mà không lease
+    trùng URL. Không đặt file trên network filesystem; nhiều node → RedisWorkQueue.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS tasks (
+        url TEXT PRIMARY KEY,
+        status TEXT NOT NULL DEFAULT 'pending',
+        worker_id TEXT,
+        lease_expires REAL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        last_error TEXT,
+        updated_at REAL,
+        available_at REAL NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status, lease_expires);
+    CREATE TABLE IF NOT EXISTS results (
+        url TEXT PRIMARY KEY,
+        worker_id TEXT,
+        result TEXT NOT NULL,
+        completed_at REAL
+    );
+    """
+
+    def __init__(self, path: str = 'crawl_queue.db', max_attempts: int = 3, retry_policy: RetryPolicy = None):
+        super().__init__(max_attempts, retry_policy)
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(self.SCHEMA)
+        # File queue tạo trước khi có cột available_at
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(tasks)")}
+        if 'available_at' not in columns:
+            self._conn.execute("ALTER TABLE tasks ADD COLUMN available_at REAL NOT NULL DEFAULT 0")
+
+    def _transaction(self):
+        return _ImmediateTransaction(self._conn)
+
+    def enqueue(self, urls: Iterable[str]) -> int:
+        now = time.time()
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO tasks (url, status, updated_at) VALUES (?, 'pending', ?)",
+                ((url, now) for url in urls if url)
+            )
+            return conn.total_changes - before
+
+    def _requeue_expired_in(self, conn: sqlite3.Connection, now: float) -> int:
+        conn.execute(
+            "UPDATE tasks SET status = 'failed', worker_id = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+            (now, now, self.max_attempts)
+        )
+        cursor = conn.execute(
+            "UPDATE tasks SET status = 'pending', worker_id = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE status = 'leased' AND lease_expires < ?",
+            (now, now)
+        )
+        return cursor.rowcount
+
+    def lease(self, worker_id: str, limit: int, lease_seconds: float) -> List[str]:
+        if limit <= 0:
+            return []
+        now = time.time()
+        with self._transaction() as conn:
+            self._requeue_expired_in(conn, now)
+            rows = conn.execute(
+                "SELECT url FROM tasks WHERE status = 'pending' AND available_at <= ? ORDER BY rowid LIMIT ?",
+                (now, limit)
+            ).fetchall()
+            urls = [row[0] for row in rows]
+            conn.executemany(
+                "UPDATE tasks SET status = 'leased', worker_id = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE url = ?",
+                ((worker_id, now + lease_seconds, now, url) for url in urls)
+            )
+        return urls
+
+    def heartbeat(self, worker_id: str, urls: Iterable[str], lease_seconds: float) -> int:
+        now = time.time()
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "UPDATE tasks SET lease_expires = ?, updated_at = ? "
+                "WHERE url = ? AND worker_id = ? AND status = 'leased'",
+                ((now + lease_seconds, now, url, worker_id) for url in urls)
+            )
+            return conn.total_changes - before
+
+    # Điều kiện lease vẫn thuộc worker gọi: (url, worker_id, now)
+    OWNED = "url = ? AND worker_id = ? AND status = 'leased' AND lease_expires > ?"
+
+    def complete(self, url: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        now = time.time()
+        payload = dumps_str(result)
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = 'done', lease_expires = NULL, last_error = NULL, updated_at = ? "
+                f"WHERE {self.OWNED}",
+                (now, url, worker_id, now)
+            )
+            if not cursor.rowcount:
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO results (url, worker_id, result, completed_at) VALUES (?, ?, ?, ?)",
+                (url, worker_id, payload, now)
+            )
+            return True
+
+    def fail(self, url: str, worker_id: str, error: str, retry: bool = True) -> bool:
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(f"SELECT attempts FROM tasks WHERE {self.OWNED}", (url, worker_id, now)).fetchone()
+            if row is None:
+                return False
+            can_retry = retry and row[0] < self.max_attempts
+            conn.execute(
+                "UPDATE tasks SET status = ?, worker_id = NULL, lease_expires = NULL, last_error = ?, "
+                "available_at = ?, updated_at = ? WHERE url = ?",
+                ('pending' if can_retry else 'failed', error,
+                 now + self._retry_delay(row[0]) if can_retry else 0, now, url)
+            )
+            return True
+
+    def release(self, url: str, worker_id: str, delay: float = 0.0) -> bool:
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = 'pending', worker_id = NULL, lease_expires = NULL, "
+                "attempts = MAX(attempts - 1, 0), available_at = ?, updated_at = ? "
+                f"WHERE {self.OWNED}",
+                (now + delay, now, url, worker_id, now)
+            )
+            return bool(cursor.rowcount)
+
+    def requeue_expired(self) -> int:
+        with self._transaction() as conn:
+            return self._requeue_expired_in(conn, time.time())
+
+    def stats(self) -> Dict[str, int]:
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        for status, count in self._conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status"):
+            counts[status] = count
+        return counts
+
+    def results(self) -> Iterator[Dict[str, Any]]:
+        cursor = self._conn.execute("SELECT result FROM results ORDER BY completed_at")
+        for (payload,) in cursor:
+            yield loads(payload)
+
+    def close(self):
+        self._conn.close()
+
+
+class _ImmediateTransaction:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK cho connection autocommit"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
+
+
+class RedisWorkQueue(WorkQueue):
+    """
+    Backend Redis-compatible (tuỳ chọn). Lease và requeue chạy bằng Lua script
+    để pop + ghi lease là một thao tác atomic.
+    """
+
+    # Chuyển URL hết thời gian backoff từ 'delayed' sang 'pending' trước khi lease
+    LEASE_SCRIPT = """
+    local ready = redis.call('ZRANGEBYSCORE', KEYS[5], '-inf', ARGV[4])
+    for _, url in ipairs(ready) do
+        redis.call('ZREM', KEYS[5], url)
+        redis.call('RPUSH', KEYS[1], url)
+    end
+    local leased = {}
+    for i = 1, tonumber(ARGV[1]) do
+        local url = redis.call('LPOP', KEYS[1])
+        if not url then break end
+        redis.call('ZADD', KEYS[2], ARGV[2], url)
+        redis.call('HSET', KEYS[3], url, ARGV[3])
+        redis.call('HINCRBY', KEYS[4], url, 1)
+        table.insert(leased, url)
+    end
+    return leased
+    """
+
+    REQUEUE_SCRIPT = """
+    local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+    local requeued = 0
+    for _, url in ipairs(expired) do
+        redis.call('ZREM', KEYS[1], url)
+        redis.call('HDEL', KEYS[2], url)
+        local attempts = tonumber(redis.call('HGET', KEYS[3], url) or '0')
+        if attempts >= tonumber(ARGV[2]) then
+            redis.call('SADD', KEYS[5], url)
+        else
+            redis.call('RPUSH', KEYS[4], url)
+            requeued = requeued + 1
+        end
+    end
+    return requeued
+    """
+
+    # Lease còn thuộc worker (ARGV[2]) và chưa hết hạn (ARGV[3] = now)
+    _OWNED = """
+    if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] then return 0 end
+    local expires = redis.call('ZSCORE', KEYS[1], ARGV[1])
+    if not expires or tonumber(expires) <= tonumber(ARGV[3]) then return 0 end
+    redis.call('ZREM', KEYS[1], ARGV[1])
+    redis.call('HDEL', KEYS[2], ARGV[1])
+    """
+
+    COMPLETE_SCRIPT = _OWNED + """
+    redis.call('HSET', KEYS[3], ARGV[1], ARGV[4])
+    redis.call('SADD', KEYS[4], ARGV[1])
+    return 1
+    """
+
+    # ARGV[4] = error, ARGV[5] = retry (1/0), ARGV[6] = max_attempts, ARGV[7] = backoff
+    FAIL_SCRIPT = _OWNED + """
+    redis.call('HSET', KEYS[3], ARGV[1], ARGV[4])
+    local attempts = tonumber(redis.call('HGET', KEYS[4], ARGV[1]) or '0')
+    if ARGV[5] == '1' and attempts < tonumber(ARGV[6]) then
+        redis.call('ZADD', KEYS[5], tonumber(ARGV[3]) + tonumber(ARGV[7]), ARGV[1])
+    else
+        redis.call('SADD', KEYS[6], ARGV[1])
+    end
+    return 1
+    """
+
+    # ARGV[4] = delay; hoàn lại lượt thử đã tính khi lease
+    RELEASE_SCRIPT = _OWNED + """
+    if tonumber(redis.call('HGET', KEYS[3], ARGV[1]) or '0') > 0 then
+        redis.call('HINCRBY', KEYS[3], ARGV[1], -1)
+    end
+    redis.call('ZADD', KEYS[4], tonumber(ARGV[3]) + tonumber(ARGV[4]), ARGV[1])
+    return 1
+    """
+
+    def __init__(self, url: str = 'redis://localhost:6379/0', prefix: str = 'crawl', max_attempts: int = 3,
+                 retry_policy: RetryPolicy = None):
+        super().__init__(max_attempts, retry_policy)
+        import redis  # optional dependency
+
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self._lease_script = self._redis.register_script(self.LEASE_SCRIPT)
+        self._requeue_script = self._redis.register_script(self.REQUEUE_SCRIPT)
+        self._complete_script = self._redis.register_script(self.COMPLETE_SCRIPT)
+        self._fail_script = self._redis.register_script(self.FAIL_SCRIPT)
+        self._release_script = self._redis.register_script(self.RELEASE_SCRIPT)
+
+    def _key(self, name: str) -> str:
+        return f"{self.prefix}:{name}"
+
+    def enqueue(self, urls: Iterable[str]) -> int:
+        added = 0
+        for url in urls:
+            if url and self._redis.sadd(self._key('known'), url):
+                self._redis.rpush(self._key('pending'), url)
+                added += 1
+        return added
+
+    def lease(self, worker_id: str, limit: int, lease_seconds: float) -> List[str]:
+        if limit <= 0:
+            return []
+        self.requeue_expired()
+        now = time.time()
+        return self._lease_script(
+            keys=[self._key('pending'), self._key('leases'), self._key('owners'), self._key('attempts'),
+                  self._key('delayed')],
+            args=[limit, now + lease_seconds, worker_id, now],
+        )
+
+    def heartbeat(self, worker_id: str, urls: Iterable[str], lease_seconds: float) -> int:
+        expires = time.time() + lease_seconds
+        extended = 0
+        for url in urls:
+            if self._redis.hget(self._key('owners'), url) == worker_id:
+                self._redis.zadd(self._key('leases'), {url: expires}, xx=True)
+                extended += 1
+        return extended
+
+    def complete(self, url: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        return bool(self._complete_script(
+            keys=[self._key('leases'), self._key('owners'), self._key('results'), self._key('done')],
+            args=[url, worker_id, time.time(), dumps_str(result)],
+        ))
+
+    def fail(self, url: str, worker_id: str, error: str, retry: bool = True) -> bool:
+        attempts = int(self._redis.hget(self._key('attempts'), url) or 0)
+        return bool(self._fail_script(
+            keys=[self._key('leases'), self._key('owners'), self._key('errors'), self._key('attempts'),
+                  self._key('delayed'), self._key('failed')],
+            args=[url, worker_id, time.time(), error, int(retry), self.max_attempts,
+                  self._retry_delay(attempts)],
+        ))
+
+    def release(self, url: str, worker_id: str, delay: float = 0.0) -> bool:
+        return bool(self._release_script(
+            keys=[self._key('leases'), self._key('owners'), self._key('attempts'), self._key('delayed')],
+            args=[url, worker_id, time.time(), delay],
+        ))
+
+    def requeue_expired(self) -> int:
+        return int(self._requeue_script(
+            keys=[self._key('leases'), self._key('owners'), self._key('attempts'),
+                  self._key('pending'), self._key('failed')],
+            args=[time.time(), self.max_attempts],
+        ))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            PENDING: self._redis.llen(self._key('pending')) + self._redis.zcard(self._key('delayed')),
+            LEASED: self._redis.zcard(self._key('leases')),
+            DONE: self._redis.scard(self._key('done')),
+            FAILED: self._redis.scard(self._key('failed')),
+        }
+
+    def results(self) -> Iterator[Dict[str, Any]]:
+        for _, payload in self._redis.hscan_iter(self._key('results')):
+            yield loads(payload)
+
+
+def parse_queue_url(queue_url: str) -> Tuple[str, str]:
+    """'sqlite:///path.db' → ('sqlite', 'path.db')"""
+    scheme, sep, rest = queue_url.partition('://')
+    if not sep:
+        # Đường dẫn trơn → SQLite
+        return 'sqlite', queue_url
+    if scheme == 'sqlite':
+        return scheme, rest[1:] if rest.startswith('/') else rest
+    return scheme, queue_url
+
+
+def open_work_queue(queue_url: str, max_attempts: int = 3, retry_policy: RetryPolicy = None) -> WorkQueue:
+    """
+    Mở backend theo URL:
+        sqlite:///crawl_queue.db (một máy), redis://host:6379/0 (nhiều node), memory://
+    """
+    scheme, location = parse_queue_url(queue_url)
+    if scheme == 'sqlite':
+        return SQLiteWorkQueue(location, max_attempts=max_attempts, retry_policy=retry_policy)
+    if scheme in ('redis', 'rediss'):
+        return RedisWorkQueue(location, max_attempts=max_attempts, retry_policy=retry_policy)
+    if scheme == 'memory':
+        return InMemoryWorkQueue(max_attempts=max_attempts, retry_policy=retry_policy)
+    raise ValueError(f"Unsupported work queue backend: {queue_url}")
@@ -0,0 +1,160 @@
+"""
+Crawl worker - lease URL từ work queue, crawl, heartbeat và trả kết quả về shared sink
+"""
+
+import asyncio
+import os
+import socket
+import uuid
+from collections import Counter
+from typing import Dict, Iterable, List
+
+from ..circuit import host_of
+from ..concurrency import AdaptiveConcurrencyController
+from ..retry import classify_error, is_circuit_open_error, TRANSIENT
+from .work_queue import WorkQueue
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+class CrawlWorker:
+    """
+    Worker chạy trên một node
+
+    - Lease tối đa `concurrency limit` URL một lúc (AIMD như crawl_multiple_properties)
+    - Heartbeat định kỳ để gia hạn lease của URL đang crawl
+    - Lỗi TRANSIENT được trả về queue để node khác/lần sau thử lại (sau backoff)
+    - Circuit của host đang mở/half-open → chỉ giữ số URL mà circuit cho phép,
+      phần còn lại trả về queue mà không tính lượt thử
+    """
+
+    def __init__(self,
+                 queue: WorkQueue,
+                 crawler=None,
+                 worker_id: str = None,
+                 initial_concurrency: int = 5,
+                 lease_seconds: float = 120.0,
+                 heartbeat_interval: float = 30.0,
+                 poll_interval: float = 2.0,
+                 exit_when_drained: bool = True):
+        self._owns_crawler = crawler is None
+        if crawler is None:
+            from ..property_crawler import EnhancedPropertyCrawler
+            crawler = EnhancedPropertyCrawler()
+        self.queue = queue
+        self.crawler = crawler
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = heartbeat_interval
+        self.poll_interval = poll_interval
+        self.exit_when_drained = exit_when_drained
+
+        config = crawler.config
+        self.controller = AdaptiveConcurrencyController(
+            initial=initial_concurrency,
+            min_limit=config.MIN_CONCURRENCY,
+            max_limit=config.MAX_CONCURRENCY,
+            target_p95_latency=config.TARGET_P95_LATENCY,
+            max_error_rate=config.MAX_ERROR_RATE,
+            window_size=config.CONCURRENCY_WINDOW,
+        )
+        self.completed = 0
+        self.failed = 0
+        self._stopping = False
+
+    def stop(self):
+        """Dừng sau khi các URL đang crawl hoàn thành"""
+        self._stopping = True
+
+    async def _heartbeat_loop(self, in_flight: Dict[asyncio.Task, str]):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            if in_flight:
+                self.queue.heartbeat(self.worker_id, list(in_flight.values()), self.lease_seconds)
+
+    def _release(self, url: str):
+        """Trả URL về queue (không tính lượt thử) cho đến khi circuit của host cho probe lại"""
+        breaker = self.crawler.extractor.circuits.get(url)
+        self.queue.release(url, self.worker_id, delay=max(breaker.retry_in(), self.poll_interval))
+
+    def _admit(self, urls: Iterable[str], in_flight: Dict[asyncio.Task, str]) -> List[str]:
+        """Lọc URL vừa lease theo circuit của host navigation"""
+        circuits = self.crawler.extractor.circuits
+        busy = Counter(host_of(url) for url in in_flight.values())
+        admitted = []
+        for url in urls:
+            breaker = circuits.get(url)
+            slots = breaker.available_slots()
+            if slots is None or busy[breaker.host] < slots:
+                busy[breaker.host] += 1
+                admitted.append(url)
+            else:
+                self._release(url)
+        return admitted
+
+    def _handle_result(self, url: str, result: Dict, latency: float):
+        error = result.get('error')
+        status_code = result.get('status_code')
+        if error and is_circuit_open_error(error):
+            # Bị từ chối trước khi gửi request: trả về queue, không tính lượt thử và AIMD
+            self._release(url)
+            return
+        self.controller.record(latency, error=error, status_code=status_code)
+
+        if not error:
+            if self.queue.complete(url, self.worker_id, result):
+                self.completed += 1
+            else:
+                print(f"⚠️ [{self.worker_id}] Lease lost for {url}, result discarded")
+            return
+
+        kind = classify_error(error, status_code)
+        if not self.queue.fail(url, self.worker_id, error, retry=kind == TRANSIENT):
+            print(f"⚠️ [{self.worker_id}] Lease lost for {url}")
+            return
+        self.failed += 1
+        print(f"⚠️ [{self.worker_id}] {kind} failure for {url}: {error}")
+
+    async def run(self) -> Dict[str, int]:
+        """Chạy worker cho đến khi queue rỗng (hoặc stop())"""
+        print(f"👷 Worker {self.worker_id} started")
+        in_flight: Dict[asyncio.Task, str] = {}
+        heartbeat = asyncio.ensure_future(self._heartbeat_loop(in_flight))
+
+        try:
+            while True:
+                # Controller giới hạn số tab navigate, các slot thêm giữ pipeline luôn đầy
+                await self.crawler.extractor.navigation.set_limit(self.controller.limit)
+                window = self.controller.limit + self.crawler.config.EXTRACTION_PIPELINE_DEPTH
+                free_slots = window - len(in_flight)
+                if free_slots > 0 and not self._stopping:
+                    leased = self.queue.lease(self.worker_id, free_slots, self.lease_seconds)
+                    for url in self._admit(leased, in_flight):
+                        task = asyncio.ensure_future(self.crawler._timed_crawl(url))
+                        in_flight[task] = url
+
+                if not in_flight:
+                    if self._stopping or (self.exit_when_drained and self.queue.is_drained()):
+                        break
+                    # Queue chưa rỗng nhưng URL đang bị node khác lease, đang backoff hoặc circuit đang mở
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+
+                done, _ = await asyncio.wait(
+                    in_flight,
+                    timeout=self.poll_interval,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    url = in_flight.pop(task)
+                    result, latency = task.result()
+                    self._handle_result(url, result, latency)
+        finally:
+            heartbeat.cancel()
+            if self._owns_crawler:
+                await self.crawler.close()
+
+        print(f"👷 Worker {self.worker_id} finished: {self.completed} done, {self.failed} failed")
+        return {'completed': self.completed, 'failed': self.failed}
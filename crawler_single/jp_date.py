@@ -0,0 +1,118 @@
+"""
+Parser ngày 入居可能日 tiếng Nhật - grammar compile sẵn một lần + memoize
+
+Các dạng hỗ trợ:
+    即可 / 即入居 / 即日          → ngày tham chiếu (hôm nay)
+    2025年10月上旬 / 初旬         → ngày 5
+    10月中旬                      → ngày 15
+    10月下旬                      → ngày 25
+    2025年10月末                  → ngày cuối tháng
+    2025年10月3日 / 令和7年10月3日 / 10月3日
+    2025/10/3, 2025-10-03, 10/3
+Chữ số full-width (２０２５年) được chuẩn hoá trước khi parse.
+"""
+
+import calendar
+import re
+import unicodedata
+from datetime import date
+from functools import lru_cache
+from typing import Optional
+
+IMMEDIATE_MARKERS = ('即可', '即入居', '即日')
+
+# 上旬/中旬/下旬 → ngày cố định, 末 → ngày cuối tháng
+PERIOD_DAYS = {'上旬': 5, '初旬': 5, '中旬': 15, '下旬': 25}
+
+ERA_START_YEARS = {'令和': 2018, '平成': 1988}
+
+# Thiếu năm: ngày suy ra sớm hơn ngày tham chiếu quá ngưỡng này → hiểu là năm sau
+YEAR_ROLLOVER_DAYS = 183
+
+DATE_PATTERN = re.compile(r'''
+    (?:
+        (?:(?P<era>令和|平成)(?P<era_year>\d{1,2}|元)年|(?P<year>\d{4})年)?
+        (?P<month>\d{1,2})月
+        (?:(?P<day>\d{1,2})日|(?P<period>上旬|初旬|中旬|下旬|末))
+    )
+    |
+    (?:(?P<slash_year>\d{4})[/\-.](?P<slash_month>\d{1,2})[/\-.](?P<slash_day>\d{1,2}))
+    |
+    (?:(?P<short_month>\d{1,2})/(?P<short_day>\d{1,2}))
+''', re.VERBOSE)
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def normalize_text(text: str) -> str:
+    """Full-width → ASCII (NFKC) và bỏ khoảng trắng"""
+    return WHITESPACE_PATTERN.sub('', unicodedata.normalize('NFKC', text))
+
+
+def _resolve_year(match) -> Optional[int]:
+    if match.group('year'):
+        return int(match.group('year'))
+    if match.group('era'):
+        era_year = match.group('era_year')
+        return ERA_START_YEARS[match.group('era')] + (1 if era_year == '元' else int(era_year))
+    if match.group('slash_year'):
+        return int(match.group('slash_year'))
+    return None
+
+
+def _build_date(match, reference: date) -> date:
+    year = _resolve_year(match)
+    month = int(match.group('month') or match.group('slash_month') or match.group('short_month'))
+    explicit_day = match.group('day') or match.group('slash_day') or match.group('short_day')
+    period = match.group('period')
+
+    def day_in(target_year: int) -> int:
+        if explicit_day:
+            return int(explicit_day)
+        if period == '末':
+            return calendar.monthrange(target_year, month)[1]
+        return PERIOD_DAYS[period]
+
+    if year is not None:
+        return date(year, month, day_in(year))
+
+    parsed = date(reference.year, month, day_in(reference.year))
+    if (reference - parsed).days > YEAR_ROLLOVER_DAYS:
+        parsed = date(reference.year + 1, month, day_in(reference.year + 1))
+    return parsed
+
+
+@lru_cache(maxsize=1024)
+def _parse_cached(text: str, reference: date) -> Optional[date]:
+    normalized = normalize_text(text)
+    if not normalized:
+        return None
+    if any(marker in normalized for marker in IMMEDIATE_MARKERS):
+        return reference
+
+    match = DATE_PATTERN.search(normalized)
+    if not match:
+        return None
+    try:
+        return _build_date(match, reference)
+    except ValueError:
+        # Ngày không tồn tại (vd. 2月30日)
+        return None
+
+
+def parse_available_from(text: str, reference: Optional[date] = None) -> Optional[date]:
+    """
+    Parse chuỗi 入居可能日 thành date (None nếu không nhận ra)
+
+    Args:
+        text: Chuỗi đã bỏ tag HTML, vd. '2025年10月上旬'
+        reference: Ngày tham chiếu cho '即可' và năm bị thiếu (mặc định hôm nay)
+    """
+    if not text:
+        return None
+    return _parse_cached(text, reference or date.today())
+
+
+def parse_cache_info():
+    """Thống kê cache (hits/misses) của parser"""
+    return _parse_cached.cache_info()
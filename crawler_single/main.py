@@ -3,13 +3,62 @@ from datetime import datetime
 from .property_crawler import EnhancedPropertyCrawler
 from utils.utils import FileUtils
 
-async def crawl_pages(urls = [], batch_size: int = 5):
+async def crawl_pages(urls = [], batch_size: int = 5, snapshot_db: str = None, full_discovery: bool = False,
+                      store_db: str = None, save_csv: bool = False, prioritize: bool = True,
+                      deadline: float = None, max_urls: int = None):
+    """
+    Crawl danh sách URL và lưu kết quả JSON
+    
+    Args:
+        snapshot_db: Đường dẫn SQLite snapshot store; nếu có, ghi thêm file JSONL
+                     chỉ gồm các thay đổi so với lần crawl trước
+        full_discovery: urls là toàn bộ listing hiện có → listing biến mất được emit delete
+        store_db: Đường dẫn PropertyStore (SQLite); nếu có, bản ghi được ghi thẳng vào store
+        save_csv: Ghi thêm file CSV (header cố định, ảnh thành cột image_url_N/image_category_N)
+        prioritize: Crawl listing mới / sắp trống / vừa thay đổi trước (dựa trên snapshot_db)
+        deadline: Số giây tối đa để launch URL mới; URL còn lại được trả về là 'skipped'
+        max_urls: Số URL tối đa được crawl trong lần này
+    """
     start = datetime.now()
 
-    crawler = EnhancedPropertyCrawler()
+    store = None
+    if store_db:
+        from .property_store import PropertyStore
+        store = PropertyStore(store_db)
+    
+    snapshot_store = None
+    prioritizer = None
+    if snapshot_db:
+        from .snapshot import SnapshotStore
+        snapshot_store = SnapshotStore(snapshot_db)
+        if prioritize:
+            from .priority import CrawlPrioritizer
+            prioritizer = CrawlPrioritizer(snapshot_store)
+    
+    crawler = EnhancedPropertyCrawler(store=store)
     print("\n=== 😶‍🌫️☀️😁😂😑🤷‍♂️ ===")
-    results = await crawler.crawl_multiple_properties(urls, batch_size=batch_size)
+    try:
+        results = await crawler.crawl_multiple_properties(
+            urls, batch_size=batch_size, prioritizer=prioritizer,
+            deadline=deadline, max_urls=max_urls
+        )
+    finally:
+        await crawler.close()
+        if store is not None:
+            store.close()
     json_file = FileUtils.save_json_results(results)
+    csv_file = FileUtils.save_csv_results(results) if save_csv else None
+    
+    changes_file = None
+    if snapshot_store is not None:
+        from .snapshot import SnapshotDiffer
+        try:
+            changes_file = SnapshotDiffer(snapshot_store).write_changes(
+                results,
+                discovered_links=urls if full_discovery else None
+            )
+        finally:
+            snapshot_store.close()
 
     end = datetime.now()
     duration = end - start
@@ -18,6 +67,8 @@ async def crawl_pages(urls = [], batch_size: int = 5):
         === Summary ===
         Total URLs: {len(urls)}
         JSON saved: {json_file or "None"}
+        CSV saved: {csv_file or "None"}
+        Changes saved: {changes_file or "None"}
         Start: {start:%Y%m%d_%H%M%S} | End: {end:%Y%m%d_%H%M%S} | 🕒 Duration: {duration}
     """)
 
@@ -0,0 +1,55 @@
+"""
+HTML memory budget - backpressure toàn cục theo tổng dung lượng HTML đang xử lý
+"""
+
+import asyncio
+import sys
+from contextlib import asynccontextmanager
+
+
+def html_size(html: str) -> int:
+    """Dung lượng bộ nhớ thực của chuỗi HTML (str tiếng Nhật chiếm 2-4 byte/ký tự)"""
+    return sys.getsizeof(html) if html else 0
+
+
+class HtmlMemoryBudget:
+    """
+    Giới hạn tổng số byte HTML đang được extract cùng lúc
+
+    - reserve(n): chờ đến khi còn đủ budget (luôn cho qua nếu đang rỗng, để
+      một trang lớn hơn budget vẫn được xử lý)
+    - over_budget(): scheduler dùng để ngừng mở thêm trang mới
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.in_flight = 0
+        self.peak = 0
+        self._condition = asyncio.Condition()
+
+    def over_budget(self) -> bool:
+        return self.in_flight >= self.max_bytes
+
+    def _has_room(self, nbytes: int) -> bool:
+        return self.in_flight == 0 or self.in_flight + nbytes <= self.max_bytes
+
+    async def acquire(self, nbytes: int):
+        async with self._condition:
+            if not self._has_room(nbytes):
+                print(f"🧠 HTML budget full ({self.in_flight / 1e6:.1f}/{self.max_bytes / 1e6:.1f} MB), waiting...")
+            await self._condition.wait_for(lambda: self._has_room(nbytes))
+            self.in_flight += nbytes
+            self.peak = max(self.peak, self.in_flight)
+
+    async def release(self, nbytes: int):
+        async with self._condition:
+            self.in_flight = max(0, self.in_flight - nbytes)
+            self._condition.notify_all()
+
+    @asynccontextmanager
+    async def reserve(self, nbytes: int):
+        await self.acquire(nbytes)
+        try:
+            yield
+        finally:
+            await self.release(nbytes)
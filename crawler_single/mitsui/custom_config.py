@@ -2,13 +2,16 @@
 Custom Configuration - Optimized version with better performance and structure
 """
 import re
-import requests
-import calendar
-from typing import Dict, Any, Optional, Tuple
-from functools import lru_cache
-from datetime import datetime, date
-from ..custom_rules import CustomExtractor
-from pyproj import CRS, Transformer
+from typing import Dict, Any, Iterator, Optional, Tuple
+from functools import lru_cache, wraps
+from ..config import CrawlerConfig
+from ..custom_rules import CustomExtractor, hook_print
+from ..jp_date import parse_available_from
+from ..stations import fill_station_fields
+from ..address import get_address_resolver
+from ..retry import RetryPolicy, RetryableHTTPError, CircuitOpenError, retry_call
+from ..circuit import get_circuit_registry
+from utils.utils import JsonStreamUtils
 
 # ============================================================================
 # CONSTANTS AND CONFIGURATIONS
@@ -20,6 +23,10 @@ COORDINATE_OFFSET_LON = -5.82497
 DEFAULT_ZONE = 9
 MAX_IMAGES = 16
 GALLERY_TIMEOUT = 5
+GALLERY_CHUNK_SIZE = 8192
+
+# Gallery retry: backoff ngắn vì hook chạy đồng bộ trong lúc extract
+GALLERY_RETRY_POLICY = RetryPolicy(max_attempts=3, base_delay=0.5, max_delay=2.0)
 
 # Default amenities configuration
 DEFAULT_AMENITIES = {
@@ -129,13 +136,26 @@ STRUCTURE_MAPPING = {
 # ============================================================================
 
 @lru_cache(maxsize=32)
-def get_coordinate_transformer(zone: int = DEFAULT_ZONE) -> Transformer:
+def get_coordinate_transformer(zone: int = DEFAULT_ZONE):
     """Get cached coordinate transformer for better performance"""
+    # pyproj nặng, chỉ import khi thật sự cần chuyển đổi tọa độ
+    from pyproj import CRS, Transformer
+    
     epsg_code = 30160 + zone
     crs_xy = CRS.from_epsg(epsg_code)
     crs_wgs84 = CRS.from_epsg(4326)
     return Transformer.from_crs(crs_xy, crs_wgs84, always_xy=True)
 
+# Các vùng HTML không dùng khi extract, bỏ trong một lần duyệt
+HTML_TRIM_PATTERN = re.compile(
+    r'<section[^>]*class="[^"]*--related[^"]*"[^>]*>.*?</section>'
+    r'|この部屋をチェックした人は、こんな部屋もチェックしています。.*?(?=<footer|$)'
+    r'|<style[^>]*>.*?</style>'
+    r'|<svg[^>]*>.*?</svg>'
+    r'|<!--.*?-->',
+    re.DOTALL | re.IGNORECASE
+)
+
 @lru_cache(maxsize=128)
 def compile_regex(pattern: str, flags: int = re.DOTALL | re.IGNORECASE) -> re.Pattern:
     """Cache compiled regex patterns for better performance"""
@@ -153,12 +173,19 @@ class RequestsSession:
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
-            cls._session = requests.Session()
-            cls._session.headers.update({'User-Agent': 'Mozilla/5.0 (compatible; crawler)'})
         return cls._instance
     
-    def get(self, url: str, **kwargs) -> requests.Response:
-        return self._session.get(url, **kwargs)
+    @property
+    def session(self):
+        """Tạo requests.Session ở lần dùng đầu tiên"""
+        if RequestsSession._session is None:
+            import requests
+            RequestsSession._session = requests.Session()
+            RequestsSession._session.headers.update({'User-Agent': 'Mozilla/5.0 (compatible; crawler)'})
+        return RequestsSession._session
+    
+    def get(self, url: str, **kwargs):
+        return self.session.get(url, **kwargs)
 
 # Global session instance
 session = RequestsSession()
@@ -176,17 +203,26 @@ def xy_to_latlon_tokyo(x: float, y: float, zone: int = DEFAULT_ZONE) -> Tuple[fl
     return lat + COORDINATE_OFFSET_LAT, lon + COORDINATE_OFFSET_LON
 
 def parse_japanese_address(address: str) -> dict:
-    """Parse Japanese address to extract chome_banchi"""
+    """
+    Parse Japanese address → postcode/prefecture/city/district/chome_banchi
+    bằng address resolver offline; city không có trong dữ liệu khu vực thì tách
+    city/chome_banchi của phần còn lại bằng regex
+    """
     if not address:
         return {"chome_banchi": None}
     
-    # Use cached regex
-    pattern = compile_regex(r'^(?:.*?[都道府県])?(?:.*?[市区町村])?(.*)$')
-    match = pattern.match(address)
+    parts = get_address_resolver().resolve(address)
+    if parts['city']:
+        return parts
     
-    return {
-        "chome_banchi": match.group(1).strip() if match else None
-    }
+    # Use cached regex (vd. 東京都 + 八王子市元本郷町3-24-1 → 八王子市 / 元本郷町3-24-1)
+    remainder = parts['chome_banchi'] if parts['prefecture'] else address
+    pattern = compile_regex(r'^(?:.*?[都道府県])?(.*?[市区町村])?(.*)$')
+    match = pattern.match(remainder or '')
+    if match:
+        parts['city'] = match.group(1)
+        parts['chome_banchi'] = match.group(2).strip() or None
+    return parts
 
 # ============================================================================
 # HTML UTILITIES
@@ -214,19 +250,21 @@ def setup_custom_extractor() -> CustomExtractor:
     Setup optimized custom extractor with better performance and structure
     """
     extractor = CustomExtractor()
+    # Asset stage dedup rồi mới cắt còn MAX_IMAGES → lấy thêm ứng viên để bù ảnh trùng
+    image_limit = CrawlerConfig.IMAGE_CANDIDATE_LIMIT if CrawlerConfig.DOWNLOAD_IMAGES else MAX_IMAGES
     
     # Wrapper for error handling
     def safe_wrapper(callback):
         """Wrapper for safe processing with error handling"""
-        def wrapper_func(data: Dict[str, Any]) -> Dict[str, Any]:
-            html = data.get('_html', '')
+        @wraps(callback)  # giữ tên hook (log lỗi, profiling)
+        def wrapper_func(data: Dict[str, Any], html: str) -> Dict[str, Any]:
             if not html:
                 return data
             
             try:
                 return callback(data, html)
             except Exception as e:
-                print(f"❌ Error in {callback.__name__}: {e}")
+                hook_print(f"❌ Error in {callback.__name__}: {e}")
                 return data
         
         return wrapper_func
@@ -247,70 +285,115 @@ def setup_custom_extractor() -> CustomExtractor:
                     'map_lng': str(lon)
                 })
                 
-                print(f"🗺️ Converted: X={x}, Y={y} → Lat={lat:.6f}, Lng={lon:.6f}")
+                hook_print(f"🗺️ Converted: X={x}, Y={y} → Lat={lat:.6f}, Lng={lon:.6f}")
                 
             except (ValueError, Exception) as e:
-                print(f"❌ Coordinate conversion error: {e}")
+                hook_print(f"❌ Coordinate conversion error: {e}")
         
         return data
     
+    # Ga gần nhất từ tọa độ (index offline, không gọi mạng)
+    def fill_nearest_stations(data: Dict[str, Any], html: str) -> Dict[str, Any]:
+        """Fill station_name_N / train_line_name_N / walk_N"""
+        fill_station_fields(data)
+        if data.get('station_name_1'):
+            hook_print(f"🚉 Nearest station: {data['station_name_1']} ({data['train_line_name_1']}) 徒歩{data['walk_1']}分")
+        return data
+    
     # Xử lý trước khi dùng
     def pass_html(html: str, data: Dict[str, Any]) -> tuple:
-        """Clean HTML before processing with cached regex"""
-        # Remove related sections
-        related_pattern = compile_regex(r'<section[^>]*class="[^"]*--related[^"]*"[^>]*>.*?</section>')
-        html = related_pattern.sub('', html)
-        
-        # Remove Japanese related properties text
-        japanese_pattern = compile_regex(r'この部屋をチェックした人は、こんな部屋もチェックしています。.*?(?=<footer|$)')
-        html = japanese_pattern.sub('', html)
-        
-        data['_html'] = html
+        """
+        Trim HTML before processing: một lần re.sub duy nhất (một bản copy) bỏ
+        related sections, phần "phòng liên quan", <style>, <svg> và comment.
+        HTML được truyền thẳng cho post-hooks, không lưu trong data.
+        """
+        html = HTML_TRIM_PATTERN.sub('', html)
         return html, data
     
     # Xử lý cho hình ảnh
-    def get_gallery_images(html: str) -> Tuple[list, list, list]:
-        """Extract gallery images with optimized request handling"""
-        floorplan_images = []
-        exterior_images = []
-        interior_images = []
+    def iter_gallery_items(gallery_url: str) -> Iterator[Dict[str, Any]]:
+        """
+        Stream gallery JSON, parse từng item; response đóng khi consumer dừng
+        
+        Circuit breaker của gallery host đang mở → CircuitOpenError ngay (không retry)
+        """
+        breaker = get_circuit_registry().get(gallery_url)
+        
+        def open_gallery():
+            with breaker.track():
+                response = session.get(gallery_url, timeout=GALLERY_TIMEOUT, stream=True)
+                if response.status_code != 200:
+                    response.close()
+                    raise RetryableHTTPError(response.status_code)
+                return response
+        
+        hook_print(f"🖼️ Fetching gallery: {gallery_url}")
+        # retry_call sleep chặn: extract_image luôn được offload sang executor thread
+        response = retry_call(open_gallery, GALLERY_RETRY_POLICY, description="gallery request")
+        try:
+            yield from JsonStreamUtils.iter_array(response.iter_content(chunk_size=GALLERY_CHUNK_SIZE))
+        finally:
+            response.close()
+    
+    def iter_image_candidates(html: str) -> Iterator[Tuple[str, str]]:
+        """
+        Generator (url, category) theo thứ tự ưu tiên: exterior → floorplan → interior
         
+        Gallery chỉ được đọc tới khi consumer dừng lấy (đã đủ image_limit). Interior
+        đứng trước ảnh exterior đầu tiên được giữ tạm (tối đa image_limit ảnh) để
+        giữ đúng thứ tự.
+        """
         # 1. Floor plan
-        firstfloor_url = find(r'RF_firstfloorplan_photo\s*=\s*["\']([^"\']+)["\']', html)
-        if firstfloor_url and firstfloor_url != "null":
-            floorplan_images.append(firstfloor_url)
-
+        floorplan_url = find(r'RF_firstfloorplan_photo\s*=\s*["\']([^"\']+)["\']', html)
+        if floorplan_url == "null":
+            floorplan_url = None
+        
         # 2. Gallery
         gallery_url = find(r'RF_gallery_url\s*=\s*["\']([^"\']+)["\']', html)
         if not gallery_url or gallery_url == "null":
-            return exterior_images, floorplan_images, interior_images
+            if floorplan_url:
+                yield floorplan_url, "floorplan"
+            return
         
+        exterior_found = False
+        pending_interior = []
+        items = iter_gallery_items(gallery_url)
         try:
-            print(f"🖼️ Fetching gallery: {gallery_url}")
-            response = session.get(gallery_url, timeout=GALLERY_TIMEOUT)
-            
-            if response.status_code != 200:
-                print(f"❌ Gallery fetch failed: HTTP {response.status_code}")
-                return exterior_images, floorplan_images, interior_images
-            
-            gallery_data = response.json()
-            for item in gallery_data:
+            for item in items:
                 filename = item.get("filename", "")
                 if not filename:
                     continue
-                    
+                
                 room_no = item.get("ROOM_NO", 0)
-                if room_no == 99999 and not exterior_images:
-                    exterior_images.append(filename)
-                else:
-                    interior_images.append(filename)
-                    
-        except requests.exceptions.Timeout:
-            print("⏰ Gallery request timeout")
+                if room_no == 99999 and not exterior_found:
+                    exterior_found = True
+                    yield filename, "exterior"
+                    if floorplan_url:
+                        yield floorplan_url, "floorplan"
+                    while pending_interior:
+                        yield pending_interior.pop(0), "interior"
+                elif exterior_found:
+                    yield filename, "interior"
+                elif len(pending_interior) < image_limit:
+                    pending_interior.append(filename)
+        except RetryableHTTPError as e:
+            hook_print(f"❌ Gallery fetch failed: HTTP {e.status_code}")
+        except CircuitOpenError as e:
+            hook_print(f"⛔ Gallery skipped: {e}")
         except Exception as e:
-            print(f"❌ Gallery request error: {e}")
+            if any('Timeout' in cls.__name__ for cls in type(e).__mro__):
+                hook_print("⏰ Gallery request timeout")
+            else:
+                hook_print(f"❌ Gallery request error: {e}")
+        finally:
+            items.close()
         
-        return exterior_images, floorplan_images, interior_images
+        # Gallery không có ảnh exterior (hoặc lỗi giữa chừng)
+        if not exterior_found:
+            if floorplan_url:
+                yield floorplan_url, "floorplan"
+            for img_url in pending_interior:
+                yield img_url, "interior"
     
     def extract_image(data: Dict[str, Any], html: str) -> Dict[str, Any]:
         images_list = []
@@ -319,7 +402,7 @@ def setup_custom_extractor() -> CustomExtractor:
 
         def add_image(img_url: str, category: str) -> bool:
             """Add image if not duplicate and under limit"""
-            if (len(images_list) >= MAX_IMAGES or 
+            if (len(images_list) >= image_limit or 
                 img_url in used_urls or 
                 img_url.split('/')[-1] in used_names):
                 return False
@@ -329,28 +412,21 @@ def setup_custom_extractor() -> CustomExtractor:
             used_names.add(img_url.split('/')[-1])
             return True
 
+        # Exterior 1 ảnh, floorplan 1 ảnh, interior cho đến khi đủ image_limit
+        candidates = iter_image_candidates(html)
         try:
-            exterior_images, floorplan_images, interior_images = get_gallery_images(html)
-
-            # Exterior → lấy đúng 1 ảnh
-            if exterior_images:
-                add_image(exterior_images[0], "exterior")
-
-            # Floorplan → lấy đúng 1 ảnh
-            if floorplan_images:
-                add_image(floorplan_images[0], "floorplan")
-
-            # Interior → lấy nhiều cho đến khi đủ MAX_IMAGES
-            for img_url in interior_images:
-                print("print", img_url)
-                add_image(img_url, "interior")
-
+            for img_url, category in candidates:
+                add_image(img_url, category)
+                if len(images_list) >= image_limit:
+                    break
         except Exception as e:
-            print(f"❌ Image extraction error: {e}")
+            hook_print(f"❌ Image extraction error: {e}")
+        finally:
+            candidates.close()
 
         if images_list:
             data['images'] = images_list
-            print(f"🎯 Total images: {len(images_list)}")
+            hook_print(f"🎯 Total images: {len(images_list)}")
 
         return data
 
@@ -379,21 +455,20 @@ def setup_custom_extractor() -> CustomExtractor:
                     "numeric_guarantor_max": total_monthly * 80 // 100,
                 })
                 
-                print(f"💰 Calculated pricing: total={total_monthly}円")
+                hook_print(f"💰 Calculated pricing: total={total_monthly}円")
             else:
-                print(f"⚠️ Invalid total monthly amount: {total_monthly}")
+                hook_print(f"⚠️ Invalid total monthly amount: {total_monthly}")
 
         except Exception as e:
-            print(f"❌ Error processing pricing: {e}")
+            hook_print(f"❌ Error processing pricing: {e}")
 
         return data
     
     # Làm sạch các biến temp
     def cleanup_temp_fields(data: Dict[str, Any], html: str) -> Dict[str, Any]:
         """Remove temporary fields that shouldn't be in final JSON"""
-        if '_html' in data:
-            del data['_html']
-            print("🧹 Cleaned up temporary _html field")
+        for key in [key for key in data if key.startswith('_')]:
+            del data[key]
         return data
     
     # Xử lý nội dung tĩnh - Optimized with modular approach
@@ -402,7 +477,7 @@ def setup_custom_extractor() -> CustomExtractor:
         try:
             h1_content = find(r'<h1[^>]*>(.*?)</h1>', html)
             if not h1_content:
-                print("⚠️ No h1 tag found")
+                hook_print("⚠️ No h1 tag found")
                 return
             
             h1_text = clean_html(h1_content)
@@ -421,11 +496,11 @@ def setup_custom_extractor() -> CustomExtractor:
                 })
                 
         except Exception as e:
-            print(f"❌ Error extracting header info: {e}")
+            hook_print(f"❌ Error extracting header info: {e}")
 
     def extract_available_from(data: Dict[str, Any], html: str):
         """
-        Trích 入居可能日, chuyển đổi thành date object.
+        Trích 入居可能日, chuyển đổi thành ngày ISO (xem crawler_single.jp_date).
         - '即可' -> hôm nay
         - '上旬' -> ngày 5
         - '中旬' -> ngày 15
@@ -438,49 +513,15 @@ def setup_custom_extractor() -> CustomExtractor:
             if not text:
                 return
 
-            current_year = datetime.now().year
-            parsed_date = None
-
-            if "即可" in text:
-                parsed_date = date.today()
-                print(f"📅 Available immediately: {parsed_date}")
-            else:
-                # 上旬/中旬/下旬 → ngày cố định
-                for key, day in {"上旬": "5日", "中旬": "15日", "下旬": "25日"}.items():
-                    text = re.sub(rf'(\d{{4}}年)?(\d{{1,2}})月{key}', 
-                                lambda m: f"{m.group(1) or str(current_year)+'年'}{m.group(2)}月{day}", 
-                                text)
-
-                # 月末 → ngày cuối tháng
-                m = re.search(r'(\d{4})?年?(\d{1,2})月末', text)
-                if m:
-                    year = int(m.group(1)) if m.group(1) else current_year
-                    month = int(m.group(2))
-                    last_day = calendar.monthrange(year, month)[1]
-                    text = f"{year}年{month}月{last_day}日"
-
-                # regex patterns
-                patterns = [
-                    (r'(\d{4})年(\d{1,2})月(\d{1,2})日', lambda y,m,d: date(int(y), int(m), int(d))),
-                    (r'(\d{1,2})月(\d{1,2})日',          lambda m,d: date(current_year, int(m), int(d))),
-                    (r'(\d{4})/(\d{1,2})/(\d{1,2})',   lambda y,m,d: date(int(y), int(m), int(d))),
-                    (r'(\d{1,2})/(\d{1,2})',           lambda m,d: date(current_year, int(m), int(d))),
-                ]
-
-                for pat, conv in patterns:
-                    m = re.search(pat, text)
-                    if m:
-                        parsed_date = conv(*m.groups())
-                        break
-
-            data["available_from"] = parsed_date.isoformat()
+            parsed_date = parse_available_from(text)
+            data["available_from"] = parsed_date.isoformat() if parsed_date else None
             if parsed_date:
-                print(f"📅 Parsed available_from: {parsed_date} (from: {text})")
+                hook_print(f"📅 Parsed available_from: {parsed_date} (from: {text})")
             else:
-                print(f"⚠️ Could not parse date from: {text}")
+                hook_print(f"⚠️ Could not parse date from: {text}")
 
         except Exception as e:
-            print(f"❌ Error extracting available_from: {e}")
+            hook_print(f"❌ Error extracting available_from: {e}")
             data["available_from"] = None
 
             
@@ -493,16 +534,16 @@ def setup_custom_extractor() -> CustomExtractor:
             # Tìm thẻ dt chứa "駐車場" và thẻ dd ngay sau nó
             parking_content = find(r'<dt[^>]*>駐車場</dt>\s*<dd[^>]*>(.*?)</dd>', html)
             if not parking_content:
-                print("⚠️ No parking section found")
+                hook_print("⚠️ No parking section found")
                 return
             
             # Làm sạch HTML và lấy text
             parking_text = clean_html(parking_content).strip()
             if not parking_text:
-                print("⚠️ Parking content is empty after cleaning")
+                hook_print("⚠️ Parking content is empty after cleaning")
                 return
             
-            print(f"🚗 Found parking text: {parking_text}")
+            hook_print(f"🚗 Found parking text: {parking_text}")
             
             # Danh sách các giá trị phủ định tiếng Nhật
             negative_values = [
@@ -522,23 +563,23 @@ def setup_custom_extractor() -> CustomExtractor:
             
             if is_negative:
                 data['parking'] = 'N'
-                print(f"🚗 Set parking to N (negative value found): {parking_text}")
+                hook_print(f"🚗 Set parking to N (negative value found): {parking_text}")
             else:
                 data['parking'] = 'Y'
-                print(f"🚗 Set parking to Y (positive or neutral value): {parking_text}")
+                hook_print(f"🚗 Set parking to Y (positive or neutral value): {parking_text}")
                 
         except Exception as e:
-            print(f"❌ Error extracting parking: {e}")
+            hook_print(f"❌ Error extracting parking: {e}")
             # Trong trường hợp lỗi, mặc định là Y theo yêu cầu
             data['parking'] = 'Y'
-            print("🚗 Set parking to Y (default due to error)")
+            hook_print("🚗 Set parking to Y (default due to error)")
     
     def extract_address_info(data: Dict[str, Any], html: str):
         """Extract address information"""
         try:
             address_section = find(r'<dt[^>]*>所在地</dt>(.*?)(?=<dt|</dl>|$)', html)
             if not address_section:
-                print("⚠️ No address section found")
+                hook_print("⚠️ No address section found")
                 return
             
             dd_pattern = compile_regex(r'<dd[^>]*>(.*?)</dd>')
@@ -549,15 +590,16 @@ def setup_custom_extractor() -> CustomExtractor:
                 address_parts = parse_japanese_address(address_text)
                 
                 data['address'] = address_text
-                if address_parts['chome_banchi']:
-                    data['chome_banchi'] = address_parts['chome_banchi']
+                for field in ('postcode', 'prefecture', 'city', 'district', 'chome_banchi'):
+                    if address_parts.get(field):
+                        data[field] = address_parts[field]
                 
-                print(f"🏠 Set address: {address_text}")
+                hook_print(f"🏠 Set address: {address_text}")
             else:
-                print(f"⚠️ Found {len(dd_matches)} dd tags, expected at least 2")
+                hook_print(f"⚠️ Found {len(dd_matches)} dd tags, expected at least 2")
                 
         except Exception as e:
-            print(f"❌ Error extracting address info: {e}")
+            hook_print(f"❌ Error extracting address info: {e}")
     
     def extract_rent_info(data: Dict[str, Any], html: str):
         """Extract rent and maintenance fee from HTML"""
@@ -567,11 +609,11 @@ def setup_custom_extractor() -> CustomExtractor:
             rent_match = rent_pattern.search(html)
             
             if not rent_match:
-                print("⚠️ No rent class found")
+                hook_print("⚠️ No rent class found")
                 return
             
             rent_text = clean_html(rent_match.group(1))
-            print(f"🏠 Found rent text: {rent_text}")
+            hook_print(f"🏠 Found rent text: {rent_text}")
 
             # Normalize
             rent_text = rent_text.replace("／", "/")
@@ -598,7 +640,7 @@ def setup_custom_extractor() -> CustomExtractor:
                 monthly_rent = int(match3.group(1))
                 monthly_maintenance = 0
             else:
-                print(f"⚠️ Rent format not matched: {rent_text}")
+                hook_print(f"⚠️ Rent format not matched: {rent_text}")
                 return
 
             data.update({
@@ -606,22 +648,22 @@ def setup_custom_extractor() -> CustomExtractor:
                 'monthly_maintenance': monthly_maintenance
             })
 
-            print(f"💰 Extracted rent: {monthly_rent}円, maintenance: {monthly_maintenance}円")
+            hook_print(f"💰 Extracted rent: {monthly_rent}円, maintenance: {monthly_maintenance}円")
 
         except Exception as e:
-            print(f"❌ Error extracting rent info: {e}")
+            hook_print(f"❌ Error extracting rent info: {e}")
     
     def extract_deposit_key_info(data: Dict[str, Any], html: str):
         """Extract deposit and key money information"""
         deposit_key_content = find(r'<dt[^>]*>敷金／礼金</dt>\s*<dd[^>]*>(.*?)</dd>', html)
         if not deposit_key_content:
-            print("⚠️ No deposit/key section found")
-            return
+            hook_print("⚠️ No deposit/key section found")
+            return data
         
         total_monthly = data['total_monthly']
         
         deposit_key_text = clean_html(deposit_key_content)
-        print(f"💰 Found deposit/key info: {deposit_key_text}")
+        hook_print(f"💰 Found deposit/key info: {deposit_key_text}")
         
         pattern = compile_regex(r'([\d.]+)ヶ月\s*/\s*([\d.]+)ヶ月')
         match = pattern.search(deposit_key_text)
@@ -640,7 +682,7 @@ def setup_custom_extractor() -> CustomExtractor:
         try:
             room_info_content = find(r'<dt[^>]*>間取り・面積</dt>\s*<dd[^>]*>(.*?)</dd>', html)
             if not room_info_content:
-                print("⚠️ No room info section found")
+                hook_print("⚠️ No room info section found")
                 return
             
             room_info_text = clean_html(room_info_content)
@@ -657,14 +699,14 @@ def setup_custom_extractor() -> CustomExtractor:
                 })
                 
         except Exception as e:
-            print(f"❌ Error extracting room info: {e}")
+            hook_print(f"❌ Error extracting room info: {e}")
     
     def extract_construction_date(data: Dict[str, Any], html: str):
         """Extract construction date"""
         try:
             construction_content = find(r'<dt[^>]*>竣工日</dt>\s*<dd[^>]*>(.*?)</dd>', html)
             if not construction_content:
-                print("⚠️ No construction date section found")
+                hook_print("⚠️ No construction date section found")
                 return
             
             construction_text = clean_html(construction_content)
@@ -674,21 +716,21 @@ def setup_custom_extractor() -> CustomExtractor:
             if year_match:
                 data['year'] = int(year_match.group(1))
             else:
-                print(f"⚠️ Could not extract year from: {construction_text}")
+                hook_print(f"⚠️ Could not extract year from: {construction_text}")
                 
         except Exception as e:
-            print(f"❌ Error extracting construction date: {e}")
+            hook_print(f"❌ Error extracting construction date: {e}")
     
     def extract_structure_info(data: Dict[str, Any], html: str):
         """Extract building structure information with mapping"""
         try:
             structure_content = find(r'<dt[^>]*>規模構造</dt>\s*<dd[^>]*>(.*?)</dd>', html)
             if not structure_content:
-                print("⚠️ No structure section found")
+                hook_print("⚠️ No structure section found")
                 return
             
             structure_text = clean_html(structure_content)
-            print(f"🏗️ Structure text: '{structure_text}'")
+            hook_print(f"🏗️ Structure text: '{structure_text}'")
             
             pattern = compile_regex(r'^(.*?造)\s*地上(\d+)階(?:地下(\d+)階建?)?')
             match = pattern.search(structure_text)
@@ -721,19 +763,19 @@ def setup_custom_extractor() -> CustomExtractor:
                 if match.group(3):
                     data['basement_floors'] = int(match.group(3))
                     
-                print(f"🏗️ Mapped structure: '{original_structure}' → '{mapped_structure}'")
+                hook_print(f"🏗️ Mapped structure: '{original_structure}' → '{mapped_structure}'")
             else:
-                print(f"⚠️ Structure pattern did not match: '{structure_text}'")
+                hook_print(f"⚠️ Structure pattern did not match: '{structure_text}'")
                 
         except Exception as e:
-            print(f"❌ Error extracting structure info: {e}")
+            hook_print(f"❌ Error extracting structure info: {e}")
     
     def extract_renewal_fee(data: Dict[str, Any], html: str):
         """Extract renewal fee information"""
         try:
             renewal_content = find(r'<dt[^>]*>更新料</dt>\s*<dd[^>]*>(.*?)</dd>', html)
             if not renewal_content:
-                print("⚠️ No renewal fee section found")
+                hook_print("⚠️ No renewal fee section found")
                 return
             
             renewal_text = clean_html(renewal_content)
@@ -748,14 +790,14 @@ def setup_custom_extractor() -> CustomExtractor:
                 })
                 
         except Exception as e:
-            print(f"❌ Error extracting renewal fee: {e}")
+            hook_print(f"❌ Error extracting renewal fee: {e}")
     
     def extract_direction_info(data: Dict[str, Any], html: str):
         """Extract apartment facing direction"""
         try:
             direction_content = find(r'<dt[^>]*>方位</dt>\s*<dd[^>]*>(.*?)</dd>', html)
             if not direction_content:
-                print("⚠️ No direction section found")
+                hook_print("⚠️ No direction section found")
                 return
             
             direction_text = clean_html(direction_content)
@@ -765,17 +807,17 @@ def setup_custom_extractor() -> CustomExtractor:
                     data[field_name] = 'Y'
                     break
             else:
-                print(f"⚠️ No recognizable directions found in: {direction_text}")
+                hook_print(f"⚠️ No recognizable directions found in: {direction_text}")
                 
         except Exception as e:
-            print(f"❌ Error extracting direction info: {e}")
+            hook_print(f"❌ Error extracting direction info: {e}")
     
     def extract_lock_exchange(data: Dict[str, Any], html: str):
         """Extract lock exchange fee"""
         try:
             other_fees_content = find(r'<dt[^>]*>その他費用</dt>\s*<dd[^>]*>(.*?)</dd>', html)
             if not other_fees_content:
-                print("⚠️ No other fees section found")
+                hook_print("⚠️ No other fees section found")
                 return
             
             other_fees_text = clean_html(other_fees_content)
@@ -789,7 +831,7 @@ def setup_custom_extractor() -> CustomExtractor:
                 data['lock_exchange'] = int(match.group(1).replace(',', ''))
                 
         except Exception as e:
-            print(f"❌ Error extracting lock exchange: {e}")
+            hook_print(f"❌ Error extracting lock exchange: {e}")
     
     def extract_amenities(data: Dict[str, Any], html: str):
         """Extract amenities information"""
@@ -798,11 +840,11 @@ def setup_custom_extractor() -> CustomExtractor:
             amenities_match = amenities_pattern.search(html)
             
             if not amenities_match:
-                print("⚠️ No amenities section found")
+                hook_print("⚠️ No amenities section found")
                 return
             
             amenities_text = clean_html(amenities_match.group(1))
-            print(f"🏢 Found amenities info: {amenities_text}")
+            hook_print(f"🏢 Found amenities info: {amenities_text}")
             
             found_amenities = []
             for jp_amenity, field_name in AMENITIES_MAPPING.items():
@@ -811,14 +853,14 @@ def setup_custom_extractor() -> CustomExtractor:
                     found_amenities.append(f"{jp_amenity} → {field_name}")
             
             if found_amenities:
-                print(f"🏢 Set amenities to Y:")
+                hook_print(f"🏢 Set amenities to Y:")
                 for amenity in found_amenities:
-                    print(f"   {amenity}")
+                    hook_print(f"   {amenity}")
             else:
-                print(f"⚠️ No recognizable amenities found")
+                hook_print(f"⚠️ No recognizable amenities found")
                 
         except Exception as e:
-            print(f"❌ Error extracting amenities: {e}")
+            hook_print(f"❌ Error extracting amenities: {e}")
     
     def extract_building_description(data: Dict[str, Any], html: str):
         """Extract building description"""
@@ -832,7 +874,7 @@ def setup_custom_extractor() -> CustomExtractor:
                     data['building_description_ja'] = description_text
                     
         except Exception as e:
-            print(f"❌ Error extracting building description: {e}")
+            hook_print(f"❌ Error extracting building description: {e}")
     
     def get_static_info(data: Dict[str, Any], html: str) -> Dict[str, Any]:
         """Process static information extraction using modular approach"""
@@ -861,13 +903,18 @@ def setup_custom_extractor() -> CustomExtractor:
         extract_image,
         get_static_info,
         convert_coordinates, 
+        fill_nearest_stations, # Cần map_lat/map_lng từ convert_coordinates
         set_default_amenities,
         process_pricing,
         extract_deposit_key_info, # Vì nó cần giá trị của total_monthly
         cleanup_temp_fields,
     ]
     
+    # Gallery request (I/O) và các regex nặng chạy trong executor khi dùng
+    # extract_with_rules_async, để không chặn event loop của crawler
+    offloaded = {extract_image, get_static_info}
+    
     for processor in processors:
-        extractor.add_post_hook(safe_wrapper(processor))
+        extractor.add_post_hook(safe_wrapper(processor), pass_html=True, offload=processor in offloaded)
     
     return extractor
\ No newline at end of file
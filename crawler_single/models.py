@@ -1,5 +1,8 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Literal, List, Dict, Any
+from typing import Optional, Literal, List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .record import PropertyRecord
 
 class PropertyModel(BaseModel):
     """
@@ -291,15 +294,11 @@ class PropertyModel(BaseModel):
 
 
 # Thêm class method vào PropertyModel để tạo empty data
-def get_empty_property_data(url: str) -> Dict[str, Any]:
+def get_empty_property_data(url: str) -> "PropertyRecord":
     """
-    Tạo cấu trúc dữ liệu property rỗng với tất cả fields từ PropertyModel
+    Tạo bản ghi property rỗng: mọi field của PropertyModel đều truy cập được
+    (None khi chưa set) nhưng chỉ field đã set mới tốn bộ nhớ
     """
-    # Tạo một instance rỗng của PropertyModel
-    empty_model = PropertyModel()
-    
-    # Convert sang dict và set các giá trị cần thiết
-    data = empty_model.dict()
-    data['link'] = url
+    from .record import PropertyRecord
     
-    return data
\ No newline at end of file
+    return PropertyRecord(link=url)
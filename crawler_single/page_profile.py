@@ -0,0 +1,97 @@
+"""
+Lean page-load profile - chặn request không cần thiết của headless browser
+"""
+
+import re
+import weakref
+from typing import Callable, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+
+class ResourceBlockingProfile:
+    """
+    Request interception profile cho Playwright context của crawl4ai
+
+    - Chặn theo resource type (image, font, stylesheet, media, ...)
+    - Chặn theo URL pattern (analytics, ads, tracking)
+    - Tuỳ chọn chặn mọi host third-party ngoài first_party_hosts và các host
+      của site đã đăng ký (site_hosts, đọc lại mỗi lần nên site đăng ký sau vẫn được tính)
+    """
+
+    def __init__(self,
+                 blocked_resource_types: Iterable[str] = (),
+                 blocked_url_patterns: Iterable[str] = (),
+                 first_party_hosts: Iterable[str] = (),
+                 block_third_party: bool = False,
+                 site_hosts: Callable[[], Iterable[str]] = None):
+        self.blocked_resource_types = frozenset(blocked_resource_types)
+        self.first_party_hosts: List[str] = [host.lower() for host in first_party_hosts]
+        self.site_hosts = site_hosts
+        self.block_third_party = block_third_party
+        # Context đã gắn route handler (hook chạy cho mỗi page mới)
+        self._routed_contexts = weakref.WeakSet()
+        patterns = list(blocked_url_patterns)
+        self._url_regex: Optional[re.Pattern] = (
+            re.compile('|'.join(f'(?:{pattern})' for pattern in patterns), re.IGNORECASE)
+            if patterns else None
+        )
+        self.blocked_count = 0
+
+    @classmethod
+    def from_config(cls, config, site_hosts: Callable[[], Iterable[str]] = None) -> 'ResourceBlockingProfile':
+        return cls(
+            blocked_resource_types=config.BLOCKED_RESOURCE_TYPES,
+            blocked_url_patterns=config.BLOCKED_URL_PATTERNS,
+            first_party_hosts=config.FIRST_PARTY_HOSTS,
+            block_third_party=config.BLOCK_THIRD_PARTY,
+            site_hosts=site_hosts,
+        )
+
+    def allowed_hosts(self) -> List[str]:
+        if self.site_hosts is None:
+            return self.first_party_hosts
+        return self.first_party_hosts + [host.lower() for host in self.site_hosts()]
+
+    def is_first_party(self, host: str, allowed_hosts: List[str] = None) -> bool:
+        host = host.lower()
+        if allowed_hosts is None:
+            allowed_hosts = self.allowed_hosts()
+        return any(host == allowed or host.endswith('.' + allowed) for allowed in allowed_hosts)
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        """Quyết định có chặn request hay không"""
+        # Không bao giờ chặn document chính
+        if resource_type == 'document':
+            return False
+        if resource_type in self.blocked_resource_types:
+            return True
+        if self._url_regex is not None and self._url_regex.search(url):
+            return True
+        if self.block_third_party:
+            host = urlsplit(url).hostname or ''
+            # Không có allowlist nào → không chặn theo host
+            allowed_hosts = self.allowed_hosts()
+            if host and allowed_hosts and not self.is_first_party(host, allowed_hosts):
+                return True
+        return False
+
+    async def handle_route(self, route):
+        """Playwright route handler"""
+        request = route.request
+        if self.should_block(request.url, request.resource_type):
+            self.blocked_count += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def on_page_context_created(self, page, context, **kwargs):
+        """crawl4ai hook: gắn route handler một lần cho mỗi context (hook chạy cho mọi page)"""
+        if context not in self._routed_contexts:
+            self._routed_contexts.add(context)
+            await context.route("**/*", self.handle_route)
+        return page
+
+    def attach(self, crawler):
+        """Gắn profile vào AsyncWebCrawler (crawler_strategy hooks)"""
+        crawler.crawler_strategy.set_hook('on_page_context_created', self.on_page_context_created)
+        return crawler
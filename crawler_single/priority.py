@@ -0,0 +1,189 @@
+"""
+Priority crawl queue - URL giá trị cao được crawl trước
+
+Điểm ưu tiên tính từ snapshot store (first_seen, last_seen, last_changed và
+available_from của lần crawl trước):
+- Listing mới (chưa có trong snapshot) → cao nhất
+- Phòng sắp trống (available_from gần) → cao
+- Bản ghi vừa thay đổi gần đây (hay biến động) → cao hơn bản ghi ổn định
+- Lâu chưa crawl lại → tăng dần
+
+Scorer có thể thay thế: bất kỳ callable (PriorityInput, now) -> float.
+Kết hợp với CrawlBudget (deadline / số URL tối đa) để khi thời gian có hạn,
+các bản ghi quan trọng nhất được ghi trước.
+"""
+
+import heapq
+import time
+from collections import namedtuple
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+DAY = 86400.0
+
+# Thông tin snapshot của một URL (None nếu chưa từng crawl)
+PriorityInput = namedtuple(
+    'PriorityInput',
+    ['url', 'first_seen', 'last_seen', 'last_changed', 'available_from']
+)
+
+Scorer = Callable[[PriorityInput, float], float]
+
+
+def days_until(available_from, now: float) -> Optional[float]:
+    """Số ngày từ now đến available_from ('YYYY-MM-DD', date hoặc datetime); None nếu không đọc được"""
+    if available_from is None:
+        return None
+    if isinstance(available_from, datetime):
+        target = available_from.date()
+    elif isinstance(available_from, date):
+        target = available_from
+    else:
+        try:
+            target = date.fromisoformat(str(available_from)[:10])
+        except ValueError:
+            return None
+    target_ts = datetime(target.year, target.month, target.day).timestamp()
+    return (target_ts - now) / DAY
+
+
+class DefaultPriorityScorer:
+    """
+    Điểm = listing mới, hoặc tổng của:
+        available_weight * độ gần của available_from (trong available_horizon ngày)
+      + change_weight * 0.5 ** (tuổi của lần thay đổi cuối / change_half_life ngày)
+      + stale_weight * min(1, thời gian từ lần crawl cuối / stale_after ngày)
+    """
+
+    def __init__(self,
+                 new_listing: float = 100.0,
+                 available_weight: float = 50.0,
+                 available_horizon: float = 30.0,
+                 change_weight: float = 20.0,
+                 change_half_life: float = 7.0,
+                 stale_weight: float = 10.0,
+                 stale_after: float = 7.0):
+        self.new_listing = new_listing
+        self.available_weight = available_weight
+        self.available_horizon = available_horizon
+        self.change_weight = change_weight
+        self.change_half_life = change_half_life
+        self.stale_weight = stale_weight
+        self.stale_after = stale_after
+
+    def __call__(self, item: PriorityInput, now: float) -> float:
+        if item.first_seen is None:
+            return self.new_listing
+
+        score = 0.0
+        days = days_until(item.available_from, now)
+        if days is not None and days <= self.available_horizon:
+            # Đã trống / trống ngay → đủ trọng số
+            score += self.available_weight * (1 - max(0.0, days) / self.available_horizon)
+
+        if item.last_changed is not None:
+            changed_age = max(0.0, now - item.last_changed) / DAY
+            score += self.change_weight * 0.5 ** (changed_age / self.change_half_life)
+
+        if item.last_seen is not None:
+            since_seen = max(0.0, now - item.last_seen) / DAY
+            score += self.stale_weight * min(1.0, since_seen / self.stale_after)
+
+        return score
+
+
+class CrawlPrioritizer:
+    """Tính điểm cho danh sách URL từ snapshot store (một query mỗi 500 URL)"""
+
+    def __init__(self, snapshot_store=None, scorer: Optional[Scorer] = None):
+        self.snapshot_store = snapshot_store
+        self.scorer = scorer or DefaultPriorityScorer()
+
+    def inputs(self, urls: Sequence[str]) -> List[PriorityInput]:
+        metas = self.snapshot_store.get_meta_many(urls) if self.snapshot_store is not None else {}
+        items = []
+        for url in urls:
+            meta = metas.get(url)
+            if meta is None:
+                items.append(PriorityInput(url, None, None, None, None))
+            else:
+                items.append(PriorityInput(url, meta['first_seen'], meta['last_seen'],
+                                           meta['last_changed'], meta['available_from']))
+        return items
+
+    def scores(self, urls: Sequence[str], now: float = None) -> List[float]:
+        now = now or time.time()
+        return [self.scorer(item, now) for item in self.inputs(urls)]
+
+
+class PriorityQueue:
+    """
+    Max-heap các index URL chưa launch; cùng điểm → giữ thứ tự trong danh sách
+    Không có điểm → đúng thứ tự danh sách như trước
+    """
+
+    def __init__(self, count: int, scores: Optional[Sequence[float]] = None):
+        if scores is None:
+            scores = [0.0] * count
+        self._scores = scores
+        self._heap = [(-score, index) for index, score in enumerate(scores)]
+        heapq.heapify(self._heap)
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def peek(self) -> int:
+        return self._heap[0][1]
+
+    def pop(self) -> int:
+        return heapq.heappop(self._heap)[1]
+
+    def push(self, index: int):
+        """Đưa lại một index đã pop (giữ nguyên điểm ban đầu)"""
+        heapq.heappush(self._heap, (-self._scores[index], index))
+
+    def drain(self) -> Iterable[int]:
+        while self._heap:
+            yield self.pop()
+
+
+class CrawlBudget:
+    """
+    Giới hạn một lần crawl: deadline (giây từ lúc bắt đầu) và/hoặc số URL tối đa
+
+    Hết budget → không launch URL/retry mới; URL đang crawl vẫn chạy xong.
+    """
+
+    def __init__(self, deadline: Optional[float] = None, max_urls: Optional[int] = None):
+        self.deadline = deadline
+        self.max_urls = max_urls
+        self.started = time.monotonic()
+        self.launched = 0
+
+    def record_launch(self):
+        self.launched += 1
+
+    def time_left(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(0.0, self.started + self.deadline - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.started + self.deadline
+
+    def can_launch(self, new_url: bool = True) -> bool:
+        """Retry không tính vào max_urls nhưng vẫn dừng khi hết deadline"""
+        if self.expired():
+            return False
+        return not new_url or self.max_urls is None or self.launched < self.max_urls
+
+    def reason(self) -> str:
+        return 'crawl deadline reached' if self.expired() else 'crawl URL budget reached'
+
+    def to_dict(self) -> Dict[str, Optional[float]]:
+        return {
+            'deadline': self.deadline,
+            'max_urls': self.max_urls,
+            'launched': self.launched,
+            'elapsed': round(time.monotonic() - self.started, 3),
+        }
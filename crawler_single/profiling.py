@@ -0,0 +1,334 @@
+"""
+Profiling giai đoạn extract (opt-in: CrawlerConfig.PROFILE_EXTRACTION = True)
+
+- Một phần URL (PROFILE_SAMPLE_RATE) được chạy cProfile cho từng hook/rule,
+  gộp thành một file .prof cho mỗi URL
+- Mọi URL đều được đo thời gian từng hook; trong lúc sync hook chạy, một thread
+  lấy mẫu stack (sys._current_frames) định kỳ. URL extract lâu hơn
+  PROFILE_SLOW_SECONDS được ghi lại kèm stack mẫu (.folded, dùng được với flamegraph)
+- Mỗi URL được ghi: <ts>_<hash>.json (url, thời gian từng hook), .prof, .folded
+
+Event loop xen kẽ nhiều URL nên không thể cProfile cả trang; thay vào đó mỗi
+lần gọi hook đồng bộ (liên tục trên một thread) được profile riêng và gắn tag
+theo URL + tên hook.
+
+    # Báo cáo tổng hợp: top function, thời gian theo hook, stack mẫu nặng nhất
+    python -m crawler_single.profiling profiles --top 30
+"""
+
+import argparse
+import contextvars
+import glob
+import hashlib
+import io
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+# Profile của URL đang extract (None = không profile)
+current_profile: contextvars.ContextVar[Optional['ExtractionProfile']] = contextvars.ContextVar(
+    'current_profile', default=None
+)
+
+# Chỉ một cProfile chạy tại một thời điểm (Python 3.12+ không cho nhiều profiler đồng thời)
+_CPROFILE_LOCK = threading.Lock()
+
+MAX_STACK_DEPTH = 64
+
+
+class StackSampler:
+    """Thread lấy mẫu stack của các thread đang chạy sync hook được đăng ký"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self._active: Dict[int, tuple] = {}  # thread id → (profile, hook name)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        # Set khi có hook đang chạy; thread sampler chờ event này thay vì thức dậy mỗi interval
+        self._wake = threading.Event()
+
+    def register(self, profile: 'ExtractionProfile', name: str):
+        with self._lock:
+            self._active[threading.get_ident()] = (profile, name)
+            self._wake.set()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+                self._thread.start()
+
+    def unregister(self):
+        with self._lock:
+            self._active.pop(threading.get_ident(), None)
+            if not self._active:
+                self._wake.clear()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            time.sleep(self.interval)
+            with self._lock:
+                active = list(self._active.items())
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for thread_id, (profile, name) in active:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    profile.samples[_fold(name, frame)] += 1
+
+
+def _fold(name: str, frame) -> str:
+    """Stack dạng folded: hook;file:func;...;leaf (từ hook xuống lá, bỏ event loop phía trên)"""
+    stack = []
+    while frame is not None and len(stack) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        if code.co_name == 'profiled' and code.co_filename == __file__:  # wrapper của ExtractionProfile.wrap
+            break
+        stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ';'.join([name] + stack[::-1])
+
+
+class ExtractionProfile:
+    """Dữ liệu profile của một URL"""
+
+    def __init__(self, url: str, capture: bool, sampler: Optional[StackSampler] = None):
+        self.url = url
+        self.capture = capture
+        self.sampler = sampler
+        self.started = time.perf_counter()
+        self.elapsed: Optional[float] = None
+        self.hook_times: List[tuple] = []  # (hook name, giây)
+        self.samples: Counter = Counter()
+        self.partial = False
+        self._profilers: List[Any] = []
+        self._lock = threading.Lock()
+
+    def wrap(self, name: str, func: Callable) -> Callable:
+        """Bọc một hàm đồng bộ: đo thời gian, lấy mẫu stack, cProfile nếu URL được sample"""
+        def profiled(*args, **kwargs):
+            if self.sampler:
+                self.sampler.register(self, name)
+            profiler = None
+            if self.capture and _CPROFILE_LOCK.acquire(blocking=False):
+                import cProfile
+                profiler = cProfile.Profile()
+            elif self.capture:
+                self.partial = True  # hook khác đang bị cProfile
+            start = time.perf_counter()
+            try:
+                if profiler is None:
+                    return func(*args, **kwargs)
+                profiler.enable()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    profiler.disable()
+            finally:
+                self.record(name, time.perf_counter() - start)
+                if profiler is not None:
+                    _CPROFILE_LOCK.release()
+                    with self._lock:
+                        self._profilers.append(profiler)
+                if self.sampler:
+                    self.sampler.unregister()
+
+        return profiled
+
+    async def time_async(self, name: str, awaitable):
+        """Đo wall time của async hook (không cProfile: event loop chạy xen các URL khác)"""
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            self.hook_times.append((name, seconds))
+
+    def finish(self) -> float:
+        self.elapsed = time.perf_counter() - self.started
+        return self.elapsed
+
+    def stats(self):
+        """pstats.Stats gộp từ cProfile của các hook (None nếu không capture)"""
+        if not self._profilers:
+            return None
+        import pstats
+        stats = pstats.Stats(self._profilers[0])
+        for profiler in self._profilers[1:]:
+            stats.add(profiler)
+        return stats
+
+
+class ExtractionProfiler:
+    """Quyết định URL nào được profile và ghi kết quả ra profile dir"""
+
+    def __init__(self,
+                 directory: str = 'profiles',
+                 sample_rate: float = 0.05,
+                 slow_seconds: Optional[float] = 5.0,
+                 sample_interval: float = 0.005):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+        self.sampler = StackSampler(sample_interval)
+        self.written = 0
+
+    @classmethod
+    def from_config(cls, config) -> 'ExtractionProfiler':
+        return cls(
+            directory=config.PROFILE_DIR,
+            sample_rate=config.PROFILE_SAMPLE_RATE,
+            slow_seconds=config.PROFILE_SLOW_SECONDS,
+            sample_interval=config.PROFILE_SAMPLE_INTERVAL,
+        )
+
+    def start(self, url: str) -> ExtractionProfile:
+        return ExtractionProfile(url, capture=random.random() < self.sample_rate, sampler=self.sampler)
+
+    def finish(self, profile: ExtractionProfile) -> Optional[str]:
+        """Ghi profile nếu URL được sample hoặc chậm hơn ngưỡng, trả về path file .json"""
+        elapsed = profile.finish()
+        slow = self.slow_seconds is not None and elapsed >= self.slow_seconds
+        if not (profile.capture or slow):
+            return None
+        try:
+            path = self._write(profile, 'slow' if slow else 'sampled')
+        except OSError as e:
+            print(f"❌ Error writing profile for {profile.url}: {e}")
+            return None
+        self.written += 1
+        if slow:
+            print(f"🐢 Slow extraction ({elapsed:.1f}s) profiled: {profile.url} → {path}")
+        return path
+
+    def _write(self, profile: ExtractionProfile, reason: str) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        digest = hashlib.sha1(profile.url.encode('utf-8')).hexdigest()[:8]
+        base = os.path.join(self.directory, f"{time.strftime('%Y%m%d_%H%M%S')}_{digest}")
+
+        prof_file = None
+        stats = profile.stats()
+        if stats is not None:
+            prof_file = base + '.prof'
+            stats.dump_stats(prof_file)
+
+        folded_file = None
+        if profile.samples:
+            folded_file = base + '.folded'
+            with open(folded_file, 'w', encoding='utf-8') as f:
+                for stack, count in profile.samples.most_common():
+                    f.write(f"{stack} {count}\n")
+
+        meta = {
+            'url': profile.url,
+            'reason': reason,
+            'elapsed': round(profile.elapsed, 4),
+            'hooks': [{'name': name, 'seconds': round(seconds, 4)} for name, seconds in profile.hook_times],
+            'samples': sum(profile.samples.values()),
+            'partial': profile.partial,
+            'profile': os.path.basename(prof_file) if prof_file else None,
+            'folded': os.path.basename(folded_file) if folded_file else None,
+        }
+        with open(base + '.json', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        return base + '.json'
+
+    def write_report(self, top: int = 30) -> Optional[str]:
+        """Ghi báo cáo tổng hợp của profile dir ra report.txt"""
+        if not self.written:
+            return None
+        path = os.path.join(self.directory, 'report.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(build_report(self.directory, top))
+        print(f"📊 Profile report: {path}")
+        return path
+
+
+def _percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def build_report(directory: str, top: int = 30) -> str:
+    """Top function (cProfile gộp), thời gian theo hook, URL chậm nhất và stack mẫu nặng nhất"""
+    out = io.StringIO()
+    metas = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.json'))):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                metas.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+
+    out.write(f"Profiles: {len(metas)} URLs "
+              f"({sum(m.get('reason') == 'slow' for m in metas)} slow)\n\n")
+
+    # Thời gian theo hook
+    hook_times: Dict[str, List[float]] = {}
+    for meta in metas:
+        for hook in meta.get('hooks', []):
+            hook_times.setdefault(hook['name'], []).append(hook['seconds'])
+    out.write("== Hooks (giây) ==\n")
+    out.write(f"{'hook':<40}{'calls':>8}{'total':>10}{'mean':>10}{'p95':>10}{'max':>10}\n")
+    for name, times in sorted(hook_times.items(), key=lambda item: -sum(item[1])):
+        out.write(f"{name[:39]:<40}{len(times):>8}{sum(times):>10.3f}{sum(times) / len(times):>10.4f}"
+                  f"{_percentile(times, 0.95):>10.4f}{max(times):>10.4f}\n")
+
+    # URL chậm nhất
+    out.write("\n== Slowest URLs ==\n")
+    for meta in sorted(metas, key=lambda m: -m.get('elapsed', 0))[:10]:
+        slowest = max(meta.get('hooks') or [{'name': '-', 'seconds': 0}], key=lambda h: h['seconds'])
+        out.write(f"{meta['elapsed']:>8.3f}s  {meta['url']}  (slowest hook: {slowest['name']} "
+                  f"{slowest['seconds']:.3f}s)\n")
+
+    # Stack mẫu: frame lá nặng nhất (self samples)
+    leaves: Counter = Counter()
+    for meta in metas:
+        if not meta.get('folded'):
+            continue
+        try:
+            with open(os.path.join(directory, meta['folded']), 'r', encoding='utf-8') as f:
+                for line in f:
+                    stack, _, count = line.rstrip('\n').rpartition(' ')
+                    frames = stack.split(';')
+                    leaves[f"{frames[0]} → {frames[-1]}"] += int(count)
+        except (OSError, ValueError):
+            continue
+    if leaves:
+        out.write("\n== Sampled leaf frames (hook → function) ==\n")
+        for leaf, count in leaves.most_common(top):
+            out.write(f"{count:>8}  {leaf}\n")
+
+    # cProfile gộp
+    prof_files = [os.path.join(directory, m['profile']) for m in metas
+                  if m.get('profile') and os.path.exists(os.path.join(directory, m['profile']))]
+    if prof_files:
+        import pstats
+        out.write(f"\n== Top functions ({len(prof_files)} cProfile captures) ==\n")
+        stats = pstats.Stats(*prof_files, stream=out)
+        stats.strip_dirs().sort_stats('tottime').print_stats(top)
+    return out.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Báo cáo tổng hợp profile extract")
+    parser.add_argument('directory', nargs='?', default=None, help="Profile dir (mặc định CrawlerConfig.PROFILE_DIR)")
+    parser.add_argument('--top', type=int, default=30)
+    args = parser.parse_args()
+
+    directory = args.directory
+    if directory is None:
+        from .config import CrawlerConfig
+        directory = CrawlerConfig.PROFILE_DIR
+    print(build_report(directory, args.top))
+
+
+if __name__ == "__main__":
+    main()
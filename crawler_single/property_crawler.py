@@ -3,12 +3,68 @@ Enhanced Property Crawler - Class chính
 """
 
 import asyncio
-from typing import Dict, List, Any
-from .property_extractor import PropertyExtractor
+import time
+from collections.abc import Mapping
+from typing import Callable, Dict, List, Any, Optional, Tuple
+from .property_extractor import PropertyExtractor, navigation_latency
+from .concurrency import AdaptiveConcurrencyController
+from .retry import RetryPolicy, RetryQueue, AttemptHistory, classify_error, is_circuit_open_error
+from .record import PropertyRecord
+from .priority import CrawlBudget, CrawlPrioritizer, PriorityQueue
+
+# Chu kỳ kiểm tra lại circuit đang half-open (giây)
+CIRCUIT_POLL_INTERVAL = 1.0
 
 class EnhancedPropertyCrawler:
-    def __init__(self):
+    def __init__(self, store=None):
+        """
+        Args:
+            store: PropertyStore (tuỳ chọn) - bản ghi thành công được ghi thẳng vào store
+        """
         self.extractor = PropertyExtractor()
+        self.store = store
+        self.config = self.extractor.config
+        self.retry_policy = RetryPolicy(
+            max_attempts=self.config.MAX_ATTEMPTS,
+            base_delay=self.config.RETRY_BASE_DELAY,
+            max_delay=self.config.RETRY_MAX_DELAY,
+        )
+        self.asset_pipeline = None
+        if self.config.DOWNLOAD_IMAGES:
+            from .assets import ImageAssetPipeline
+            self.asset_pipeline = ImageAssetPipeline.from_config(self.config)
+        self.translation = None
+        if self.config.TRANSLATE_FIELDS:
+            from .translation import TranslationService
+            self.translation = TranslationService.from_config(self.config)
+
+    async def close(self):
+        """Giải phóng tài nguyên dùng chung (trình duyệt, HTTP session của asset pipeline, translation memory)"""
+        await self.extractor.close()
+        if self.asset_pipeline:
+            await self.asset_pipeline.close()
+        if self.translation:
+            self.translation.close()
+    
+    async def _finalize_batch(self, batch: List[Tuple[int, Dict[str, Any]]],
+                              on_result: Callable[[int, Dict[str, Any]], None] = None):
+        """
+        Dịch các field *_en (một lần cho cả batch), ghi store, rồi mới stream
+        bản ghi qua on_result (bản ghi stream ra đã có *_en)
+        """
+        if not batch:
+            return
+        records = [record for _, record in batch]
+        if self.translation:
+            filled = await asyncio.to_thread(self.translation.translate_records, records)
+            print(f"🌐 Translated {filled} fields for {len(records)} records")
+        if self.store is not None:
+            # Một transaction cho cả batch, không chặn event loop
+            await asyncio.to_thread(self.store.upsert_many, records)
+        if on_result:
+            for index, record in batch:
+                on_result(index, record)
+        batch.clear()
 
     async def _crawl_single_property(self, url: str, verbose: bool = True) -> Dict[str, Any]:
         """
@@ -25,28 +81,51 @@ class EnhancedPropertyCrawler:
             # Extract dữ liệu bằng crawl4ai
             result = await self.extractor.extract_property_data(url)
             
+            if 'error' in result:
+                error_result = {
+                    'error': result['error'],
+                    'url': url,
+                }
+                if result.get('status_code') is not None:
+                    error_result['status_code'] = result['status_code']
+                return error_result
+            
+            # Tải ảnh + loại ảnh gần trùng (tuỳ chọn)
+            if self.asset_pipeline and result['property_data'].get('images'):
+                result['property_data']['images'] = await self.asset_pipeline.process(
+                    result['property_data']['images']
+                )
+            
             # Validate và tạo PropertyModel
             property_model = self.extractor.validate_and_create_property_model(
                 result['property_data']
             )
             
-            # Convert về dict để serialize JSON
-            property_dict = property_model.dict(exclude_none=True)
+            # Đọc thẳng các field của model (không deep copy như .dict()),
+            # giữ bản ghi gọn trong bộ nhớ, chỉ convert sang dict khi output
+            record = PropertyRecord()
+            images_list = []
+            for field, value in property_model:
+                if field == 'images':
+                    images_list = value if isinstance(value, list) else []
+                elif value is not None:
+                    record[field] = value
             
             # Chuyển đổi images thành các field riêng biệt
-            if 'images' in property_dict and isinstance(property_dict['images'], list):
-                images_list = property_dict.pop('images', [])
-                for i, img in enumerate(images_list):
-                    img_num = i + 1
-                    if isinstance(img, dict):
-                        if 'url' in img:
-                            property_dict[f'image_url_{img_num}'] = img['url']
-                        if 'category' in img:
-                            property_dict[f'image_category_{img_num}'] = img['category']
-            
-            result['property_data'] = property_dict
+            for i, img in enumerate(images_list):
+                img_num = i + 1
+                if isinstance(img, dict):
+                    if 'url' in img:
+                        record[f'image_url_{img_num}'] = img['url']
+                    if 'category' in img:
+                        record[f'image_category_{img_num}'] = img['category']
+                    # Asset stage: file ảnh đã lưu (content-addressed)
+                    if 'sha256' in img:
+                        record[f'image_sha256_{img_num}'] = img['sha256']
+                    if 'path' in img:
+                        record[f'image_path_{img_num}'] = img['path']
             
-            return result['property_data']
+            return record
             
         except Exception as e:
             error_result = {
@@ -56,49 +135,249 @@ class EnhancedPropertyCrawler:
                 print(f"❌ Exception crawling {url}: {e}")
             return error_result
 
-    async def crawl_multiple_properties(self, urls: List[str], batch_size: int = 5) -> List[Dict[str, Any]]:
+    async def _timed_crawl(self, url: str) -> Tuple[Dict[str, Any], float]:
+        """
+        Crawl một property, trả về (result, latency giây)
+
+        latency là thời gian navigation đo trong fetch_html (như circuit breaker),
+        không gồm thời gian chờ slot, extract, memory budget hay tải ảnh;
+        URL không navigate được (vd. lỗi trước khi mở tab) → tổng thời gian.
         """
-        Crawl nhiều properties với batch processing để tránh timeout
+        start = time.monotonic()
+        navigation_latency.set(None)
+        try:
+            result = await self._crawl_single_property(url)
+        except Exception as e:
+            result = {
+                'error': str(e),
+                'url': url
+            }
+        latency = navigation_latency.get()
+        return result, latency if latency is not None else time.monotonic() - start
+
+    def _create_concurrency_controller(self, batch_size: int, adaptive: bool) -> AdaptiveConcurrencyController:
+        """Tạo AIMD controller; adaptive=False giữ cố định concurrency = batch_size"""
+        if not adaptive:
+            return AdaptiveConcurrencyController(
+                initial=batch_size,
+                min_limit=batch_size,
+                max_limit=batch_size,
+            )
+        return AdaptiveConcurrencyController(
+            initial=batch_size,
+            min_limit=self.config.MIN_CONCURRENCY,
+            max_limit=self.config.MAX_CONCURRENCY,
+            target_p95_latency=self.config.TARGET_P95_LATENCY,
+            max_error_rate=self.config.MAX_ERROR_RATE,
+            window_size=self.config.CONCURRENCY_WINDOW,
+        )
+
+    async def crawl_multiple_properties(self, urls: List[str], batch_size: int = 5, adaptive: bool = True,
+                                        prioritizer: CrawlPrioritizer = None, deadline: float = None,
+                                        max_urls: int = None,
+                                        on_result: Callable[[int, Dict[str, Any]], None] = None,
+                                        attempt_history: AttemptHistory = None) -> List[Dict[str, Any]]:
+        """
+        Crawl nhiều properties với concurrency tự điều chỉnh (AIMD)
+        
+        Lỗi tạm thời (timeout, navigation, 5xx) được đưa vào delayed retry queue
+        với exponential backoff, không chặn các URL mới. Lịch sử các lần thử
+        chỉ sống trong một lần gọi (crawler dùng lại giữa các job không bị tích
+        luỹ lượt thử cũ). Khi circuit breaker của host đang mở,
+        scheduler ngừng mở trang mới cho host đó và chỉ launch một probe khi
+        circuit chuyển sang half-open.
+        
+        URL được launch theo điểm ưu tiên (listing mới, sắp trống, vừa thay đổi
+        trước); không có prioritizer → theo thứ tự danh sách. Kết quả luôn trả về
+        theo thứ tự của urls. Hết deadline/max_urls → URL chưa crawl được trả về
+        với error_kind 'skipped'.
         
         Args:
             urls: List of URLs to crawl
-            batch_size: Number of URLs to crawl simultaneously (default: 5)
+            batch_size: Initial number of URLs crawled simultaneously (default: 5)
+            adaptive: Raise/lower concurrency from observed p95 latency and errors (default: True)
+            prioritizer: CrawlPrioritizer quyết định thứ tự launch (default: None = list order)
+            deadline: Số giây tối đa để launch URL/retry mới (default: CrawlerConfig.CRAWL_DEADLINE)
+            max_urls: Số URL mới tối đa được crawl (default: CrawlerConfig.CRAWL_MAX_URLS)
+            on_result: Callback (index, result) khi một URL có kết quả cuối cùng (stream kết quả);
+                       bản ghi thành công được gọi theo batch sau khi dịch/ghi store
+                       (tối đa TRANSLATION_BATCH_SIZE bản ghi hoặc RECORD_FLUSH_INTERVAL giây)
+            attempt_history: AttemptHistory để ghi các lần thử (default: None = tạo mới cho lần gọi này)
         """
-        print(f"🏘️ Crawling {len(urls)} properties in batches of {batch_size}...")
+        controller = self._create_concurrency_controller(batch_size, adaptive)
+        print(f"🏘️ Crawling {len(urls)} properties (initial concurrency {controller.limit})...")
         
-        all_results = []
+        pending = PriorityQueue(len(urls), prioritizer.scores(urls) if prioritizer else None)
+        budget = CrawlBudget(
+            deadline=deadline if deadline is not None else self.config.CRAWL_DEADLINE,
+            max_urls=max_urls if max_urls is not None else self.config.CRAWL_MAX_URLS,
+        )
         
-        # Chia URLs thành các batches
-        for i in range(0, len(urls), batch_size):
-            batch_urls = urls[i:i + batch_size]
-            batch_num = (i // batch_size) + 1
-            total_batches = (len(urls) + batch_size - 1) // batch_size
+        all_results: List[Dict[str, Any]] = [None] * len(urls)
+        in_flight: Dict[asyncio.Task, int] = {}
+        retry_queue = RetryQueue()
+        if attempt_history is None:
+            attempt_history = AttemptHistory()
+        memory_budget = self.extractor.memory_budget
+        circuits = self.extractor.circuits
+        pipeline_depth = self.config.EXTRACTION_PIPELINE_DEPTH
+        # Bản ghi thành công chờ dịch/ghi store theo batch
+        pending_records: List[Tuple[int, Dict[str, Any]]] = []
+        flush_size = self.config.TRANSLATION_BATCH_SIZE
+        flush_interval = self.config.RECORD_FLUSH_INTERVAL
+        batch_started = 0.0
+        # URL mới của host đang mở circuit: tạm gác lại, hết thời gian chờ thì trả về heap
+        parked = RetryQueue()
+        # Kết quả lỗi gần nhất của URL đang chờ retry (trả về nếu hết budget)
+        last_errors: Dict[int, Dict[str, Any]] = {}
+        completed = 0
+        skipped = 0
+        
+        def launch(index: int):
+            task = asyncio.ensure_future(self._timed_crawl(urls[index]))
+            in_flight[task] = index
+        
+        def skip(index: int, reason: str):
+            result = last_errors.pop(index, None)
+            if result is None:
+                result = {'error': f"Skipped: {reason}", 'url': urls[index], 'error_kind': 'skipped'}
+            all_results[index] = result
+            if on_result:
+                on_result(index, result)
+        
+        def circuit_wait(index: int) -> Optional[float]:
+            """None nếu được launch URL; ngược lại số giây chờ circuit của host"""
+            breaker = circuits.get(urls[index])
+            slots = breaker.available_slots()
+            if slots is None:
+                return None
+            # Half-open: chỉ một URL của host đi probe tại một thời điểm
+            if slots > 0 and not any(circuits.get(urls[i]) is breaker for i in in_flight.values()):
+                return None
+            return max(breaker.retry_in(), CIRCUIT_POLL_INTERVAL)
+        
+        try:
+            while len(pending) or len(parked) or in_flight or len(retry_queue):
+                for index in parked.pop_ready():
+                    pending.push(index)
+                # Hết budget: URL chưa launch (và retry nếu hết deadline) không được crawl nữa
+                if (len(pending) or len(parked)) and not budget.can_launch():
+                    reason = budget.reason()
+                    print(f"⏱️ {reason.capitalize()}: skipping {len(pending) + len(parked)} URLs")
+                    for index in list(pending.drain()) + parked.drain():
+                        skip(index, reason)
+                        skipped += 1
+                if len(retry_queue) and budget.expired():
+                    for index in retry_queue.drain():
+                        skip(index, budget.reason())
+                        skipped += 1
+                if not (len(pending) or len(parked) or in_flight or len(retry_queue)):
+                    break
+            
+                # Controller quyết định số tab navigate; thêm pipeline_depth task để
+                # luôn có URL chờ sẵn khi một tab vừa trả HTML về
+                await self.extractor.navigation.set_limit(controller.limit)
+                window = controller.limit + pipeline_depth
             
-            print(f"📦 Processing batch {batch_num}/{total_batches} ({len(batch_urls)} URLs)...")
+                # Ưu tiên các retry đã hết thời gian chờ, sau đó lấp đầy bằng URL mới.
+                # Không mở trang mới khi tổng HTML đang xử lý vượt memory budget
+                # hoặc khi circuit của host đang mở.
+                free_slots = window - len(in_flight)
+                if free_slots > 0 and not memory_budget.over_budget() and budget.can_launch(new_url=False):
+                    for index in retry_queue.pop_ready(limit=free_slots):
+                        wait = circuit_wait(index)
+                        if wait is None:
+                            launch(index)
+                        else:
+                            retry_queue.push(index, wait)
+                # Host đang mở circuit chỉ gác URL của host đó, các host khác vẫn tiếp tục
+                while (len(pending) and len(in_flight) < window
+                       and not memory_budget.over_budget() and budget.can_launch()):
+                    index = pending.pop()
+                    wait = circuit_wait(index)
+                    if wait is not None:
+                        parked.push(index, wait)
+                        continue
+                    launch(index)
+                    budget.record_launch()
             
-            # Tạo tasks cho batch hiện tại
-            tasks = [self._crawl_single_property(url) for url in batch_urls]
+                # Batch bản ghi thành công đủ lớn hoặc đã chờ quá lâu → dịch/ghi store/stream
+                if pending_records and (len(pending_records) >= flush_size or
+                                        time.monotonic() - batch_started >= flush_interval):
+                    await self._finalize_batch(pending_records, on_result)
             
-            # Chạy parallel với error handling cho batch này
-            batch_results = await asyncio.gather(*tasks, return_exceptions=True)
+                # Thức dậy đúng lúc hết deadline (time_left = 0 → không còn gì để chờ)
+                flush_in = (max(0.0, batch_started + flush_interval - time.monotonic())
+                            if pending_records else None)
+                waits = [t for t in (retry_queue.next_ready_in(), parked.next_ready_in(),
+                                     budget.time_left() or None, flush_in)
+                         if t is not None]
+                if not in_flight:
+                    # Chỉ còn retry đang chờ backoff hoặc circuit đang mở
+                    await asyncio.sleep(min(waits) if waits else 0)
+                    continue
             
-            # Xử lý exceptions cho batch
-            processed_batch_results = []
-            for j, result in enumerate(batch_results):
-                if isinstance(result, Exception):
-                    processed_batch_results.append({
-                        'error': str(result),
-                        'url': batch_urls[j]
-                    })
-                else:
-                    processed_batch_results.append(result)
+                done, _ = await asyncio.wait(
+                    in_flight,
+                    timeout=min(waits) if waits else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
             
-            all_results.extend(processed_batch_results)
+                for task in done:
+                    index = in_flight.pop(task)
+                    url = urls[index]
+                    result, latency = task.result()
+                    error = result.get('error') if isinstance(result, Mapping) else None
+                    status_code = result.get('status_code') if isinstance(result, Mapping) else None
+                
+                    if is_circuit_open_error(error):
+                        # Bị từ chối trước khi navigate: không tính là một lần thử
+                        retry_queue.push(index, max(circuits.get(url).retry_in(), CIRCUIT_POLL_INTERVAL))
+                        continue
+                
+                    controller.record(latency, error=error, status_code=status_code)
+                
+                    kind = classify_error(error, status_code) if error else None
+                    attempt = attempt_history.record(url, latency, error, status_code, kind)
+                
+                    if error and self.retry_policy.should_retry(kind, attempt):
+                        delay = self.retry_policy.delay(attempt)
+                        print(f"🔁 Retry {attempt}/{self.retry_policy.max_attempts} in {delay:.1f}s: {url} ({error})")
+                        result['attempts'] = attempt
+                        result['error_kind'] = kind
+                        last_errors[index] = result
+                        retry_queue.push(index, delay)
+                        continue
+                
+                    last_errors.pop(index, None)
+                    if error:
+                        result['attempts'] = attempt
+                        result['error_kind'] = kind
+                    else:
+                        if not pending_records:
+                            batch_started = time.monotonic()
+                        pending_records.append((index, result))
+                    all_results[index] = result
+                    completed += 1
+                    if error and on_result:
+                        on_result(index, result)
+
             
-            # Thêm delay giữa các batches để tránh quá tải server
-            if i + batch_size < len(urls):  # Không delay sau batch cuối
-                print(f"⏳ Waiting 2 seconds before next batch...")
-                await asyncio.sleep(2)
+                if done:
+                    open_hosts = [host for host, health in circuits.health().items() if health['state'] != 'closed']
+                    print(f"📦 Progress {completed}/{len(urls)} (concurrency {controller.limit}, "
+                          f"p95 {controller.p95_latency():.1f}s, errors {controller.error_rate():.0%}, "
+                          f"retries pending {len(retry_queue)}"
+                          + (f", circuit open: {', '.join(open_hosts)})" if open_hosts else ")"))
+        finally:
+            # Bị huỷ giữa chừng (vd. job bị cancel): không để task mồ côi giữ tab trình duyệt
+            for task in in_flight:
+                task.cancel()
         
-        print(f"✅ Completed crawling all {len(urls)} properties!")
-        return all_results
\ No newline at end of file
+        await self._finalize_batch(pending_records, on_result)
+        if skipped:
+            print(f"✅ Completed crawling {len(urls) - skipped}/{len(urls)} properties "
+                  f"({skipped} skipped, {budget.reason()})")
+        else:
+            print(f"✅ Completed crawling all {len(urls)} properties!")
+        return all_results
@@ -2,46 +2,152 @@
 Module chính xử lý extract dữ liệu property
 """
 
-from typing import Dict, Any
-from crawl4ai import AsyncWebCrawler
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, Tuple
 from .config import CrawlerConfig
-from .models import get_empty_property_data
+from .concurrency import AdjustableLimiter
+from .circuit import get_circuit_registry
 from utils.utils import PropertyUtils
-from .mitsui.custom_config import setup_custom_extractor
+from .sites import site_registry
+from .page_profile import ResourceBlockingProfile
+from .memory import HtmlMemoryBudget, html_size
+
+# Thời gian navigation (sau khi có slot) của URL đang crawl trong task hiện tại;
+# AIMD controller dùng số này, không tính thời gian chờ slot/extract/tải ảnh
+navigation_latency: ContextVar[Optional[float]] = ContextVar('navigation_latency', default=None)
 
 class PropertyExtractor:    
     def __init__(self):
         self.config = CrawlerConfig()
         self.utils = PropertyUtils()
-        self.custom_extractor = setup_custom_extractor()
+        self.sites = site_registry
+        self.page_profile = (
+            ResourceBlockingProfile.from_config(self.config, site_hosts=self.sites.hosts)
+            if self.config.BLOCK_RESOURCES else None
+        )
+        self.memory_budget = HtmlMemoryBudget(self.config.HTML_MEMORY_BUDGET)
+        # Số tab đang navigate; crawler chỉnh theo AIMD controller
+        self.navigation = AdjustableLimiter(self.config.MAX_CONCURRENCY)
+        # Circuit breaker theo host, dùng chung với gallery request
+        self.circuits = get_circuit_registry()
+        self._crawler = None
+        self._crawler_lock: Optional[asyncio.Lock] = None
+        self.profiler = None
+        if self.config.PROFILE_EXTRACTION:
+            from .profiling import ExtractionProfiler
+            self.profiler = ExtractionProfiler.from_config(self.config)
     
-    async def extract_property_data(self, url: str) -> Dict[str, Any]:
+    async def _get_crawler(self):
+        """Trình duyệt dùng chung cho mọi trang, khởi động ở lần dùng đầu tiên"""
+        from crawl4ai import AsyncWebCrawler
+        
+        if self._crawler_lock is None:
+            self._crawler_lock = asyncio.Lock()
+        async with self._crawler_lock:
+            if self._crawler is None:
+                crawler = AsyncWebCrawler(config=self.config.BROWSER_CONFIG)
+                if self.page_profile:
+                    self.page_profile.attach(crawler)
+                await crawler.start()
+                self._crawler = crawler
+            return self._crawler
+    
+    async def _reset_crawler(self, crawler):
+        """Đóng trình duyệt bị crash để lần sau khởi động lại"""
+        async with self._crawler_lock:
+            if self._crawler is crawler:
+                self._crawler = None
+                try:
+                    await crawler.close()
+                except Exception:
+                    pass
+    
+    async def close(self):
+        """Đóng trình duyệt dùng chung (và ghi báo cáo profile nếu đang profile)"""
+        if self.profiler:
+            self.profiler.write_report()
+        if self._crawler is not None:
+            crawler, self._crawler = self._crawler, None
+            await crawler.close()
+    
+    async def fetch_html(self, url: str) -> Tuple[bool, str, Optional[str], Optional[int]]:
         """
-        Extract dữ liệu bất động sản từ URL với đầy đủ thông tin theo PropertyModel
+        Navigate và lấy HTML: (success, html, error, status_code)
+        
+        Chỉ giữ navigation slot trong lúc tải trang; tab được trả ngay khi có HTML
+        để URL kế tiếp bắt đầu navigate trong lúc trang này được extract.
+        Circuit của host đang mở → raise CircuitOpenError ngay, không mở tab.
         """
-        try:
-            async with AsyncWebCrawler(config=self.config.BROWSER_CONFIG) as crawler:
+        crawler = await self._get_crawler()
+        async with self.navigation.slot():
+            breaker = self.circuits.get(url)
+            breaker.before_call()
+            start = time.monotonic()
+            try:
                 result = await crawler.arun(
                     url=url,
                     config=self.config.RUN_CONFIG
                 )
-                
-                if result.success:
-                    # Extract comprehensive property data
-                    extracted_data = self._extract_comprehensive_data(url, result)
-                    
-                    # Print success message
-                    PropertyUtils.print_crawl_success(url, extracted_data)
-                    
-                    return PropertyUtils.create_crawl_result(
-                        property_data=extracted_data,
-                    )
-                else:
-                    error_msg = result.error_message or 'Failed to extract content'
-                    PropertyUtils.print_crawl_error(url, error_msg)
-                    return PropertyUtils.create_crawl_result(
-                        error=error_msg
-                    )
+            except asyncio.CancelledError:
+                breaker.cancel_call()
+                raise
+            except Exception as e:
+                latency = time.monotonic() - start
+                navigation_latency.set(latency)
+                self.circuits.record_result(url, latency, error=str(e))
+                if 'closed' in str(e).lower():
+                    await self._reset_crawler(crawler)
+                raise
+            latency = time.monotonic() - start
+            navigation_latency.set(latency)
+        
+        # Chỉ giữ HTML, bỏ CrawlResult (cleaned_html, markdown, ...) càng sớm càng tốt
+        success = result.success
+        error_msg = result.error_message or 'Failed to extract content'
+        status_code = getattr(result, 'status_code', None)
+        self.circuits.record_result(
+            url, latency,
+            error=None if success else error_msg,
+            status_code=None if success else status_code,
+        )
+        return success, result.html or "", error_msg, status_code
+    
+    async def extract_property_data(self, url: str) -> Dict[str, Any]:
+        """
+        Extract dữ liệu bất động sản từ URL với đầy đủ thông tin theo PropertyModel
+        """
+        try:
+            # Site không hỗ trợ → lỗi ngay, không tốn một lần navigate
+            custom_extractor = self.sites.get_extractor(url)
+            success, html_content, error_msg, status_code = await self.fetch_html(url)
+            
+            if not success:
+                PropertyUtils.print_crawl_error(url, error_msg)
+                return PropertyUtils.create_crawl_result(
+                    error=error_msg,
+                    status_code=status_code
+                )
+            
+            nbytes = html_size(html_content)
+            if nbytes > self.config.MAX_HTML_BYTES:
+                error_msg = f"HTML too large: {nbytes} bytes > {self.config.MAX_HTML_BYTES}"
+                PropertyUtils.print_crawl_error(url, error_msg)
+                return PropertyUtils.create_crawl_result(error=error_msg)
+            
+            # Backpressure: chờ nếu tổng HTML đang xử lý vượt budget
+            async with self.memory_budget.reserve(nbytes):
+                # Extract comprehensive property data
+                extracted_data = await self._extract_comprehensive_data(url, html_content, custom_extractor)
+                del html_content
+            
+            # Print success message
+            PropertyUtils.print_crawl_success(url, extracted_data)
+            
+            return PropertyUtils.create_crawl_result(
+                property_data=extracted_data,
+            )
                     
         except Exception as e:
             error_msg = str(e)
@@ -50,20 +156,28 @@ class PropertyExtractor:
                 error=error_msg
             )
     
-    def _extract_comprehensive_data(self, url: str, result) -> Dict[str, Any]:
+    async def _extract_comprehensive_data(self, url: str, html_content: str, custom_extractor) -> Dict[str, Any]:
         """
-        Extract comprehensive property data từ crawl result
+        Extract comprehensive property data từ HTML của trang
         """
+        from .models import get_empty_property_data
+        
         # Khởi tạo data structure với tất cả fields từ PropertyModel
         extracted_data = get_empty_property_data(url)
         
-        # Get content
-        html_content = result.html if result.html else ""
-        
-        # Apply custom rules (this will clean HTML and store it in _html)
-        extracted_data = self.custom_extractor.extract_with_rules(html_content, extracted_data)
+        # Apply custom rules of the site (pre-hooks trim HTML, post-hooks nhận HTML qua tham số)
+        if not self.profiler:
+            return await custom_extractor.extract_with_rules_async(html_content, extracted_data)
         
-        return extracted_data
+        # Profiling: hook đọc profile của URL qua contextvar (gắn tag URL + tên hook)
+        from .profiling import current_profile
+        profile = self.profiler.start(url)
+        token = current_profile.set(profile)
+        try:
+            return await custom_extractor.extract_with_rules_async(html_content, extracted_data)
+        finally:
+            current_profile.reset(token)
+            self.profiler.finish(profile)
     
     def validate_and_create_property_model(self, data: Dict[str, Any]):
         """
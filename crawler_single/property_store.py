@@ -0,0 +1,232 @@
+"""
+Property store - SQLite có index cho kết quả crawl, kèm query API và geo bounding box
+
+    # Import các file crawl_results_*.json cũ
+    python -m crawler_single.property_store import crawl_results_*.json
+
+    # Phòng dưới ¥150k trong một khu vực
+    python -m crawler_single.property_store query --max-rent 150000 --bbox 35.64 139.69 35.70 139.76
+"""
+
+import argparse
+import sqlite3
+import time
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from utils.serialization import dumps_str, loads
+
+# Cột được index → field trong bản ghi
+INDEXED_COLUMNS = {
+    'building_name': 'building_name_ja',
+    'monthly_rent': 'monthly_rent',
+    'size': 'size',
+    'room_type': 'room_type',
+    'map_lat': 'map_lat',
+    'map_lng': 'map_lng',
+}
+
+ORDERABLE_COLUMNS = frozenset({'link', 'updated_at'} | set(INDEXED_COLUMNS))
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_int(value: Any) -> Optional[int]:
+    number = _to_float(value)
+    return int(number) if number is not None else None
+
+
+class PropertyStore:
+    """Embedded store: mỗi link một dòng, bản ghi đầy đủ lưu dạng JSON"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS properties (
+        link TEXT PRIMARY KEY,
+        building_name TEXT,
+        monthly_rent INTEGER,
+        size REAL,
+        room_type TEXT,
+        map_lat REAL,
+        map_lng REAL,
+        record TEXT NOT NULL,
+        updated_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_properties_building ON properties(building_name);
+    CREATE INDEX IF NOT EXISTS idx_properties_rent ON properties(monthly_rent);
+    CREATE INDEX IF NOT EXISTS idx_properties_size ON properties(size);
+    CREATE INDEX IF NOT EXISTS idx_properties_room_type ON properties(room_type, monthly_rent);
+    CREATE INDEX IF NOT EXISTS idx_properties_geo ON properties(map_lat, map_lng);
+    """
+
+    def __init__(self, path: str = 'properties.db'):
+        self.path = path
+        # upsert_many chạy trong asyncio.to_thread khi crawl, luôn tuần tự
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(self.SCHEMA)
+
+    @staticmethod
+    def _row_values(record: Dict[str, Any]) -> Tuple:
+        return (
+            record['link'],
+            record.get('building_name_ja'),
+            _to_int(record.get('monthly_rent')),
+            _to_float(record.get('size')),
+            record.get('room_type'),
+            _to_float(record.get('map_lat')),
+            _to_float(record.get('map_lng')),
+            dumps_str(record),
+            time.time(),
+        )
+
+    def upsert_many(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Ghi các bản ghi hợp lệ (có link, không lỗi), trả về số bản ghi đã ghi"""
+        rows = [
+            self._row_values(record) for record in records
+            if isinstance(record, Mapping) and record.get('link') and 'error' not in record
+        ]
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO properties "
+                "(link, building_name, monthly_rent, size, room_type, map_lat, map_lng, record, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    def upsert(self, record: Dict[str, Any]) -> bool:
+        return self.upsert_many([record]) == 1
+
+    def get(self, link: str) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute("SELECT record FROM properties WHERE link = ?", (link,)).fetchone()
+        return loads(row[0]) if row else None
+
+    def count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM properties").fetchone()[0]
+
+    def query(self,
+              min_rent: int = None,
+              max_rent: int = None,
+              min_size: float = None,
+              max_size: float = None,
+              room_type: str = None,
+              building: str = None,
+              bbox: Tuple[float, float, float, float] = None,
+              order_by: str = 'monthly_rent',
+              limit: int = None) -> List[Dict[str, Any]]:
+        """
+        Truy vấn theo các điều kiện (AND)
+
+        Args:
+            room_type: Một loại phòng ('1LDK') hoặc list/tuple nhiều loại
+            building: Tên tòa nhà chính xác (building_name_ja)
+            bbox: (min_lat, min_lng, max_lat, max_lng)
+            order_by: Cột sắp xếp, thêm '-' phía trước để giảm dần
+        """
+        conditions = []
+        params: List[Any] = []
+
+        def add(condition: str, *values):
+            conditions.append(condition)
+            params.extend(values)
+
+        if min_rent is not None:
+            add("monthly_rent >= ?", min_rent)
+        if max_rent is not None:
+            add("monthly_rent <= ?", max_rent)
+        if min_size is not None:
+            add("size >= ?", min_size)
+        if max_size is not None:
+            add("size <= ?", max_size)
+        if room_type is not None:
+            room_types = [room_type] if isinstance(room_type, str) else list(room_type)
+            add(f"room_type IN ({', '.join('?' * len(room_types))})", *room_types)
+        if building is not None:
+            add("building_name = ?", building)
+        if bbox is not None:
+            min_lat, min_lng, max_lat, max_lng = bbox
+            add("map_lat BETWEEN ? AND ?", min_lat, max_lat)
+            add("map_lng BETWEEN ? AND ?", min_lng, max_lng)
+
+        column = order_by.lstrip('-')
+        if column not in ORDERABLE_COLUMNS:
+            raise ValueError(f"Cannot order by: {order_by}")
+        direction = 'DESC' if order_by.startswith('-') else 'ASC'
+
+        sql = "SELECT record FROM properties"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += f" ORDER BY {column} {direction}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        return [loads(row[0]) for row in self._conn.execute(sql, params)]
+
+    def within_bbox(self, min_lat: float, min_lng: float, max_lat: float, max_lng: float,
+                    **filters) -> List[Dict[str, Any]]:
+        """Các property nằm trong bounding box (kết hợp được với filter khác của query)"""
+        return self.query(bbox=(min_lat, min_lng, max_lat, max_lng), **filters)
+
+    def import_json_files(self, paths: Iterable[str]) -> int:
+        """Import các file crawl_results_*.json đã có"""
+        total = 0
+        for path in paths:
+            with open(path, 'rb') as f:
+                total += self.upsert_many(loads(f.read()))
+        return total
+
+    def close(self):
+        self._conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local property store")
+    parser.add_argument('--db', default='properties.db')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help="Import file JSON kết quả crawl")
+    import_parser.add_argument('files', nargs='+')
+
+    query_parser = subparsers.add_parser('query', help="Truy vấn store")
+    query_parser.add_argument('--min-rent', type=int)
+    query_parser.add_argument('--max-rent', type=int)
+    query_parser.add_argument('--min-size', type=float)
+    query_parser.add_argument('--max-size', type=float)
+    query_parser.add_argument('--room-type', nargs='+')
+    query_parser.add_argument('--building')
+    query_parser.add_argument('--bbox', nargs=4, type=float, metavar=('MIN_LAT', 'MIN_LNG', 'MAX_LAT', 'MAX_LNG'))
+    query_parser.add_argument('--order-by', default='monthly_rent')
+    query_parser.add_argument('--limit', type=int, default=50)
+    args = parser.parse_args()
+
+    store = PropertyStore(args.db)
+    try:
+        if args.command == 'import':
+            print(f"💾 Imported {store.import_json_files(args.files)} records into {args.db}")
+            return
+
+        started = time.perf_counter()
+        results = store.query(
+            min_rent=args.min_rent, max_rent=args.max_rent,
+            min_size=args.min_size, max_size=args.max_size,
+            room_type=args.room_type, building=args.building,
+            bbox=tuple(args.bbox) if args.bbox else None,
+            order_by=args.order_by, limit=args.limit,
+        )
+        elapsed = (time.perf_counter() - started) * 1000
+        for record in results:
+            print(f"{record.get('monthly_rent', '-'):>8}円  {record.get('size', '-'):>6}㎡  "
+                  f"{record.get('room_type', '-'):<6} {record.get('building_name_ja', '')}  {record['link']}")
+        print(f"🔍 {len(results)} results in {elapsed:.1f} ms")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+PropertyRecord - bản ghi property gọn nhẹ, chỉ lưu các field đã được set
+
+Dict template cũ có ~200 key (hầu hết là None) cho mỗi URL. PropertyRecord
+dùng một bitmask + list giá trị xếp theo thứ tự field của PropertyModel,
+nên field None không tốn bộ nhớ. Chỉ convert sang dict/model khi output.
+"""
+
+from collections.abc import Mapping, MutableMapping
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+_FIELDS: Optional[Tuple[str, ...]] = None
+_FIELD_INDEX: Optional[Dict[str, int]] = None
+
+
+def _load_fields():
+    global _FIELDS, _FIELD_INDEX
+    from .config import CrawlerConfig
+    from .models import PropertyModel
+
+    model_fields = getattr(PropertyModel, 'model_fields', None) or PropertyModel.__fields__
+    fields = list(model_fields)
+    for i in range(1, CrawlerConfig.MAX_IMAGES + 1):
+        fields += [f'image_url_{i}', f'image_category_{i}']
+        if CrawlerConfig.DOWNLOAD_IMAGES:
+            fields += [f'image_sha256_{i}', f'image_path_{i}']
+
+    _FIELDS = tuple(fields)
+    _FIELD_INDEX = {name: index for index, name in enumerate(_FIELDS)}
+
+
+def property_fields() -> Tuple[str, ...]:
+    """
+    Các field đã biết theo thứ tự: field của PropertyModel + image_url_N/image_category_N
+    (+ image_sha256_N/image_path_N khi DOWNLOAD_IMAGES)
+    """
+    if _FIELDS is None:
+        _load_fields()
+    return _FIELDS
+
+
+def field_index() -> Dict[str, int]:
+    if _FIELD_INDEX is None:
+        _load_fields()
+    return _FIELD_INDEX
+
+
+class PropertyRecord(MutableMapping):
+    """
+    Mapping thưa (sparse) theo field index của PropertyModel
+
+    - Field đã biết luôn "có mặt" (`'monthly_rent' in record` → True) và trả về
+      None khi chưa set, giống dict template cũ; gán None = bỏ set
+    - Duyệt/len/to_dict chỉ gồm field đã set (theo thứ tự field) + key ngoài schema
+    - Key ngoài schema (vd. field tạm của hook) lưu trong một dict phụ
+    """
+
+    __slots__ = ('_mask', '_values', '_extra')
+
+    def __init__(self, data: Optional[Mapping] = None, **kwargs):
+        self._mask = 0
+        self._values = []
+        self._extra = None
+        if data:
+            self.update(data)
+        if kwargs:
+            self.update(kwargs)
+
+    def _position(self, bit: int) -> int:
+        """Vị trí của field trong _values = số field đã set đứng trước nó"""
+        return bin(self._mask & (bit - 1)).count('1')
+
+    def __getitem__(self, key: str) -> Any:
+        index = field_index().get(key)
+        if index is None:
+            if self._extra is not None and key in self._extra:
+                return self._extra[key]
+            raise KeyError(key)
+        bit = 1 << index
+        if not self._mask & bit:
+            return None
+        return self._values[self._position(bit)]
+
+    def __setitem__(self, key: str, value: Any):
+        index = field_index().get(key)
+        if index is None:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+            return
+
+        bit = 1 << index
+        position = self._position(bit)
+        if self._mask & bit:
+            if value is None:
+                del self._values[position]
+                self._mask &= ~bit
+            else:
+                self._values[position] = value
+        elif value is not None:
+            self._values.insert(position, value)
+            self._mask |= bit
+
+    def __delitem__(self, key: str):
+        index = field_index().get(key)
+        if index is None:
+            if self._extra is None or key not in self._extra:
+                raise KeyError(key)
+            del self._extra[key]
+            return
+        self[key] = None
+
+    def __contains__(self, key: object) -> bool:
+        return key in field_index() or (self._extra is not None and key in self._extra)
+
+    def __iter__(self) -> Iterator[str]:
+        fields = property_fields()
+        mask = self._mask
+        index = 0
+        while mask:
+            if mask & 1:
+                yield fields[index]
+            mask >>= 1
+            index += 1
+        if self._extra:
+            yield from list(self._extra)
+
+    def __len__(self) -> int:
+        return len(self._values) + (len(self._extra) if self._extra else 0)
+
+    def __repr__(self) -> str:
+        return f"PropertyRecord({self.to_dict()!r})"
+
+    def __reduce__(self):
+        return (PropertyRecord, (self.to_dict(),))
+
+    def to_dict(self, include_none: bool = False) -> Dict[str, Any]:
+        """
+        Convert sang dict để output
+
+        Args:
+            include_none: True → đủ mọi field của schema (None cho field chưa set)
+        """
+        if include_none:
+            result = {name: None for name in property_fields()}
+            result.update(self.items())
+            return result
+        return dict(self.items())
+
@@ -0,0 +1,208 @@
+"""
+Retry engine - phân loại lỗi, exponential backoff có jitter và delayed queue
+"""
+
+import heapq
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Error kinds
+TRANSIENT = 'transient'
+PERMANENT = 'permanent'
+
+# Message fragments của lỗi tạm thời (timeout, navigation, network)
+TRANSIENT_ERROR_MARKERS = (
+    'timeout',
+    'timed out',
+    'net::err_',
+    'navigation',
+    'connection',
+    'target closed',
+    'reset by peer',
+    'temporarily unavailable',
+    'circuit open',
+)
+
+# Message fragments của lỗi vĩnh viễn (parse/validation)
+PERMANENT_ERROR_MARKERS = (
+    'not found',
+    'validation',
+    'parse',
+    'decode',
+)
+
+
+class RetryableHTTPError(Exception):
+    """HTTP response lỗi, mang theo status code để phân loại"""
+
+    def __init__(self, status_code: int, message: str = None):
+        self.status_code = status_code
+        super().__init__(message or f"HTTP {status_code}")
+
+
+class CircuitOpenError(Exception):
+    """Circuit breaker của host đang mở - request bị từ chối ngay, không gửi đi"""
+
+    def __init__(self, host: str, retry_in: float = 0.0):
+        self.host = host
+        self.retry_in = retry_in
+        super().__init__(f"Circuit open for {host} (retry in {retry_in:.1f}s)")
+
+
+def classify_error(error: Optional[str] = None, status_code: Optional[int] = None) -> str:
+    """
+    Phân loại lỗi crawl thành TRANSIENT hoặc PERMANENT
+
+    - 408, 429, 5xx, timeout, navigation/network errors → TRANSIENT
+    - 404 và các 4xx khác, parse/validation errors → PERMANENT
+    - Không nhận diện được → PERMANENT (không lãng phí retry)
+    """
+    if status_code is not None:
+        if status_code in (408, 429) or status_code >= 500:
+            return TRANSIENT
+        if 400 <= status_code < 500:
+            return PERMANENT
+
+    if error:
+        message = error.lower()
+        if any(marker in message for marker in PERMANENT_ERROR_MARKERS):
+            return PERMANENT
+        if any(marker in message for marker in TRANSIENT_ERROR_MARKERS):
+            return TRANSIENT
+
+    return PERMANENT
+
+
+def is_circuit_open_error(error: Optional[str]) -> bool:
+    """Lỗi do circuit breaker từ chối (request chưa được gửi đi)"""
+    return bool(error) and 'circuit open' in error.lower()
+
+
+def classify_exception(exc: BaseException) -> str:
+    """Phân loại exception (requests, asyncio, builtin) mà không cần import requests"""
+    status_code = getattr(exc, 'status_code', None)
+    if status_code is not None:
+        return classify_error(str(exc), status_code)
+
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return TRANSIENT
+
+    for cls in type(exc).__mro__:
+        if 'Timeout' in cls.__name__ or cls.__name__ == 'ConnectionError':
+            return TRANSIENT
+
+    if isinstance(exc, ValueError):
+        # JSON decode / parse failure
+        return PERMANENT
+
+    return classify_error(str(exc))
+
+
+class RetryPolicy:
+    """Capped exponential backoff với full jitter"""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 1.0, max_delay: float = 30.0):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def should_retry(self, kind: str, attempt: int) -> bool:
+        """attempt là số lần đã thử (bắt đầu từ 1)"""
+        return kind == TRANSIENT and attempt < self.max_attempts
+
+    def delay(self, attempt: int) -> float:
+        """Delay trước lần thử thứ attempt + 1"""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+
+class RetryQueue:
+    """Delayed queue: item chỉ được lấy ra khi đã hết thời gian chờ"""
+
+    def __init__(self):
+        self._heap: List[tuple] = []
+        self._counter = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, item: Any, delay: float):
+        self._counter += 1
+        heapq.heappush(self._heap, (time.monotonic() + delay, self._counter, item))
+
+    def pop_ready(self, limit: int = None) -> List[Any]:
+        """Lấy các item đã sẵn sàng (tối đa limit item)"""
+        now = time.monotonic()
+        ready = []
+        while self._heap and self._heap[0][0] <= now and (limit is None or len(ready) < limit):
+            ready.append(heapq.heappop(self._heap)[2])
+        return ready
+
+    def drain(self) -> List[Any]:
+        """Lấy toàn bộ item (kể cả chưa hết thời gian chờ), theo thứ tự sẵn sàng"""
+        items = [entry[2] for entry in sorted(self._heap)]
+        self._heap.clear()
+        return items
+
+    def next_ready_in(self) -> Optional[float]:
+        """Số giây đến khi item tiếp theo sẵn sàng (None nếu queue rỗng)"""
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - time.monotonic())
+
+
+class AttemptHistory:
+    """Lịch sử các lần thử theo URL"""
+
+    def __init__(self):
+        self._attempts: Dict[str, List[Dict[str, Any]]] = {}
+
+    def record(self, url: str, latency: float, error: str = None,
+               status_code: int = None, kind: str = None) -> int:
+        """Ghi nhận một lần thử, trả về tổng số lần đã thử của URL"""
+        attempts = self._attempts.setdefault(url, [])
+        attempts.append({
+            'attempt': len(attempts) + 1,
+            'timestamp': time.time(),
+            'latency': round(latency, 3),
+            'error': error,
+            'status_code': status_code,
+            'kind': kind,
+        })
+        return len(attempts)
+
+    def get(self, url: str) -> List[Dict[str, Any]]:
+        return list(self._attempts.get(url, []))
+
+    def attempts(self, url: str) -> int:
+        return len(self._attempts.get(url, []))
+
+    def to_dict(self) -> Dict[str, List[Dict[str, Any]]]:
+        return {url: list(attempts) for url, attempts in self._attempts.items()}
+
+
+def retry_call(func: Callable[[], Any], policy: RetryPolicy, description: str = "request",
+               sleep: Callable[[float], None] = time.sleep) -> Any:
+    """
+    Gọi func đồng bộ với retry cho lỗi TRANSIENT, raise lỗi cuối cùng nếu hết lượt
+
+    Backoff dùng sleep chặn (time.sleep): chỉ gọi từ worker thread (vd. hook đăng
+    ký với offload=True), không gọi trực tiếp trên event loop - mọi tab đang
+    crawl sẽ bị đứng trong lúc chờ.
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            return func()
+        except CircuitOpenError:
+            # Fail fast: không retry trong lúc circuit đang mở
+            raise
+        except Exception as e:
+            kind = classify_exception(e)
+            if not policy.should_retry(kind, attempt):
+                raise
+            wait = policy.delay(attempt)
+            print(f"🔁 Retrying {description} ({attempt}/{policy.max_attempts}) in {wait:.1f}s: {e}")
+            sleep(wait)
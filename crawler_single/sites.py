@@ -0,0 +1,77 @@
+"""
+Site registry - chọn CustomExtractor theo host của URL, import và build lazily
+"""
+
+import importlib
+from typing import Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+from .custom_rules import CustomExtractor
+
+
+class SiteRegistry:
+    """
+    Registry host → extractor factory
+
+    Factory được khai báo bằng đường dẫn "module:function" nên module của site
+    (và các dependency nặng như pyproj/requests) chỉ được import khi có URL
+    của site đó. Extractor của mỗi site chỉ build một lần rồi cache lại.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, str] = {}
+        self._extractors: Dict[str, CustomExtractor] = {}
+
+    def register(self, host: str, factory_path: str):
+        """
+        Đăng ký site
+
+        Args:
+            host: Domain của site (khớp cả subdomain, vd. www.)
+            factory_path: "package.module:function" trả về CustomExtractor
+        """
+        host = host.lower()
+        self._factories[host] = factory_path
+        self._extractors.pop(host, None)
+
+    def hosts(self):
+        return list(self._factories)
+
+    def resolve_host(self, url: str) -> Optional[str]:
+        """Tìm host đã đăng ký khớp với URL (domain hoặc subdomain)"""
+        hostname = (urlsplit(url).hostname or '').lower()
+        for host in self._factories:
+            if hostname == host or hostname.endswith('.' + host):
+                return host
+        return None
+
+    def get_extractor(self, url: str) -> CustomExtractor:
+        """Lấy (và build lần đầu) CustomExtractor cho URL"""
+        host = self.resolve_host(url)
+        if host is None:
+            raise ValueError(f"No extractor registered for URL: {url}")
+
+        extractor = self._extractors.get(host)
+        if extractor is None:
+            extractor = self._load_factory(self._factories[host])()
+            self._extractors[host] = extractor
+            print(f"🧩 Loaded extractor for {host}")
+        return extractor
+
+    def get_factory(self, url: str) -> Callable[[], CustomExtractor]:
+        """Factory (module-level, picklable) của site, dùng cho CustomExtractor.extract_many"""
+        host = self.resolve_host(url)
+        if host is None:
+            raise ValueError(f"No extractor registered for URL: {url}")
+        return self._load_factory(self._factories[host])
+
+    @staticmethod
+    def _load_factory(factory_path: str) -> Callable[[], CustomExtractor]:
+        module_name, _, attr = factory_path.partition(':')
+        module = importlib.import_module(module_name)
+        return getattr(module, attr)
+
+
+# Registry mặc định
+site_registry = SiteRegistry()
+site_registry.register('mitsui-chintai.co.jp', 'crawler_single.mitsui.custom_config:setup_custom_extractor')
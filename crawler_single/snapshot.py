@@ -0,0 +1,199 @@
+"""
+Snapshot diff - giữ bản ghi mới nhất theo link và chỉ emit các field thay đổi
+"""
+
+import os
+import sqlite3
+import time
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from utils.serialization import dumps, dumps_str, loads
+
+# Change event types
+INSERT = 'insert'
+UPDATE = 'update'
+DELETE = 'delete'
+
+# Field thay đổi mỗi lần crawl, không tính là thay đổi dữ liệu
+VOLATILE_FIELDS = frozenset({'create_date'})
+
+
+def diff_records(old: Dict[str, Any], new: Dict[str, Any],
+                 ignore: Iterable[str] = VOLATILE_FIELDS) -> Dict[str, Any]:
+    """
+    Các field khác nhau giữa hai bản ghi: {field: giá trị mới}
+    Field bị xoá ở bản ghi mới có giá trị None
+    """
+    ignore = set(ignore)
+    changes = {}
+    for key, value in new.items():
+        if key not in ignore and old.get(key) != value:
+            changes[key] = value
+    for key in old:
+        if key not in ignore and key not in new:
+            changes[key] = None
+    return changes
+
+
+class SnapshotStore:
+    """
+    Local keyed store (SQLite): link → bản ghi cuối cùng + first_seen/last_changed
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS snapshots (
+        link TEXT PRIMARY KEY,
+        record TEXT NOT NULL,
+        first_seen REAL NOT NULL,
+        last_seen REAL NOT NULL,
+        last_changed REAL NOT NULL
+    );
+    """
+
+    def __init__(self, path: str = 'snapshots.db'):
+        self.path = path
+        # Service cập nhật snapshot trong asyncio.to_thread (các job chạy tuần tự)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(self.SCHEMA)
+
+    def get(self, link: str) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute("SELECT record FROM snapshots WHERE link = ?", (link,)).fetchone()
+        return loads(row[0]) if row else None
+
+    def get_meta(self, link: str) -> Optional[Dict[str, float]]:
+        row = self._conn.execute(
+            "SELECT first_seen, last_seen, last_changed FROM snapshots WHERE link = ?", (link,)
+        ).fetchone()
+        if not row:
+            return None
+        return {'first_seen': row[0], 'last_seen': row[1], 'last_changed': row[2]}
+
+    def get_meta_many(self, links: Iterable[str], chunk_size: int = 500) -> Dict[str, Dict[str, Any]]:
+        """
+        first_seen/last_seen/last_changed + available_from của nhiều link (một query mỗi chunk)
+        Link chưa có trong store không xuất hiện trong kết quả
+        """
+        links = list(links)
+        metas = {}
+        for start in range(0, len(links), chunk_size):
+            chunk = links[start:start + chunk_size]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self._conn.execute(
+                f"""
+                SELECT link, first_seen, last_seen, last_changed,
+                       json_extract(record, '$.available_from')
+                FROM snapshots WHERE link IN ({placeholders})
+                """,
+                chunk
+            )
+            for link, first_seen, last_seen, last_changed, available_from in rows:
+                metas[link] = {
+                    'first_seen': first_seen,
+                    'last_seen': last_seen,
+                    'last_changed': last_changed,
+                    'available_from': available_from,
+                }
+        return metas
+
+    def links(self) -> List[str]:
+        return [row[0] for row in self._conn.execute("SELECT link FROM snapshots")]
+
+    def put(self, link: str, record: Dict[str, Any], changed: bool, now: float = None):
+        now = now or time.time()
+        payload = dumps_str(record, sort_keys=True)
+        self._conn.execute(
+            """
+            INSERT INTO snapshots (link, record, first_seen, last_seen, last_changed)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(link) DO UPDATE SET
+                record = excluded.record,
+                last_seen = excluded.last_seen,
+                last_changed = CASE WHEN ? THEN excluded.last_changed ELSE snapshots.last_changed END
+            """,
+            (link, payload, now, now, now, int(changed))
+        )
+
+    def delete(self, link: str):
+        self._conn.execute("DELETE FROM snapshots WHERE link = ?", (link,))
+
+    def commit(self):
+        self._conn.commit()
+
+    def close(self):
+        self._conn.commit()
+        self._conn.close()
+
+
+class SnapshotDiffer:
+    """
+    So sánh kết quả crawl mới với snapshot và tạo change events:
+
+        {'op': 'insert', 'link': ..., 'fields': {...toàn bộ bản ghi...}}
+        {'op': 'update', 'link': ..., 'fields': {...chỉ field thay đổi...}}
+        {'op': 'delete', 'link': ...}
+    """
+
+    def __init__(self, store: SnapshotStore, ignore_fields: Iterable[str] = VOLATILE_FIELDS):
+        self.store = store
+        self.ignore_fields = frozenset(ignore_fields)
+
+    def apply(self, records: Iterable[Dict[str, Any]],
+              discovered_links: Optional[Iterable[str]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Cập nhật store và yield change events
+
+        Args:
+            records: Kết quả crawl (bản ghi lỗi/không có link bị bỏ qua)
+            discovered_links: Toàn bộ link discovery tìm thấy lần này; link có trong
+                              store nhưng không có ở đây → delete. None = không emit delete
+        """
+        now = time.time()
+        seen = set()
+
+        for record in records:
+            if not isinstance(record, Mapping) or 'error' in record or not record.get('link'):
+                continue
+            link = record['link']
+            seen.add(link)
+            previous = self.store.get(link)
+
+            if previous is None:
+                self.store.put(link, record, changed=True, now=now)
+                yield {'op': INSERT, 'link': link, 'fields': record}
+                continue
+
+            changes = diff_records(previous, record, self.ignore_fields)
+            self.store.put(link, record, changed=bool(changes), now=now)
+            if changes:
+                yield {'op': UPDATE, 'link': link, 'fields': changes}
+
+        if discovered_links is not None:
+            discovered = set(discovered_links) | seen
+            for link in self.store.links():
+                if link not in discovered:
+                    self.store.delete(link)
+                    yield {'op': DELETE, 'link': link}
+
+        self.store.commit()
+
+    def write_changes(self, records: Iterable[Dict[str, Any]],
+                      discovered_links: Optional[Iterable[str]] = None,
+                      filename: str = None) -> Optional[str]:
+        """Ghi change events ra file JSONL, trả về tên file (None nếu không có thay đổi)"""
+        from utils.utils import FileUtils
+
+        counts = {INSERT: 0, UPDATE: 0, DELETE: 0}
+        filename = filename or FileUtils.generate_filename("crawl_changes", "jsonl")
+        with open(filename, 'wb') as f:
+            for event in self.apply(records, discovered_links):
+                counts[event['op']] += 1
+                f.write(dumps(event) + b'\n')
+
+        print(f"🔀 Changes: {counts[INSERT]} inserts, {counts[UPDATE]} updates, {counts[DELETE]} deletes")
+        if not any(counts.values()):
+            os.remove(filename)
+            return None
+        print(f"💾 Saved changes to: {filename}")
+        return filename
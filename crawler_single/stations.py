@@ -0,0 +1,185 @@
+"""
+Station index - tìm ga gần nhất offline từ map_lat/map_lng (grid index, không cần mạng)
+
+Opt-in: chỉ chạy khi CrawlerConfig.STATION_DATA_PATH trỏ tới dataset đầy đủ
+(vd. xuất từ 駅データ.jp / 国土数値情報) theo định dạng:
+
+    station_name,train_line_name,lat,lng
+
+crawler_single/data/stations.csv chỉ là dữ liệu mẫu để test (vài chục ga lớn ở
+Tokyo, tọa độ xấp xỉ) - thiếu ga nên sẽ điền sai ga gần nhất nếu dùng khi crawl.
+"""
+
+import csv
+import heapq
+import math
+import os
+from collections import defaultdict, namedtuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_STATION_DATA = os.path.join(os.path.dirname(__file__), 'data', 'stations.csv')
+
+EARTH_RADIUS_M = 6371000.0
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+
+Station = namedtuple('Station', ['name', 'line', 'lat', 'lng'])
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Khoảng cách đường chim bay (mét)"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def walk_minutes(distance_m: float, speed_m_per_min: float = 80.0) -> int:
+    """Thời gian đi bộ theo chuẩn bất động sản Nhật (80 m/phút, làm tròn lên)"""
+    return max(1, math.ceil(distance_m / speed_m_per_min))
+
+
+class StationIndex:
+    """
+    Grid index: mỗi ô cell_size độ chứa danh sách ga trong ô đó
+
+    Query duyệt các vòng ô quanh điểm cần tìm, dừng khi đã có k ga và vòng tiếp
+    theo chắc chắn xa hơn ga thứ k.
+    """
+
+    def __init__(self, stations: Iterable[Station], cell_size: float = 0.01):
+        self.cell_size = cell_size
+        self.stations: List[Station] = list(stations)
+        self._grid: Dict[Tuple[int, int], List[Station]] = defaultdict(list)
+        for station in self.stations:
+            self._grid[self._cell(station.lat, station.lng)].append(station)
+
+        if self._grid:
+            rows = [cell[0] for cell in self._grid]
+            cols = [cell[1] for cell in self._grid]
+            self._bounds = (min(rows), max(rows), min(cols), max(cols))
+        else:
+            self._bounds = None
+
+    @classmethod
+    def from_csv(cls, path: str = DEFAULT_STATION_DATA, cell_size: float = 0.01) -> 'StationIndex':
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            stations = [
+                Station(row['station_name'], row['train_line_name'], float(row['lat']), float(row['lng']))
+                for row in csv.DictReader(f)
+            ]
+        return cls(stations, cell_size)
+
+    def __len__(self) -> int:
+        return len(self.stations)
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_size), math.floor(lng / self.cell_size)
+
+    def _ring(self, row: int, col: int, radius: int) -> Iterable[Tuple[int, int]]:
+        if radius == 0:
+            yield row, col
+            return
+        for c in range(col - radius, col + radius + 1):
+            yield row - radius, c
+            yield row + radius, c
+        for r in range(row - radius + 1, row + radius):
+            yield r, col - radius
+            yield r, col + radius
+
+    def _max_radius(self, row: int, col: int) -> int:
+        min_row, max_row, min_col, max_col = self._bounds
+        return max(abs(row - min_row), abs(row - max_row), abs(col - min_col), abs(col - max_col))
+
+    def nearest(self, lat: float, lng: float, k: int = 5,
+                max_distance: Optional[float] = None) -> List[Tuple[Station, float]]:
+        """
+        k ga gần nhất: [(Station, khoảng cách mét)] theo thứ tự gần → xa
+
+        Args:
+            max_distance: Bỏ các ga xa hơn (mét)
+        """
+        if not self._bounds or k <= 0:
+            return []
+
+        row, col = self._cell(lat, lng)
+        # Một ô theo chiều kinh độ là cạnh ngắn nhất → cận dưới khoảng cách của mỗi vòng
+        ring_width_m = self.cell_size * METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01)
+        max_radius = self._max_radius(row, col)
+        if max_distance is not None:
+            max_radius = min(max_radius, int(max_distance // ring_width_m) + 1)
+
+        best: List[Tuple[float, int, Station]] = []  # max-heap theo khoảng cách (giá trị âm)
+        counter = 0
+        for radius in range(max_radius + 1):
+            if len(best) == k and (radius - 1) * ring_width_m > -best[0][0]:
+                break
+            for cell in self._ring(row, col, radius):
+                for station in self._grid.get(cell, ()):
+                    distance = haversine_m(lat, lng, station.lat, station.lng)
+                    if max_distance is not None and distance > max_distance:
+                        continue
+                    counter += 1
+                    item = (-distance, counter, station)
+                    if len(best) < k:
+                        heapq.heappush(best, item)
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, item)
+
+        return [(station, -neg_distance) for neg_distance, _, station in sorted(best, reverse=True)]
+
+    def nearest_many(self, points: Iterable[Tuple[float, float]], k: int = 5,
+                     max_distance: Optional[float] = None) -> List[List[Tuple[Station, float]]]:
+        """Batch query cho nhiều (lat, lng)"""
+        return [self.nearest(lat, lng, k, max_distance) for lat, lng in points]
+
+
+_default_index: Optional[StationIndex] = None
+
+
+def get_station_index() -> Optional[StationIndex]:
+    """Index dùng chung, build một lần từ CrawlerConfig.STATION_DATA_PATH (None nếu chưa cấu hình)"""
+    global _default_index
+    if _default_index is None:
+        from .config import CrawlerConfig
+
+        path = CrawlerConfig.STATION_DATA_PATH
+        if not path:
+            return None
+        _default_index = StationIndex.from_csv(path)
+        print(f"🚉 Loaded {len(_default_index)} stations from {path}")
+    return _default_index
+
+
+def fill_station_fields(data: Dict[str, Any],
+                        index: Optional[StationIndex] = None,
+                        max_stations: Optional[int] = None,
+                        walk_speed: Optional[float] = None,
+                        max_distance: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Điền station_name_N / train_line_name_N / walk_N từ map_lat/map_lng
+
+    Không ghi đè nếu bản ghi đã có station_name_1 (vd. site đã cung cấp ga).
+    Không có index và chưa cấu hình STATION_DATA_PATH → bỏ qua.
+    """
+    if data.get('station_name_1'):
+        return data
+    try:
+        lat, lng = float(data['map_lat']), float(data['map_lng'])
+    except (KeyError, TypeError, ValueError):
+        return data
+
+    from .config import CrawlerConfig
+
+    index = index or get_station_index()
+    if index is None:
+        return data
+    max_stations = max_stations or CrawlerConfig.MAX_STATIONS
+    walk_speed = walk_speed or CrawlerConfig.WALK_SPEED_M_PER_MIN
+    max_distance = max_distance or CrawlerConfig.STATION_MAX_DISTANCE
+
+    for slot, (station, distance) in enumerate(index.nearest(lat, lng, max_stations, max_distance), start=1):
+        data[f'station_name_{slot}'] = station.name
+        data[f'train_line_name_{slot}'] = station.line
+        data[f'walk_{slot}'] = walk_minutes(distance, walk_speed)
+    return data
@@ -0,0 +1,242 @@
+"""
+Translation memory - dịch các field *_ja → *_en theo batch, cache bền vững trên đĩa
+
+Mỗi chuỗi nguồn (đã chuẩn hoá) chỉ được dịch một lần qua mọi lần chạy: các
+phòng cùng tòa nhà dùng chung bản dịch, và kết quả (kể cả "không dịch được")
+lưu trong SQLite theo (chuỗi nguồn, ngôn ngữ đích, backend).
+"""
+
+import csv
+import hashlib
+import importlib
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+DEFAULT_GLOSSARY = os.path.join(os.path.dirname(__file__), 'data', 'glossary.csv')
+
+# Field nguồn → field đích
+TRANSLATED_FIELDS = {
+    'building_name_ja': 'building_name_en',
+    'building_description_ja': 'building_description_en',
+    'building_landmarks_ja': 'building_landmarks_en',
+    'property_description_ja': 'property_description_en',
+    'property_other_expenses_ja': 'property_other_expenses_en',
+}
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+# Ký tự được phép để nguyên khi ghép bản dịch theo glossary (số, ASCII, dấu câu)
+PASSTHROUGH_PATTERN = re.compile(r'[0-9A-Za-z\-&.,・/()]+')
+
+
+def normalize_source(text: str) -> str:
+    """Key của translation memory: NFKC + gộp khoảng trắng"""
+    return WHITESPACE_PATTERN.sub(' ', unicodedata.normalize('NFKC', text or '')).strip()
+
+
+class Translator(ABC):
+    """
+    Backend dịch theo batch
+
+    Subclass implement translate_batch; trả về None cho chuỗi không dịch được.
+    `name` là một phần của cache key, đổi backend → dịch lại.
+    """
+
+    name = 'base'
+
+    @abstractmethod
+    def translate_batch(self, texts: Sequence[str], source_lang: str = 'ja',
+                        target_lang: str = 'en') -> List[Optional[str]]:
+        """Dịch cả batch, kết quả cùng thứ tự với texts"""
+
+
+class DictionaryTranslator(Translator):
+    """
+    Backend local (không gọi mạng)
+
+    - Khớp nguyên chuỗi trong dictionary
+    - Nếu không, tách chuỗi theo glossary (longest match, vd. パーク/コート/赤坂) và
+      chỉ trả về bản dịch khi glossary phủ hết chuỗi
+
+    name gồm hash nội dung glossary: sửa/thêm từ → cache cũ (kể cả "không dịch được")
+    không còn khớp và chuỗi được dịch lại.
+    """
+
+    name = 'dictionary'
+
+    def __init__(self, entries: Dict[str, str]):
+        self.entries = {normalize_source(source): target for source, target in entries.items()}
+        self._max_length = max((len(source) for source in self.entries), default=0)
+        digest = hashlib.sha1('\n'.join(f'{source}\t{target}' for source, target in sorted(self.entries.items()))
+                              .encode('utf-8')).hexdigest()
+        self.name = f'dictionary:{digest[:12]}'
+
+    @classmethod
+    def from_csv(cls, path: str = DEFAULT_GLOSSARY) -> 'DictionaryTranslator':
+        """CSV 2 cột: ja,en"""
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            return cls({row['ja']: row['en'] for row in csv.DictReader(f)})
+
+    def _translate_one(self, text: str) -> Optional[str]:
+        if text in self.entries:
+            return self.entries[text]
+
+        words = []
+        position = 0
+        while position < len(text):
+            if text[position] == ' ':
+                position += 1
+                continue
+            passthrough = PASSTHROUGH_PATTERN.match(text, position)
+            if passthrough:
+                words.append(passthrough.group())
+                position = passthrough.end()
+                continue
+            for length in range(min(self._max_length, len(text) - position), 0, -1):
+                target = self.entries.get(text[position:position + length])
+                if target is not None:
+                    words.append(target)
+                    position += length
+                    break
+            else:
+                return None
+        return ' '.join(words) or None
+
+    def translate_batch(self, texts: Sequence[str], source_lang: str = 'ja',
+                        target_lang: str = 'en') -> List[Optional[str]]:
+        return [self._translate_one(text) for text in texts]
+
+
+def default_translator() -> Translator:
+    return DictionaryTranslator.from_csv()
+
+
+class TranslationMemory:
+    """SQLite store: (source, target_lang, backend) → bản dịch (NULL = không dịch được)"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS translations (
+        source TEXT NOT NULL,
+        target_lang TEXT NOT NULL,
+        backend TEXT NOT NULL,
+        translation TEXT,
+        created_at REAL NOT NULL,
+        PRIMARY KEY (source, target_lang, backend)
+    );
+    """
+
+    # Giới hạn số tham số của một câu SQL
+    LOOKUP_CHUNK = 500
+
+    def __init__(self, path: str = 'translations.db'):
+        self.path = path
+        # Dùng từ thread của asyncio.to_thread, luôn tuần tự
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(self.SCHEMA)
+
+    def get_many(self, sources: Iterable[str], target_lang: str, backend: str) -> Dict[str, Optional[str]]:
+        """Các chuỗi đã có trong memory (kể cả kết quả None)"""
+        sources = list(sources)
+        found = {}
+        for start in range(0, len(sources), self.LOOKUP_CHUNK):
+            chunk = sources[start:start + self.LOOKUP_CHUNK]
+            rows = self._conn.execute(
+                f"SELECT source, translation FROM translations "
+                f"WHERE target_lang = ? AND backend = ? AND source IN ({', '.join('?' * len(chunk))})",
+                [target_lang, backend, *chunk]
+            )
+            found.update(rows)
+        return found
+
+    def put_many(self, translations: Dict[str, Optional[str]], target_lang: str, backend: str):
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO translations (source, target_lang, backend, translation, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(source, target_lang, backend, translation, now) for source, translation in translations.items()]
+            )
+
+    def count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+class TranslationService:
+    """
+    Điền các field *_en cho một batch bản ghi:
+    gom chuỗi nguồn duy nhất → tra memory → dịch phần còn thiếu theo batch → lưu
+    """
+
+    def __init__(self,
+                 memory: TranslationMemory,
+                 translator: Translator,
+                 batch_size: int = 50,
+                 target_lang: str = 'en',
+                 fields: Dict[str, str] = None):
+        self.memory = memory
+        self.translator = translator
+        self.batch_size = batch_size
+        self.target_lang = target_lang
+        self.fields = fields or TRANSLATED_FIELDS
+        self.translated = 0
+        self.reused = 0
+
+    @classmethod
+    def from_config(cls, config) -> 'TranslationService':
+        module_name, _, attr = config.TRANSLATOR_FACTORY.partition(':')
+        factory = getattr(importlib.import_module(module_name), attr)
+        return cls(
+            memory=TranslationMemory(config.TRANSLATION_DB),
+            translator=factory(),
+            batch_size=config.TRANSLATION_BATCH_SIZE,
+        )
+
+    def translate_texts(self, texts: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Bản dịch cho các chuỗi (key = chuỗi đã chuẩn hoá)"""
+        sources = {normalize_source(text) for text in texts if text}
+        sources.discard('')
+        if not sources:
+            return {}
+
+        backend = self.translator.name
+        known = self.memory.get_many(sources, self.target_lang, backend)
+        self.reused += len(known)
+
+        missing = sorted(sources - known.keys())
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            translations = dict(zip(batch, self.translator.translate_batch(batch, 'ja', self.target_lang)))
+            self.memory.put_many(translations, self.target_lang, backend)
+            known.update(translations)
+            self.translated += len(batch)
+        return known
+
+    def translate_records(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Điền field đích còn trống cho các bản ghi (tại chỗ), trả về số field đã điền"""
+        records = [record for record in records if record]
+        translations = self.translate_texts(
+            record.get(source) for record in records for source in self.fields
+        )
+
+        filled = 0
+        for record in records:
+            for source, target in self.fields.items():
+                text = record.get(source)
+                if not text or record.get(target):
+                    continue
+                translation = translations.get(normalize_source(text))
+                if translation:
+                    record[target] = translation
+                    filled += 1
+        return filled
+
+    def close(self):
+        self.memory.close()
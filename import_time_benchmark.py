@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark thời gian import của các entry point trong package
+
+Mỗi module được import trong một process Python mới (cold start) nhiều lần,
+lấy median. Dùng --importtime để in các module con tốn thời gian nhất
+(python -X importtime).
+
+    python import_time_benchmark.py
+    python import_time_benchmark.py --repeat 10 --importtime crawler_single.property_crawler
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Các entry point cần theo dõi
+DEFAULT_TARGETS = [
+    "crawler_single",
+    "crawler_single.config",
+    "crawler_single.custom_rules",
+    "crawler_single.sites",
+    "crawler_single.property_crawler",
+    "crawler_single.main",
+    "utils.utils",
+]
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure_import(module: str, repeat: int = 5) -> dict:
+    """
+    Đo thời gian import module trong process mới
+
+    Returns:
+        dict: median/min/max (ms) hoặc error nếu import lỗi
+    """
+    code = (
+        "import time, importlib; "
+        "start = time.perf_counter(); "
+        f"importlib.import_module({module!r}); "
+        "print(time.perf_counter() - start)"
+    )
+    samples = []
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            last_line = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "unknown error"
+            return {"module": module, "error": last_line}
+        samples.append(float(proc.stdout.strip()) * 1000)
+
+    return {
+        "module": module,
+        "median_ms": statistics.median(samples),
+        "min_ms": min(samples),
+        "max_ms": max(samples),
+    }
+
+
+def top_imports(module: str, limit: int = 15) -> list:
+    """Các module con có cumulative import time lớn nhất (python -X importtime)"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        # Format: "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in parts)
+        rows.append((int(cumulative_us), int(self_us), name))
+    rows.sort(reverse=True)
+    return rows[:limit]
+
+
+def main():
+    """Hàm main"""
+    parser = argparse.ArgumentParser(description="Benchmark import time")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_TARGETS, help="Modules cần đo")
+    parser.add_argument("--repeat", type=int, default=5, help="Số lần chạy mỗi module")
+    parser.add_argument("--importtime", action="store_true", help="In top module con theo cumulative time")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print(f"IMPORT TIME BENCHMARK ({args.repeat} cold runs / module)")
+    print("=" * 70)
+
+    started = time.perf_counter()
+    for module in args.modules:
+        result = measure_import(module, args.repeat)
+        if "error" in result:
+            print(f"  {module:<36} ❌ {result['error']}")
+            continue
+        print(f"  {module:<36} {result['median_ms']:>8.1f} ms "
+              f"(min {result['min_ms']:.1f}, max {result['max_ms']:.1f})")
+
+        if args.importtime:
+            for cumulative_us, self_us, name in top_imports(module):
+                print(f"      {cumulative_us / 1000:>8.1f} ms  {name}")
+
+    print("=" * 70)
+    print(f"Tổng thời gian benchmark: {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Serializer layer - JSON nhanh (orjson nếu đã cài, không thì stdlib json)
+
+Dùng chung cho file kết quả, store (SQLite), work queue và snapshot:
+- dumps()/dumps_str(): compact hoặc pretty (indent 2)
+- dump_array()/dump_lines(): ghi stream từng bản ghi ra file (bytes), không build
+  một chuỗi khổng lồ trong bộ nhớ
+- Tự xử lý date/datetime, PropertyRecord và Pydantic model (không cần .dict() trước)
+"""
+
+import json
+from datetime import date, datetime
+from typing import Any, BinaryIO, Iterable, Union
+
+try:
+    import orjson
+except ImportError:  # orjson là tuỳ chọn
+    orjson = None
+
+BACKEND = 'orjson' if orjson else 'json'
+
+
+def default(value: Any) -> Any:
+    """Chuyển các kiểu không phải JSON thuần"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    to_dict = getattr(value, 'to_dict', None)  # PropertyRecord
+    if callable(to_dict):
+        return to_dict()
+    model_dump = getattr(value, 'model_dump', None) or getattr(value, 'dict', None)  # Pydantic v2 / v1
+    if callable(model_dump) and hasattr(value, '__fields__'):
+        return model_dump(exclude_none=True)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    return str(value)
+
+
+def dumps(value: Any, pretty: bool = False, sort_keys: bool = False) -> bytes:
+    """Serialize sang UTF-8 bytes (không escape ký tự non-ASCII)"""
+    if orjson:
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(value, default=default, option=option)
+    return json.dumps(
+        value,
+        ensure_ascii=False,
+        indent=2 if pretty else None,
+        separators=None if pretty else (',', ':'),
+        sort_keys=sort_keys,
+        default=default,
+    ).encode('utf-8')
+
+
+def dumps_str(value: Any, pretty: bool = False, sort_keys: bool = False) -> str:
+    """Như dumps() nhưng trả về str (cột TEXT của SQLite, Redis)"""
+    return dumps(value, pretty=pretty, sort_keys=sort_keys).decode('utf-8')
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dump_array(items: Iterable[Any], f: BinaryIO, pretty: bool = False) -> int:
+    """
+    Ghi một JSON array ra file nhị phân, từng phần tử một
+
+    Returns:
+        Số phần tử đã ghi
+    """
+    count = 0
+    f.write(b'[')
+    for item in items:
+        payload = dumps(item, pretty=pretty)
+        if pretty:
+            # Thụt lề phần tử thêm một cấp như json.dump(..., indent=2)
+            payload = b'\n  ' + payload.replace(b'\n', b'\n  ')
+        f.write(b',' + payload if count else payload)
+        count += 1
+    f.write(b'\n]' if pretty and count else b']')
+    return count
+
+
+def dump_lines(items: Iterable[Any], f: BinaryIO) -> int:
+    """Ghi JSON Lines (mỗi dòng một bản ghi compact), trả về số dòng"""
+    count = 0
+    for item in items:
+        f.write(dumps(item) + b'\n')
+        count += 1
+    return count
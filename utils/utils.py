@@ -2,20 +2,28 @@
 Utility functions cho Property Crawler
 """
 
+import codecs
 import json
 from datetime import datetime
-from typing import Dict, Any
-from crawler_single.models import PropertyModel
+from typing import Dict, Any, Iterable, Iterator, Union, TYPE_CHECKING
+
+from . import serialization
+
+if TYPE_CHECKING:
+    from crawler_single.models import PropertyModel
 
 
 class PropertyUtils:
     """Utility functions cho property processing"""
     
     @staticmethod
-    def validate_and_create_property_model(data: Dict[str, Any]) -> PropertyModel:
+    def validate_and_create_property_model(data: Dict[str, Any]) -> "PropertyModel":
         """
         Validate và tạo PropertyModel từ extracted data
         """
+        # pydantic model chỉ import khi thực sự validate
+        from crawler_single.models import PropertyModel
+        
         try:
             # Tạo PropertyModel
             property_model = PropertyModel(**data)
@@ -37,7 +45,8 @@ class PropertyUtils:
     
     @staticmethod
     def create_crawl_result(property_data: Dict[str, Any] = None, 
-                           error: str = None) -> Dict[str, Any]:
+                           error: str = None,
+                           status_code: int = None) -> Dict[str, Any]:
         """Tạo cấu trúc kết quả crawl chuẩn"""
         if property_data:
             result = {
@@ -47,6 +56,8 @@ class PropertyUtils:
             result = {
                 'error': error or 'Unknown error'
             }
+            if status_code is not None:
+                result['status_code'] = status_code
         
         return result
     
@@ -79,10 +90,102 @@ class FileUtils:
             filename = FileUtils.generate_filename("crawl_results", "json")
         
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(results, f, ensure_ascii=False, indent=2)
+            with open(filename, 'wb') as f:
+                serialization.dump_array(results, f, pretty=True)
             print(f"💾 Saved results to: {filename}")
             return filename
         except Exception as e:
             print(f"❌ Error saving to JSON: {e}")
-            return None
\ No newline at end of file
+            return None
+    
+    @staticmethod
+    def save_csv_results(results: list, filename: str = None) -> str:
+        """Lưu kết quả vào file CSV (header cố định theo PropertyModel)"""
+        from crawler_single.csv_export import export_csv
+        
+        if filename is None:
+            filename = FileUtils.generate_filename("crawl_results", "csv")
+        
+        try:
+            rows = export_csv(results, filename)
+            print(f"💾 Saved {rows} rows to: {filename}")
+            return filename
+        except Exception as e:
+            print(f"❌ Error saving to CSV: {e}")
+            return None
+
+
+class JsonStreamUtils:
+    """Parse JSON tăng dần (không cần load toàn bộ payload vào bộ nhớ)"""
+    
+    _WHITESPACE = ' \t\r\n'
+    
+    @staticmethod
+    def iter_array(chunks: Iterable[Union[bytes, str]]) -> Iterator[Any]:
+        """
+        Duyệt từng phần tử của một JSON array top-level từ các chunk bytes/str
+        
+        Dừng đọc ngay khi consumer ngừng lấy phần tử, nên chunk phía sau
+        không bao giờ được tải hoặc parse.
+        """
+        decoder = json.JSONDecoder()
+        text_decoder = codecs.getincrementaldecoder('utf-8')()
+        whitespace = JsonStreamUtils._WHITESPACE
+        buffer = ''
+        pos = 0
+        started = False
+        expect_value = True  # False: sau phần tử, chỉ chấp nhận ',' hoặc ']'
+        after_comma = False
+        
+        for chunk in chunks:
+            buffer = buffer[pos:] + (text_decoder.decode(chunk) if isinstance(chunk, bytes) else chunk)
+            pos = 0
+            
+            while True:
+                while pos < len(buffer) and buffer[pos] in whitespace:
+                    pos += 1
+                if pos >= len(buffer):
+                    break
+                
+                char = buffer[pos]
+                if not started:
+                    if char == '\ufeff' and pos == 0:
+                        # UTF-8 BOM đầu payload (một số server gửi kèm)
+                        pos += 1
+                        continue
+                    if char != '[':
+                        raise ValueError("Expected a top-level JSON array")
+                    started = True
+                    pos += 1
+                    continue
+                if char == ']':
+                    if after_comma:
+                        raise ValueError("Trailing comma in JSON array")
+                    return
+                if not expect_value:
+                    # Giữa hai phần tử phải có đúng một dấu phẩy
+                    if char != ',':
+                        raise ValueError("Expected ',' or ']' in JSON array")
+                    expect_value = True
+                    after_comma = True
+                    pos += 1
+                    continue
+                if char == ',':
+                    raise ValueError("Unexpected ',' in JSON array")
+                
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    # Phần tử chưa đủ dữ liệu, chờ chunk tiếp theo
+                    break
+                if end == len(buffer) and isinstance(item, (int, float)):
+                    # Số có thể bị cắt giữa hai chunk
+                    break
+                
+                pos = end
+                expect_value = False
+                after_comma = False
+                yield item
+        
+        raise ValueError("Incomplete JSON array")
+